@@ -0,0 +1,57 @@
+"""
+Tiempo de arranque de nfsctl frente a cargar main.py (que importa PyQt6).
+
+Se mide el proceso completo (lanzar el intérprete, importar y terminar).
+Para main.py solo se importa el módulo, sin abrir ninguna ventana.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 20]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def medir(comando, repeticiones):
+    """Devuelve la lista de duraciones (ms) de lanzar 'comando' varias veces."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run(comando, cwd=RAIZ, capture_output=True)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if proceso.returncode != 0:
+            return None, proceso.stderr.decode().strip().splitlines()[-1]
+    return tiempos, None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.exports', delete=False) as f:
+        f.write("/srv/datos *(rw,sync,no_subtree_check)\n")
+        archivo = f.name
+
+    casos = [
+        ("python (vacío)", [sys.executable, "-c", "pass"]),
+        ("nfsctl listar", [sys.executable, "nfsctl.py", "--archivo", archivo, "listar"]),
+        ("import main (PyQt6)", [sys.executable, "-c", "import main"]),
+    ]
+    try:
+        for nombre, comando in casos:
+            tiempos, error = medir(comando, args.repeticiones)
+            if tiempos is None:
+                print(f"{nombre:<22} no disponible: {error}")
+                continue
+            print(f"{nombre:<22} mediana {statistics.median(tiempos):7.1f} ms   "
+                  f"mín {min(tiempos):7.1f} ms")
+    finally:
+        os.unlink(archivo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mide cuánto cuesta un ciclo de detección de deriva (leer etab + comparar con
+/etc/exports) con miles de exportaciones. Debe caber holgadamente en el
+intervalo de sondeo (unos segundos).
+
+Uso:
+    python benchmarks/bench_deriva.py [--tamanos 1000,10000,50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nfs_logic
+from generador import escribir_archivo
+
+def escribir_etab(ruta_exports, ruta_etab):
+    """Genera un etab equivalente al archivo exports, con las opciones ya expandidas."""
+    defecto = ",".join(nfs_logic.OPCIONES_KERNEL_DEFECTO)
+    with open(ruta_exports) as entrada, open(ruta_etab, 'w') as salida:
+        for directorio, host, opciones in nfs_logic.tokenizar_exports(entrada):
+            salida.write(f"{directorio}\t{host}({nfs_logic._combinar_opciones(defecto, opciones)})\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanos", default="1000,10000,50000")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'líneas':>8} | {'primera (ms)':>12} | {'siguientes (ms)':>15} | diferencias")
+    with tempfile.TemporaryDirectory() as tmp:
+        for tamano in (int(t) for t in args.tamanos.split(',')):
+            ruta = escribir_archivo(os.path.join(tmp, f"exports_{tamano}"), tamano)
+            etab = os.path.join(tmp, f"etab_{tamano}")
+            escribir_etab(ruta, etab)
+            nfs_logic.EXPORTS_FILE = ruta
+            nfs_logic.limpiar_cache_exports()
+            nfs_logic.normalizar_opciones.cache_clear()
+
+            inicio = time.perf_counter()
+            _, deriva = nfs_logic.comprobar_deriva(etab)
+            primera = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                nfs_logic.comprobar_deriva(etab)
+            siguientes = (time.perf_counter() - inicio) / args.repeticiones
+
+            diferencias = sum(len(deriva[k]) for k in ("solo_archivo", "solo_kernel", "distintas"))
+            print(f"{tamano:>8} | {primera * 1000:>12.1f} | {siguientes * 1000:>15.1f} | {diferencias}")
+
+if __name__ == "__main__":
+    main()
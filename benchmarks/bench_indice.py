@@ -0,0 +1,62 @@
+"""
+Peor caso de IndiceClientes.consultar: muchos directorios, cada uno con
+comodines que no son "*.dominio" ("web*.dominioN.com", "srvN-*"), que antes
+se probaban todos en cada consulta. Se mide un cliente que encaja en un
+comodín, primero sin reglas anónimas y después con un "*" en cada
+directorio: entonces todos los directorios están en la respuesta y la
+consulta es, como mínimo, lineal en su tamaño.
+
+Uso:
+    python benchmarks/bench_indice.py [--directorios 1000,10000,100000] [--consultas 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nfs_logic
+
+def tabla_peor_caso(directorios, anonimos):
+    """Tabla con 'directorios' entradas con comodines de prefijo y de sufijo (y un "*" si 'anonimos')."""
+    tabla = nfs_logic.ExportTable()
+    for i in range(directorios):
+        reglas = [nfs_logic.HostRule(f"web*.dominio{i}.com", "rw,sync"),
+                  nfs_logic.HostRule(f"srv{i}-*", "rw,sync")]
+        if anonimos:
+            reglas.append(nfs_logic.HostRule("*", "ro,sync"))
+        tabla[f"/srv/d{i}"] = reglas
+    return tabla
+
+def cronometrar(funcion, repeticiones):
+    """Mediana en µs de 'repeticiones' llamadas."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directorios", default="1000,10000,100000")
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'directorios':>11} {'anónimos':>9} {'indexar':>10} {'consulta':>12} {'respuesta':>10}")
+    for directorios in (int(n) for n in args.directorios.split(',')):
+        nombre = f"web7.dominio{directorios // 2}.com"
+        for anonimos in (False, True):
+            tabla = tabla_peor_caso(directorios, anonimos)
+            inicio = time.perf_counter()
+            indice = nfs_logic.IndiceClientes(tabla)
+            indexar = time.perf_counter() - inicio
+            consulta = cronometrar(lambda: indice.consultar(nombre), args.consultas)
+            respuesta = indice.consultar(nombre)
+            print(f"{directorios:>11} {'sí' if anonimos else 'no':>9} {indexar:>9.2f}s "
+                  f"{consulta:>9.1f} µs {len(respuesta):>10}")
+
+if __name__ == "__main__":
+    main()
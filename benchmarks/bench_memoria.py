@@ -0,0 +1,55 @@
+"""
+Compara la memoria usada por la representación antigua (dict de listas
+de dicts) con ExportTable/HostRule para el mismo archivo exports.
+
+Uso:
+    python benchmarks/bench_memoria.py [--lineas 70000] [--hosts 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nfs_logic
+from bench_parser import leer_legado
+from generador import escribir_archivo
+
+def medir_memoria(funcion):
+    """Devuelve (resultado, MiB retenidos por el resultado)."""
+    tracemalloc.start()
+    resultado = funcion()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lineas", type=int, default=70000)
+    parser.add_argument("--hosts", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = escribir_archivo(os.path.join(tmp, "exports"), args.lineas, args.hosts)
+
+        legado, mib_legado = medir_memoria(lambda: leer_legado(ruta))
+        total = sum(len(h) for h in legado.values())
+        del legado
+
+        nfs_logic.EXPORTS_FILE = ruta
+        # La caché de lectura también retiene su propia copia; se mide sin ella
+        def leer_tabla():
+            tabla = nfs_logic.leer_configuracion_exports()
+            nfs_logic.limpiar_cache_exports()
+            return tabla
+        tabla, mib_tabla = medir_memoria(leer_tabla)
+
+    print(f"Entradas host: {total}")
+    print(f"dict de listas de dicts : {mib_legado:8.1f} MiB")
+    print(f"ExportTable / HostRule  : {mib_tabla:8.1f} MiB")
+    print(f"Ahorro                  : {100 * (1 - mib_tabla / mib_legado):8.1f} %")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compara el tokenizador en streaming (nfs_logic.tokenizar_exports) con el
+analizador original basado en split(), sobre archivos de 1k a 1M líneas.
+
+Uso:
+    python benchmarks/bench_parser.py [--tamanos 1000,10000,100000,1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nfs_logic
+from generador import escribir_archivo
+
+def leer_legado(ruta):
+    """Copia del analizador original (antes del tokenizador) como referencia."""
+    config_data = {}
+    with open(ruta, 'r') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith('#'):
+                continue
+            partes = linea.split()
+            directorio = partes[0]
+            if directorio not in config_data:
+                config_data[directorio] = []
+            for host_info in partes[1:]:
+                try:
+                    host, opciones_bruto = host_info.split('(', 1)
+                    opciones = opciones_bruto.replace(')', '')
+                    config_data[directorio].append({"host": host, "options": opciones})
+                except ValueError:
+                    pass
+    return config_data
+
+def leer_streaming(ruta):
+    """Recorre el archivo con el tokenizador sin construir ninguna estructura."""
+    total = 0
+    with open(ruta, 'r') as f:
+        for _ in nfs_logic.tokenizar_exports(f):
+            total += 1
+    return total
+
+def medir(funcion, ruta):
+    """Devuelve (segundos, pico de memoria en MiB)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion(ruta)
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracion, pico / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanos", default="1000,10000,100000,1000000")
+    args = parser.parse_args()
+
+    print(f"{'líneas':>10} | {'legado (s)':>10} {'MiB':>8} | {'streaming (s)':>13} {'MiB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for tamano in (int(t) for t in args.tamanos.split(',')):
+            ruta = escribir_archivo(os.path.join(tmp, f"exports_{tamano}"), tamano)
+            t_leg, m_leg = medir(leer_legado, ruta)
+            t_str, m_str = medir(leer_streaming, ruta)
+            print(f"{tamano:>10} | {t_leg:>10.3f} {m_leg:>8.1f} | {t_str:>13.3f} {m_str:>8.1f}")
+            os.remove(ruta)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Latencia de arranque de la ventana principal y de apertura del diálogo de
+host: uic.loadUi en cada uso (antes) frente a clases precompiladas y un
+diálogo reutilizado (ahora).
+
+Se ejecuta sin pantalla (QT_QPA_PLATFORM=offscreen).
+
+Uso:
+    python benchmarks/bench_ui.py [--repeticiones 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+from PyQt6 import uic
+from PyQt6.QtWidgets import QApplication, QDialog, QMainWindow
+
+from nfs_qt import cargar_clase_ui
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+
+    Ui_AddHost = cargar_clase_ui('Ui/add_host_dialog.ui')
+    Ui_MainWindow = cargar_clase_ui('Ui/MainWindow.ui')
+
+    class Dialogo(QDialog, Ui_AddHost):
+        def __init__(self):
+            super().__init__()
+            self.setupUi(self)
+
+    class Ventana(QMainWindow, Ui_MainWindow):
+        def __init__(self):
+            super().__init__()
+            self.setupUi(self)
+
+    # Ventana principal
+    antes = cronometrar(lambda: uic.loadUi('Ui/MainWindow.ui', QMainWindow()), args.repeticiones)
+    ahora = cronometrar(Ventana, args.repeticiones)
+    print(f"Ventana principal : loadUi {antes:7.2f} ms   precompilada {ahora:7.2f} ms")
+
+    # Diálogo de host: antes se creaba uno nuevo por clic; ahora se reutiliza
+    antes = cronometrar(lambda: uic.loadUi('Ui/add_host_dialog.ui', QDialog()), args.repeticiones)
+    nuevo = cronometrar(Dialogo, args.repeticiones)
+    dialogo = Dialogo()
+    reutilizado = cronometrar(lambda: (dialogo.le_host.setText(""), dialogo.rw.setChecked(False)),
+                              args.repeticiones)
+    print(f"Diálogo de host   : loadUi {antes:7.2f} ms   precompilado {nuevo:7.2f} ms   "
+          f"reutilizado {reutilizado:7.3f} ms")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Generador de archivos /etc/exports sintéticos para los benchmarks.
+
+Además de líneas "ruta host(opciones) ..." puede mezclar comentarios,
+líneas vacías, continuaciones con '\\', opciones por defecto ("-ro") y
+rutas con espacios, para parecerse a un archivo real mantenido a mano.
+
+Uso:
+    python benchmarks/generador.py 100000 /tmp/exports_100k
+    python benchmarks/generador.py 10000 /tmp/e --hosts 1-8 --comentarios 0.05 --continuaciones 0.1
+"""
+import argparse
+import random
+import sys
+
+OPCIONES_MUESTRA = [
+    "rw,sync,no_subtree_check",
+    "ro,sync,root_squash",
+    "rw,async,no_root_squash",
+    "ro,all_squash,anonuid=1000,anongid=1000",
+    "rw,sync,insecure",
+]
+
+def _host_aleatorio(rnd):
+    tipo = rnd.random()
+    if tipo < 0.5:
+        return f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(1, 255)}"
+    if tipo < 0.7:
+        return f"192.168.{rnd.randrange(256)}.0/24"
+    if tipo < 0.9:
+        return f"*.dept{rnd.randrange(100)}.miempresa.com"
+    return "*"
+
+def _rango(valor):
+    """3 -> (3, 3); (1, 8) -> (1, 8); "1-8" -> (1, 8)."""
+    if isinstance(valor, str):
+        minimo, _, maximo = valor.partition('-')
+        return int(minimo), int(maximo or minimo)
+    if isinstance(valor, int):
+        return valor, valor
+    return tuple(valor)
+
+def generar_lineas(num_lineas, hosts_por_linea=3, semilla=1, opciones=None,
+                   comentarios=0.0, continuaciones=0.0, por_defecto=0.0, espacios=0.0):
+    """
+    Generador: devuelve num_lineas líneas de exports (sin salto final; una
+    continuación se devuelve como una sola cadena con la barra y el salto dentro).
+    - hosts_por_linea: número fijo o rango (min, max) / "min-max".
+    - opciones: lista de cadenas de opciones a mezclar (por defecto OPCIONES_MUESTRA).
+    - comentarios, continuaciones, por_defecto, espacios: proporción (0-1) de
+      comentarios intercalados, líneas partidas con '\\', líneas con "-opciones"
+      y rutas con espacios (entre comillas).
+    """
+    rnd = random.Random(semilla)
+    minimo, maximo = _rango(hosts_por_linea)
+    opciones = opciones or OPCIONES_MUESTRA
+    for i in range(num_lineas):
+        if comentarios and rnd.random() < comentarios:
+            yield rnd.choice(("# Exportación del equipo " + str(i), ""))
+        ruta = f"/srv/proyecto_{i}"
+        if espacios and rnd.random() < espacios:
+            ruta = f'"/srv/proyecto {i}"'
+        hosts = [f"{_host_aleatorio(rnd)}({rnd.choice(opciones)})"
+                 for _ in range(rnd.randint(minimo, maximo))]
+        if por_defecto and rnd.random() < por_defecto:
+            hosts.insert(0, "-" + rnd.choice(opciones))
+        if continuaciones and len(hosts) > 1 and rnd.random() < continuaciones:
+            yield f"{ruta} {hosts[0]} \\\n\t" + " ".join(hosts[1:])
+        else:
+            yield f"{ruta} " + " ".join(hosts)
+
+def escribir_archivo(ruta, num_lineas, hosts_por_linea=3, semilla=1, **mezcla):
+    """Escribe un archivo exports sintético en 'ruta' (ver generar_lineas para 'mezcla')."""
+    with open(ruta, 'w') as f:
+        f.write("# Archivo generado para benchmarks\n")
+        for linea in generar_lineas(num_lineas, hosts_por_linea, semilla, **mezcla):
+            f.write(linea + "\n")
+    return ruta
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un archivo exports sintético.")
+    parser.add_argument("lineas", type=int)
+    parser.add_argument("destino")
+    parser.add_argument("--hosts", default="3", help="hosts por línea: N o MIN-MAX")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--opciones", action="append",
+                        help="cadena de opciones a mezclar (se puede repetir)")
+    parser.add_argument("--comentarios", type=float, default=0.0)
+    parser.add_argument("--continuaciones", type=float, default=0.0)
+    parser.add_argument("--por-defecto", type=float, default=0.0)
+    parser.add_argument("--espacios", type=float, default=0.0)
+    args = parser.parse_args()
+    escribir_archivo(args.destino, args.lineas, args.hosts, args.semilla, opciones=args.opciones,
+                     comentarios=args.comentarios, continuaciones=args.continuaciones,
+                     por_defecto=args.por_defecto, espacios=args.espacios)
+
+if __name__ == "__main__":
+    sys.exit(main())
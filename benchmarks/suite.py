@@ -0,0 +1,279 @@
+"""
+Suite de benchmarks de nfs_logic con resultados en JSON para comparar
+ejecuciones a lo largo del tiempo.
+
+Escenarios (para cada tamaño):
+    parsear         leer /etc/exports sin caché
+    parsear_cache   leer de nuevo el mismo archivo (acierto de caché)
+    serializar      generar el texto tras modificar ~1% de los directorios
+    ida_vuelta      leer, modificar un directorio y guardar (escritura atómica)
+    diff            calcular_cambios_exportfs entre la tabla original y la modificada
+    aplicar         aplicar_cambios_nfs con un exportfs falso (benchmarks/stubs)
+    refresco_tabla  rellenar listaDirectorios y el modelo de hosts (necesita PyQt6)
+    muestreo        una muestra de MuestreadorNFS sobre un /proc falso con una
+                    línea de rmtab por directorio; se informa también del % de
+                    CPU que supone cada 2 s (presupuesto: <1%)
+Y una vez: 'servicio' (habilitar_servicio_nfs con un systemctl falso).
+
+Uso:
+    python benchmarks/suite.py [--tamanos 1000,10000,100000,1000000] [--salida r.json]
+    python benchmarks/suite.py --latencia 0.01 --comparar anterior.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(RAIZ, "benchmarks", "stubs")
+sys.path.insert(0, RAIZ)
+
+import nfs_logic
+from generador import escribir_archivo
+
+def modificar(config_data, proporcion=0.01, semilla=2):
+    """Copia de la tabla con ~proporcion de directorios cambiados, añadidos y quitados."""
+    rnd = random.Random(semilla)
+    nueva = config_data.copia()
+    directorios = list(nueva)
+    cuantos = max(1, int(len(directorios) * proporcion))
+    for directorio in rnd.sample(directorios, cuantos):
+        reglas = nueva[directorio]
+        reglas[0] = nfs_logic.HostRule(reglas[0].host, "ro,sync,no_subtree_check")
+    for directorio in rnd.sample(directorios, max(1, cuantos // 2)):
+        nueva.pop(directorio, None)
+    for i in range(max(1, cuantos // 2)):
+        nueva[f"/srv/nuevo_{i}"] = [nfs_logic.HostRule("*", "rw,sync")]
+    return nueva
+
+class Contexto:
+    """Archivo generado y tablas compartidas por los escenarios de un tamaño."""
+
+    def __init__(self, directorio_tmp, tamano, mezcla):
+        self.ruta = escribir_archivo(os.path.join(directorio_tmp, f"exports_{tamano}"), tamano, **mezcla)
+        with open(self.ruta, 'rb') as f:
+            self.original = f.read()
+        nfs_logic.EXPORTS_FILE = self.ruta
+        nfs_logic.limpiar_cache_exports()
+        self.config = nfs_logic.leer_configuracion_exports()
+        self.modificada = modificar(self.config)
+
+    def restaurar(self):
+        with open(self.ruta, 'wb') as f:
+            f.write(self.original)
+
+# --- ESCENARIOS: (preparar, medir); solo se cronometra 'medir' ---
+
+def _parsear(ctx):
+    nfs_logic.limpiar_cache_exports()
+    return lambda: nfs_logic.leer_configuracion_exports()
+
+def _parsear_cache(ctx):
+    nfs_logic.leer_configuracion_exports()
+    return lambda: nfs_logic.leer_configuracion_exports()
+
+def _serializar(ctx):
+    return lambda: nfs_logic.serializar_exports(ctx.modificada)
+
+def _ida_vuelta(ctx):
+    ctx.restaurar()
+    nfs_logic.limpiar_cache_exports()
+
+    def medir():
+        config = nfs_logic.leer_configuracion_exports()
+        directorio = next(iter(config))
+        config[directorio] = [nfs_logic.HostRule("*", "ro")]
+        exito, mensaje = nfs_logic.escribir_configuracion_exports(config)
+        if not exito:
+            raise RuntimeError(mensaje)
+    return medir
+
+def _diff(ctx):
+    return lambda: nfs_logic.calcular_cambios_exportfs(ctx.config, ctx.modificada)
+
+def _aplicar(ctx):
+    exportfs = os.path.join(STUBS, "exportfs")
+
+    def medir():
+        exito, mensaje = nfs_logic.aplicar_cambios_nfs(ctx.config, ctx.modificada, comando_exportfs=exportfs)
+        if not exito:
+            raise RuntimeError(mensaje)
+    return medir
+
+def _refresco_tabla(ctx):
+    from PyQt6.QtWidgets import QApplication, QListWidget
+    from nfs_qt import ModeloHosts
+    app = QApplication.instance() or QApplication([])
+    lista = QListWidget()
+    modelo = ModeloHosts()
+    mayor = max(ctx.config, key=lambda d: len(ctx.config[d]))
+
+    def medir():
+        lista.clear()
+        lista.addItems(list(ctx.config))
+        modelo.set_directorio(ctx.config, mayor)
+        app.processEvents()
+    return medir
+
+ESTADISTICAS_NFSD = """\
+rc 0 1204 88213
+io 52428800 10485760
+net 89417 0 89417 52
+rpc 89417 0 0 0 0
+proc3 22 4 210 0 180 200 0 7730 1200 30 0 0 0 5 0 3 0 0 40 18 10 0 320
+proc4 2 4 81203
+"""
+
+def _proc_falso(ctx):
+    """Crea (una vez por tamaño) stats, rmtab y clients/N/info junto al archivo generado."""
+    raiz = ctx.ruta + "_proc"
+    if not os.path.isdir(raiz):
+        os.makedirs(os.path.join(raiz, "clients"))
+        with open(os.path.join(raiz, "nfsd"), 'w') as f:
+            f.write(ESTADISTICAS_NFSD)
+        with open(os.path.join(raiz, "rmtab"), 'w') as f:
+            for i, directorio in enumerate(ctx.config):
+                f.write(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{directorio}:0x00000001\n")
+        for i in range(min(len(ctx.config), 1000)):
+            os.makedirs(os.path.join(raiz, "clients", str(i)))
+            with open(os.path.join(raiz, "clients", str(i), "info"), 'w') as f:
+                f.write(f'clientid: 0x{i:x}\naddress: "172.16.{i >> 8 & 255}.{i & 255}:876"\n')
+    return raiz
+
+def _muestreo(ctx):
+    raiz = _proc_falso(ctx)
+    muestreador = nfs_logic.MuestreadorNFS(ruta_stats=os.path.join(raiz, "nfsd"),
+                                           ruta_rmtab=os.path.join(raiz, "rmtab"),
+                                           dir_clientes=os.path.join(raiz, "clients"))
+    # Régimen estable: la primera muestra no calcula tasas ni la unión de clientes
+    muestreador.muestrear()
+    muestreador.muestrear()
+    return muestreador.muestrear
+
+# Escenarios periódicos: se informa de la mediana como % de CPU del intervalo
+INTERVALOS = {"muestreo": nfs_logic.MuestreadorNFS().intervalo}
+
+ESCENARIOS = {
+    "parsear": _parsear,
+    "parsear_cache": _parsear_cache,
+    "serializar": _serializar,
+    "ida_vuelta": _ida_vuelta,
+    "diff": _diff,
+    "aplicar": _aplicar,
+    "refresco_tabla": _refresco_tabla,
+    "muestreo": _muestreo,
+}
+
+def cronometrar(preparar, ctx, repeticiones):
+    """Devuelve la lista de duraciones (s); 'preparar' no entra en la medida."""
+    tiempos = []
+    for _ in range(repeticiones):
+        medir = preparar(ctx)
+        inicio = time.perf_counter()
+        medir()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+def _resultado(escenario, tamano, tiempos=None, error=None):
+    resultado = {"escenario": escenario, "tamano": tamano}
+    if error is not None:
+        resultado["omitido"] = error
+    else:
+        resultado.update(repeticiones=len(tiempos), mediana=statistics.median(tiempos),
+                         minimo=min(tiempos), maximo=max(tiempos))
+        if escenario in INTERVALOS:
+            resultado["cpu_pct"] = resultado["mediana"] / INTERVALOS[escenario] * 100
+    return resultado
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def comparar(actual, anterior):
+    """Imprime la relación actual/anterior de las medianas comunes."""
+    previos = {(r["escenario"], r["tamano"]): r for r in anterior["resultados"] if "mediana" in r}
+    print(f"\nComparación con {anterior.get('commit') or anterior.get('fecha')}:")
+    for r in actual["resultados"]:
+        previo = previos.get((r["escenario"], r["tamano"]))
+        if previo is None or "mediana" not in r:
+            continue
+        relacion = r["mediana"] / previo["mediana"] if previo["mediana"] else float('inf')
+        marca = "  <-- más lento" if relacion > 1.2 else ""
+        print(f"  {r['escenario']:<15} {r['tamano']:>8}  x{relacion:5.2f}{marca}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default="1000,10000,100000")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS))
+    parser.add_argument("--repeticiones", type=int, default=5,
+                        help="repeticiones por escenario (1 a partir de 100k líneas)")
+    parser.add_argument("--hosts", default="1-5", help="hosts por línea: N o MIN-MAX")
+    parser.add_argument("--comentarios", type=float, default=0.05)
+    parser.add_argument("--continuaciones", type=float, default=0.05)
+    parser.add_argument("--latencia", type=float, default=0.002,
+                        help="segundos por llamada de los exportfs/systemctl falsos")
+    parser.add_argument("--salida", default="resultados_bench.json")
+    parser.add_argument("--comparar", metavar="JSON", help="resultado anterior con el que comparar")
+    args = parser.parse_args()
+
+    os.environ["NFS_STUB_LATENCIA"] = str(args.latencia)
+    os.environ["PATH"] = STUBS + os.pathsep + os.environ.get("PATH", "")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    mezcla = {"hosts_por_linea": args.hosts, "comentarios": args.comentarios,
+              "continuaciones": args.continuaciones}
+    escenarios = [e for e in args.escenarios.split(',') if e]
+
+    informe = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": dict(vars(args)),
+        "resultados": [],
+    }
+
+    print(f"{'escenario':<15} {'tamaño':>8} {'mediana (ms)':>13} {'mín (ms)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for tamano in (int(t) for t in args.tamanos.split(',')):
+            ctx = Contexto(tmp, tamano, mezcla)
+            repeticiones = args.repeticiones if tamano < 100000 else 1
+            for escenario in escenarios:
+                try:
+                    tiempos = cronometrar(ESCENARIOS[escenario], ctx, repeticiones)
+                    resultado = _resultado(escenario, tamano, tiempos)
+                    cpu = f"  ({resultado['cpu_pct']:.3f}% CPU)" if "cpu_pct" in resultado else ""
+                    print(f"{escenario:<15} {tamano:>8} {resultado['mediana'] * 1000:>13.2f} "
+                          f"{resultado['minimo'] * 1000:>10.2f}{cpu}")
+                except (ImportError, RuntimeError) as e:
+                    resultado = _resultado(escenario, tamano, error=f"{type(e).__name__}: {e}")
+                    print(f"{escenario:<15} {tamano:>8} omitido ({resultado['omitido']})")
+                informe["resultados"].append(resultado)
+            os.remove(ctx.ruta)
+            shutil.rmtree(ctx.ruta + "_proc", ignore_errors=True)
+
+        inicio = time.perf_counter()
+        exito, mensaje = nfs_logic.habilitar_servicio_nfs()
+        informe["resultados"].append(_resultado("servicio", 1, [time.perf_counter() - inicio]) if exito
+                                     else _resultado("servicio", 1, error=mensaje))
+
+    with open(args.salida, 'w') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            comparar(informe, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,18 @@
 import sys
 import os
-import re
 from PyQt6.QtCore import Qt
-from PyQt6 import QtWidgets, uic
-from PyQt6.QtGui import QIcon
+from PyQt6.QtGui import QIcon, QKeySequence
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QDialog, 
-    QMessageBox, QInputDialog, QButtonGroup
+    QMessageBox, QInputDialog, QFileDialog, QLabel,
+    QDockWidget, QPlainTextEdit
 )
 
 import nfs_logic
+from nfs_qt import (
+    ROL_DETALLE, DelegadoDirectorios, GestorTareas, ModeloHosts, PuenteMuestreador,
+    PuenteVigilante, cargar_clase_ui, crear_proxy_hosts
+)
 
 # --- BLOQUE PARA CORREGIR RUTAS ---
 # Obtiene la ruta absoluta de donde está guardado este archivo main.py
@@ -18,11 +21,15 @@ ruta_base = os.path.dirname(os.path.abspath(__file__))
 # Cambia el directorio de trabajo a esa ruta
 os.chdir(ruta_base)
 
+# Clases generadas desde los .ui (compiladas una vez y guardadas en caché)
+Ui_AddHost = cargar_clase_ui('Ui/add_host_dialog.ui')
+Ui_MainWindow = cargar_clase_ui('Ui/MainWindow.ui')
+
 # --- Clase para el Diálogo de Añadir/Editar Host ---
-class CargarHostDialog(QDialog):
+class CargarHostDialog(QDialog, Ui_AddHost):
     def __init__(self, parent=None):
         super().__init__(parent)
-        uic.loadUi('Ui/add_host_dialog.ui', self)
+        self.setupUi(self)
 
         # Mapea los nombres de las opciones a los widgets checkbox
         self.checkboxes = {
@@ -37,111 +44,58 @@ class CargarHostDialog(QDialog):
             'anonuid': self.anonuid, 'anongid': self.anongid
         }
         
-        # --- GRUPOS DE OPCIONES ---
-        
-        # Grupo 1: Acceso
-        self.group_acceso = QButtonGroup(self)
-        self.group_acceso.addButton(self.rw)
-        self.group_acceso.addButton(self.ro)
-        self._configurar_grupo(self.group_acceso)
-
-        # Grupo 2: Sincronización
-        self.group_sync = QButtonGroup(self)
-        self.group_sync.addButton(self.sync)
-        self.group_sync.addButton(self.async_opt)
-        self._configurar_grupo(self.group_sync)
-
-        # Grupo 3: Privilegios Root
-        self.group_root = QButtonGroup(self)
-        self.group_root.addButton(self.root_squash)
-        self.group_root.addButton(self.no_root_squash)
-        self._configurar_grupo(self.group_root)
-
-        # Grupo 4: Subárbol
-        self.group_subtree = QButtonGroup(self)
-        self.group_subtree.addButton(self.subtree_check)
-        self.group_subtree.addButton(self.no_subtree_check)
-        self._configurar_grupo(self.group_subtree)
-
-        # Grupo 5: Puerto
-        self.group_secure = QButtonGroup(self)
-        self.group_secure.addButton(self.secure)
-        self.group_secure.addButton(self.insecure)
-        self._configurar_grupo(self.group_secure)
-        
-        # NOTA: He quitado los .setChecked(True) por defecto para que 
-        # empiecen vacíos si así lo prefieres.
-
-    def _configurar_grupo(self, group):
-        """
-        Configura un grupo para que permita desmarcar todos (0 seleccionados)
-        pero impida tener más de uno (máximo 1 seleccionado).
-        """
-        group.setExclusive(False) # Permite desmarcar el que ya está marcado
-        
-        # Conectamos la señal para hacer la exclusión manual
-        group.buttonToggled.connect(self._on_button_toggled)
-
-    def _on_button_toggled(self, button, checked):
-        """
-        Lógica manual: Si un botón se ENCIENDE, apagamos a su opuesto.
-        Si un botón se APAGA, no hacemos nada (permitimos que quede vacío).
-        """
-        if checked:
-            group = button.group()
-            for btn in group.buttons():
-                if btn is not button:
-                    btn.setChecked(False)
+        # --- EXCLUSIÓN ENTRE OPCIONES ---
+        # Lo marcado se guarda como ExportOptions: marcar una opción apaga en la
+        # máscara a su opuesta (rw/ro, sync/async, root_squash/no_root_squash,
+        # subtree_check/no_subtree_check, secure/insecure) y las casillas se
+        # sincronizan con ella. Una pareja puede quedar sin ninguna marcada.
+        self._opciones = nfs_logic.ExportOptions()
+        self._valores_anon = {'anonuid': "1000", 'anongid': "1000"}
+        self._cargando = False
+        for nombre, checkbox in self.checkboxes.items():
+            checkbox.toggled.connect(lambda marcada, nombre=nombre: self._on_opcion_marcada(nombre, marcada))
+
+    def _on_opcion_marcada(self, nombre, marcada):
+        """Actualiza la máscara y desmarca las casillas que la opción nueva excluye."""
+        if self._cargando:
+            return
+        if not marcada:
+            self._opciones = self._opciones.sin(nombre)
+            return
+        self._opciones = self._opciones.con(nombre, self._valores_anon.get(nombre))
+        for otro, checkbox in self.checkboxes.items():
+            if checkbox.isChecked() and not self._opciones.tiene(otro):
+                checkbox.setChecked(False)
 
     def get_opciones_seleccionadas(self):
         """
-        Revisa los checkboxes y genera la cadena de texto.
+        Devuelve la cadena de opciones en forma canónica. Las opciones que el
+        diálogo no muestra (fsid, crossmnt, sec...) se conservan tal cual.
         """
-        opciones_lista = []
-        
-        for nombre_opcion, checkbox_widget in self.checkboxes.items():
-            if checkbox_widget.isChecked():
-                # CASOS ESPECIALES
-                if nombre_opcion == 'anonuid':
-                    opciones_lista.append("anonuid=1000")
-                elif nombre_opcion == 'anongid':
-                    opciones_lista.append("anongid=1000")
-                else:
-                    opciones_lista.append(nombre_opcion)
-
-        return ",".join(opciones_lista)
+        return self._opciones.texto()
 
     def set_datos(self, host, opciones_str):
-        """Rellena el diálogo con datos existentes."""
+        """Rellena el diálogo con datos existentes (o lo deja limpio si vienen vacíos)."""
         self.le_host.setText(host)
-        
-        # Primero limpiamos todo (por si acaso)
-        for cb in self.checkboxes.values():
-            cb.setChecked(False)
+        self._opciones = nfs_logic.ExportOptions.analizar(opciones_str)
+        # anonuid/anongid conservan el valor que traía la regla (1000 si no traía)
+        self._valores_anon = {clave: self._opciones.valor(clave, "1000") for clave in ('anonuid', 'anongid')}
 
-        opciones_lista = opciones_str.split(',')
-        for opcion in opciones_lista:
-            opcion = opcion.strip()
-            
-            if opcion.startswith("anonuid="):
-                if 'anonuid' in self.checkboxes: self.checkboxes['anonuid'].setChecked(True)
-            
-            elif opcion.startswith("anongid="):
-                if 'anongid' in self.checkboxes: self.checkboxes['anongid'].setChecked(True)
-            
-            elif opcion in self.checkboxes:
-                self.checkboxes[opcion].setChecked(True)
+        self._cargando = True
+        for nombre, checkbox in self.checkboxes.items():
+            checkbox.setChecked(self._opciones.tiene(nombre))
+        self._cargando = False
 
 
 # --- Clase de la Ventana Principal ---
-class NFSApp(QMainWindow):
+class NFSApp(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
         
         # 1. Cargar Rutas y UI
         ruta_base = os.path.dirname(os.path.abspath(__file__))
         os.chdir(ruta_base)
-        uic.loadUi('Ui/MainWindow.ui', self)
+        self.setupUi(self)
         
         if os.path.exists('assets/app_icon.ico'):
             self.setWindowIcon(QIcon('assets/app_icon.ico'))
@@ -156,32 +110,31 @@ class NFSApp(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
 
+        # Las llamadas a systemctl/exportfs se hacen en segundo plano
+        self.tareas = GestorTareas(self)
+        self.tareas.progreso.connect(self.on_tarea_progreso)
+        self.tareas.fallo.connect(self.on_tarea_fallo)
+
         if respuesta == QMessageBox.StandardButton.Yes:
-            # Opción SI: Intentamos iniciar
-            
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-            QApplication.processEvents() 
-            
-            try:
-                exito, mensaje = nfs_logic.habilitar_servicio_nfs()
-                
-                QApplication.restoreOverrideCursor()
-                
-                if not exito:
-                    # Si falla al iniciar
-                    QMessageBox.warning(self, "Resultado", f"No se pudo iniciar NFS:\n{mensaje}")
-                
-            except Exception as e:
-                QApplication.restoreOverrideCursor()
-                QMessageBox.critical(self, "Error Crítico", f"Falló la lógica de NFS: {e}")
+            # Opción SI: Intentamos iniciar (sin congelar la ventana)
+            self.statusbar.showMessage("Verificando el servicio NFS...")
+            self.tareas.lanzar("servicio", nfs_logic.habilitar_servicio_nfs,
+                               al_terminar=self.on_servicio_verificado)
                 
         else:
             # Opción NO: El usuario no quiere iniciar el servicio.
             # CERRAMOS LA APLICACIÓN INMEDIATAMENTE.
             sys.exit(0)
         
+        # El diálogo de host se crea una sola vez y se reutiliza (ver _dialogo_host)
+        self.dialogo_host = None
+
         # Almacén de datos en memoria
-        self.config_data = {}
+        self.config_data = nfs_logic.ExportTable()
+        # Lo que tiene el kernel (base de los exportfs al aplicar) y lo que hay
+        # en los archivos (base de la fusión con cambios externos)
+        self.config_original = nfs_logic.ExportTable()
+        self.config_en_disco = nfs_logic.ExportTable()
 
         # --- Conectar signals a slots (botones) ---
         
@@ -199,19 +152,138 @@ class NFSApp(QMainWindow):
         self.Finalizar.clicked.connect(self.on_finalizar_clicked)
         self.Cancelar.clicked.connect(self.on_cancelar_clicked)
 
+        # Tabla "Detalle": modelo sobre config_data + proxy para ordenar/filtrar
+        self.modelo_hosts = ModeloHosts(self)
+        self.proxy_hosts = crear_proxy_hosts(self.modelo_hosts, self)
+        self.tableHost.setModel(self.proxy_hosts)
+        self.tableHost.horizontalHeader().setStretchLastSection(True)
+        # Sin indicador de orden se respeta el orden del archivo (importa para exportfs)
+        self.tableHost.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.tableHost.setSortingEnabled(True)
+        self.filtroHosts.textChanged.connect(self.proxy_hosts.setFilterFixedString)
+
+        # Búsqueda "¿qué exportaciones ve este cliente?"
+        self.indice_clientes = nfs_logic.IndiceClientes()
+        self.buscarCliente.returnPressed.connect(self.on_buscar_cliente)
+
+        # Menú de herramientas
+        menu_herramientas = self.menubar.addMenu("Herramientas")
+        accion = menu_herramientas.addAction("Añadir varios directorios...")
+        accion.triggered.connect(self.on_anadir_varios_directorios)
+        accion = menu_herramientas.addAction("Importar inventario (CSV)...")
+        accion.triggered.connect(self.on_importar_inventario)
+        accion = menu_herramientas.addAction("Comparar con el kernel...")
+        accion.triggered.connect(self.on_comparar_kernel)
+        accion = menu_herramientas.addAction("Ajustar permisos del directorio...")
+        accion.triggered.connect(self.on_ajustar_permisos)
+        accion = menu_herramientas.addAction("Recalcular uso de disco")
+        accion.triggered.connect(lambda: self.medir_uso_disco(completo=True))
+        accion = menu_herramientas.addAction("Desplegar en servidores...")
+        accion.triggered.connect(self.on_desplegar_servidores)
+
+        # Panel "Tiempos de la última operación" (oculto hasta que se pida)
+        self.texto_tiempos = QPlainTextEdit(self)
+        self.texto_tiempos.setReadOnly(True)
+        self.panel_tiempos = QDockWidget("Tiempos de la última operación", self)
+        self.panel_tiempos.setWidget(self.texto_tiempos)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.panel_tiempos)
+        self.panel_tiempos.hide()
+        self.panel_tiempos.visibilityChanged.connect(lambda visible: visible and self.actualizar_panel_tiempos())
+        self.tareas.terminado.connect(lambda clave, resultado: self.actualizar_panel_tiempos())
+
+        # Deshacer / Rehacer
+        menu_editar = self.menubar.addMenu("Editar")
+        self.accion_deshacer = menu_editar.addAction("Deshacer")
+        self.accion_deshacer.setShortcut(QKeySequence.StandardKey.Undo)
+        self.accion_deshacer.triggered.connect(self.on_deshacer)
+        self.accion_rehacer = menu_editar.addAction("Rehacer")
+        self.accion_rehacer.setShortcut(QKeySequence.StandardKey.Redo)
+        self.accion_rehacer.triggered.connect(self.on_rehacer)
+
+        menu_tiempos = self.menubar.addMenu("Tiempos")
+        menu_tiempos.addAction(self.panel_tiempos.toggleViewAction())
+        accion = menu_tiempos.addAction("Grabar traza")
+        accion.setCheckable(True)
+        accion.toggled.connect(nfs_logic.trazador.grabar)
+        accion = menu_tiempos.addAction("Medir asignaciones de memoria")
+        accion.setCheckable(True)
+        accion.toggled.connect(nfs_logic.trazador.medir_asignaciones)
+        accion = menu_tiempos.addAction("Guardar traza JSON...")
+        accion.triggered.connect(self.on_guardar_traza)
+
         # Conectar la lista "Maestro" a la tabla "Detalle"
         self.listaDirectorios.currentItemChanged.connect(self.actualizar_tabla_hosts)
 
         # Cargar la configuración inicial
         self.cargar_configuracion_inicial()
+        self._actualizar_acciones_historial()
+
+        # Vigilar cambios hechos fuera de la aplicación (Puppet, otro administrador...)
+        self.vigilante = PuenteVigilante(
+            nfs_logic.VigilanteArchivos,
+            [nfs_logic.EXPORTS_FILE, nfs_logic.EXPORTS_DIR, nfs_logic.ETAB_FILE], self)
+        self.vigilante.cambiados.connect(self.on_archivos_cambiados)
+        self.vigilante.iniciar()
+
+        # Actividad del servidor: tasas en la barra de estado y clientes junto a cada directorio
+        self.listaDirectorios.setItemDelegate(DelegadoDirectorios(self.listaDirectorios))
+        self.etiqueta_actividad = QLabel(self)
+        self.statusbar.addPermanentWidget(self.etiqueta_actividad)
+        # Se lee /proc en un hilo aparte; las muestras llegan por señal
+        self.clientes_por_directorio = {}
+        self.muestreo = PuenteMuestreador(nfs_logic.MuestreadorNFS, self)
+        self.muestreo.muestra.connect(self.on_muestra_nfs)
+        self.muestreo.iniciar()
+        # Tamaño de cada exportación: al arrancar solo se muestra lo que hay en
+        # la caché; se recorre el disco al pedirlo o para los directorios nuevos
+        self.uso_disco = {}
+        self._rutas_uso_pendientes = set()
+        self._uso_completo_pendiente = False
+        self._actualizar_detalles_directorios()
+        self.cargar_uso_en_cache(list(self.config_data))
+
+    def on_servicio_verificado(self, resultado):
+        """Resultado de habilitar_servicio_nfs, ya de vuelta en el hilo de la GUI."""
+        exito, mensaje = resultado
+        self.statusbar.showMessage(mensaje, 5000)
+        if not exito:
+            # Si falla al iniciar
+            QMessageBox.warning(self, "Resultado", f"No se pudo iniciar NFS:\n{mensaje}")
+
+    def on_tarea_progreso(self, clave, hecho, total, mensaje):
+        """Muestra en la barra de estado el avance de una tarea en segundo plano."""
+        self.statusbar.showMessage(f"[{hecho}/{total}] {mensaje}")
+
+    def on_tarea_fallo(self, clave, mensaje):
+        """Una tarea en segundo plano lanzó una excepción inesperada."""
+        QMessageBox.critical(self, "Error Crítico", f"Falló la lógica de NFS: {mensaje}")
+
+    def _dialogo_host(self, host="", opciones=""):
+        """
+        Devuelve el diálogo de host, creado solo la primera vez.
+        Cada uso lo deja limpio (o pre-rellenado) con set_datos.
+        """
+        if self.dialogo_host is None:
+            self.dialogo_host = CargarHostDialog(self)
+        self.dialogo_host.set_datos(host, opciones)
+        return self.dialogo_host
 
+    @nfs_logic.trazado("gui.cargar")
     def cargar_configuracion_inicial(self):
         """Lee el /etc/exports y rellena la lista de directorios."""
-        self.config_data = nfs_logic.leer_configuracion_exports()
+        # /etc/exports y /etc/exports.d/*.exports; cada directorio recuerda su archivo
+        self.config_data = nfs_logic.leer_configuracion_completa()
+        # Lo que hay en disco es lo que se aplicó por última vez: al guardar
+        # solo se lanzan los exportfs de las diferencias
+        self.config_original = self.config_data.copia()
+        self.config_en_disco = self.config_data.copia()
+        # Deshacer/rehacer: instantáneas que comparten todo lo que no cambia
+        self.historial = nfs_logic.HistorialCambios(self.config_data)
         
-        self.listaDirectorios.clear()
-        for directorio in self.config_data.keys():
-            self.listaDirectorios.addItem(directorio)
+        with nfs_logic.trazador.tramo("gui.lista_directorios", directorios=len(self.config_data)):
+            self.listaDirectorios.clear()
+            for directorio in self.config_data.keys():
+                self.listaDirectorios.addItem(directorio)
 
     def on_anadir_directorio_clicked(self):
         """Flujo para añadir un nuevo directorio."""
@@ -221,11 +293,8 @@ class NFSApp(QMainWindow):
             return # El usuario canceló
         
         # --- VALIDACIÓN DE DIRECTORIO ---
-        # Regex: ^/ indica que debe empezar con barra
-        # [a-zA-Z0-9_\-/]+ indica que solo acepta letras, números, _, - y /
-        patron_dir = r'^/[a-zA-Z0-9_\-/]+$'
-        
-        if not re.match(patron_dir, directorio):
+        # Debe empezar con barra y solo acepta letras, números, _, - y /
+        if not nfs_logic.validar_directorio(directorio):
             QMessageBox.warning(self, "Formato Inválido", 
                                 "La ruta debe ser absoluta (empezar con /).\n"
                                 "Solo se permiten letras, números, guiones y guiones bajos.\n\n"
@@ -249,34 +318,458 @@ class NFSApp(QMainWindow):
                 return # El usuario no quiso crearlo
 
         # 3. Pedir el primer Host y Opciones
-        dialog = CargarHostDialog(self)
+        dialog = self._dialogo_host()
         if dialog.exec() == QDialog.DialogCode.Accepted:
             host = dialog.le_host.text()
             opciones = dialog.get_opciones_seleccionadas()
             
-            # --- VALIDACIÓN DE HOST (También aquí) ---
-            # Acepta "*" O formato IP (0-255.0-255...)
-            patron_ip = r'^(\d{1,3}\.){3}\d{1,3}$'
-            if host != "*" and not re.match(patron_ip, host):
-                QMessageBox.warning(self, "Host Inválido", "El host debe ser '*' o una IP válida (ej. 192.168.1.50)")
-                return
-            # -----------------------------------------
-            
             if not host:
                 QMessageBox.warning(self, "Dato Faltante", "El campo 'Host' no puede estar vacío.")
                 return
 
+            # --- VALIDACIÓN DE HOST (También aquí) ---
+            # IP, red, nombre, comodín, @netgroup o "*" (validador compartido)
+            valido, mensaje = nfs_logic.validar_host(host)
+            if not valido:
+                QMessageBox.warning(self, "Host Inválido", f"{mensaje}\n\n{nfs_logic.MENSAJE_HOST_INVALIDO}")
+                return
+            # -----------------------------------------
+
             # 4. Actualizar la UI y los datos en memoria
-            nuevo_host_info = {"host": host, "options": opciones}
+            nuevo_host_info = nfs_logic.HostRule(host, opciones)
             
-            if directorio in self.config_data:
+            if directorio == self.modelo_hosts.directorio:
+                # Es el directorio que se está mostrando: el modelo avisa a la tabla
+                self.modelo_hosts.anadir_regla(nuevo_host_info)
+            elif directorio in self.config_data:
                 self.config_data[directorio].append(nuevo_host_info)
             else:
                 self.config_data[directorio] = [nuevo_host_info]
                 self.listaDirectorios.addItem(directorio) # Añadir a la lista
-            
-            # Actualizar la tabla de hosts para el directorio actual
+                self.medir_uso_disco([directorio])
+            self._registrar_cambio([directorio], f"Añadir {host} a {directorio}")
+
+    def on_anadir_varios_directorios(self):
+        """
+        Alta masiva: se piden varias rutas y un único host/opciones para todas.
+        Las rutas se comprueban y crean en paralelo, con una sola confirmación.
+        """
+        texto, ok = QInputDialog.getMultiLineText(self, "Añadir varios directorios",
+                                                  "Rutas de los directorios (una por línea):")
+        if not ok:
+            return
+        rutas = list(dict.fromkeys(l.strip() for l in texto.splitlines() if l.strip()))
+        if not rutas:
+            return
+
+        # --- VALIDACIÓN DE DIRECTORIOS ---
+        invalidas = [r for r in rutas if not nfs_logic.validar_directorio(r)]
+        if invalidas:
+            QMessageBox.warning(self, "Formato Inválido",
+                                "Estas rutas no son válidas (deben empezar con / y solo contener "
+                                "letras, números, _ y -):\n\n" + "\n".join(invalidas[:15]))
+            return
+
+        # Un solo host y opciones para todos los directorios
+        dialog = self._dialogo_host()
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        host = dialog.le_host.text()
+        opciones = dialog.get_opciones_seleccionadas()
+
+        # --- VALIDACIÓN DE HOST ---
+        valido, mensaje = nfs_logic.validar_host(host)
+        if not valido:
+            QMessageBox.warning(self, "Host Inválido", f"{mensaje}\n\n{nfs_logic.MENSAJE_HOST_INVALIDO}")
+            return
+        # --------------------------
+
+        self.statusbar.showMessage(f"Comprobando {len(rutas)} directorios...")
+        self.tareas.lanzar("alta_masiva", nfs_logic.verificar_directorios, rutas,
+                           al_terminar=lambda existe: self._on_directorios_verificados(existe, host, opciones))
+
+    def _on_directorios_verificados(self, existe, host, opciones):
+        """Segunda fase del alta masiva: una única pregunta para todas las rutas que faltan."""
+        if not isinstance(existe, dict):
+            return # La tarea falló (ya se mostró el error)
+        faltan = [ruta for ruta, si in existe.items() if not si]
+        if not faltan:
+            self._terminar_alta_masiva(list(existe), host, opciones, "Todos los directorios ya existían.")
+            return
+
+        lista = "\n".join(faltan[:15]) + (f"\n... y {len(faltan) - 15} más." if len(faltan) > 15 else "")
+        respuesta = QMessageBox.question(self, "Directorios no encontrados",
+                                         f"{len(faltan)} de {len(existe)} directorios no existen:\n\n"
+                                         f"{lista}\n\n¿Desea crearlos todos?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        existentes = [ruta for ruta, si in existe.items() if si]
+        if respuesta != QMessageBox.StandardButton.Yes:
+            self._terminar_alta_masiva(existentes, host, opciones,
+                                       f"Se omitieron {len(faltan)} directorios que no existen.")
+            return
+
+        def al_crear(resultados):
+            if not isinstance(resultados, list):
+                return
+            creadas = [r["ruta"] for r in resultados if r["exito"]]
+            informe = [dict(r, existia=False) for r in resultados]
+            informe += [{"ruta": r, "existia": True, "exito": True, "mensaje": ""} for r in existentes]
+            self._terminar_alta_masiva(existentes + creadas, host, opciones,
+                                       nfs_logic.resumir_aprovisionamiento(informe))
+
+        self.tareas.lanzar("alta_masiva", nfs_logic.crear_directorios, faltan, al_terminar=al_crear)
+
+    def _terminar_alta_masiva(self, rutas, host, opciones, resumen):
+        """Última fase: añade las rutas a la configuración y muestra un único resumen."""
+        self.statusbar.clearMessage()
+        regla = nfs_logic.HostRule(host, opciones)
+        for directorio in rutas:
+            if directorio == self.modelo_hosts.directorio:
+                self.modelo_hosts.anadir_regla(regla)
+            elif directorio in self.config_data:
+                self.config_data[directorio].append(regla)
+            else:
+                self.config_data[directorio] = [regla]
+                self.listaDirectorios.addItem(directorio)
+
+        self._registrar_cambio(rutas, f"Alta masiva de {len(rutas)} directorios")
+        self.medir_uso_disco(rutas)
+        QMessageBox.information(self, "Alta masiva",
+                                f"{len(rutas)} directorios añadidos con {host}({opciones}).\n\n{resumen}")
+
+    def on_importar_inventario(self):
+        """Importa un CSV/TSV de (directorio, host, opciones) en segundo plano."""
+        ruta, _ = QFileDialog.getOpenFileName(self, "Importar inventario", "",
+                                              "Inventarios (*.csv *.tsv *.txt);;Todos (*)")
+        if not ruta:
+            return
+
+        # En el hilo de trabajo solo se lee y valida el archivo; las filas se
+        # fusionan aquí, sobre la tabla viva, para no perder lo editado entretanto
+        self.statusbar.showMessage(f"Importando {os.path.basename(ruta)}...")
+        self.tareas.lanzar("importar", nfs_logic.leer_inventario_archivo, ruta,
+                           al_terminar=self._on_inventario_importado)
+
+    def _on_inventario_importado(self, resultado):
+        self.statusbar.clearMessage()
+        exito, mensaje = resultado[0], resultado[1]
+        if not exito:
+            QMessageBox.critical(self, "Error al importar", mensaje)
+            return
+
+        filas, errores = resultado[2]
+        nuevos = {directorio for _, directorio, _ in filas if directorio not in self.config_data}
+        informe = nfs_logic.fusionar_inventario(filas, self.config_data, errores)
+        self._rellenar_lista_directorios()
+        self.actualizar_tabla_hosts(self.listaDirectorios.currentItem())
+        self._registrar_cambio({directorio for _, directorio, _ in filas}, "Importar inventario")
+        self.medir_uso_disco([d for d in nuevos if d in self.config_data])
+
+        QMessageBox.information(self, "Inventario importado", nfs_logic.resumir_importacion(informe))
+
+    @nfs_logic.trazado("gui.lista_directorios")
+    def _rellenar_lista_directorios(self):
+        """Vuelve a llenar listaDirectorios desde config_data, manteniendo la selección."""
+        actual = self.modelo_hosts.directorio
+        self.listaDirectorios.clear()
+        for directorio in self.config_data.keys():
+            self.listaDirectorios.addItem(directorio)
+        self._actualizar_detalles_directorios()
+        self.cargar_uso_en_cache([d for d in self.config_data if d not in self.uso_disco])
+        if actual is not None:
+            encontrados = self.listaDirectorios.findItems(actual, Qt.MatchFlag.MatchExactly)
+            if encontrados:
+                self.listaDirectorios.setCurrentItem(encontrados[0])
+
+    def on_archivos_cambiados(self, rutas):
+        """
+        El vigilante detectó cambios en disco. Si cambió /etc/exports o algún
+        archivo de /etc/exports.d se vuelve a leer (solo se analizan los archivos
+        y líneas que cambiaron) y se fusiona con lo que el usuario lleva editado.
+        """
+        de_exports = {r for r in rutas if r == nfs_logic.EXPORTS_FILE or
+                      (os.path.dirname(r) == nfs_logic.EXPORTS_DIR and r.endswith('.exports'))}
+        if de_exports:
+            self.tareas.lanzar("recargar", nfs_logic.leer_configuracion_completa,
+                               al_terminar=self._on_exports_recargado)
+        if nfs_logic.ETAB_FILE in rutas:
+            self.tareas.lanzar("deriva", nfs_logic.comprobar_deriva, al_terminar=self._on_deriva_silenciosa)
+        otros = sorted(r for r in rutas if r not in de_exports and r != nfs_logic.ETAB_FILE)
+        if otros:
+            self.statusbar.showMessage(f"Cambios en {', '.join(otros[:3])}", 5000)
+
+    def _on_exports_recargado(self, remoto):
+        """
+        Fusión a tres bandas: lo último que se leyó o escribió, lo editado aquí
+        y lo que hay ahora en disco. config_original no se toca: sigue siendo
+        lo que tiene el kernel, así el próximo Finalizar aplica también los
+        cambios externos fusionados.
+        """
+        if not isinstance(remoto, nfs_logic.ExportTable) or remoto == self.config_en_disco:
+            return # Falló la lectura, o es nuestra propia escritura / un simple touch
+        if remoto == self.config_data:
+            self.config_en_disco = remoto.copia()
+            return
+
+        fusion, conflictos = nfs_logic.fusionar_tres_vias(self.config_en_disco, self.config_data, remoto)
+        self.config_data = fusion
+        self.config_en_disco = remoto.copia()
+        self._rellenar_lista_directorios()
+        self.actualizar_tabla_hosts(self.listaDirectorios.currentItem())
+        self._registrar_cambio(None, "Fusionar cambios externos")
+
+        if conflictos:
+            lista = "\n".join(conflictos[:15]) + (f"\n... y {len(conflictos) - 15} más." if len(conflictos) > 15 else "")
+            QMessageBox.warning(self, "Cambios externos",
+                                f"{nfs_logic.EXPORTS_FILE} se modificó fuera de la aplicación.\n"
+                                f"Estos directorios también los editó usted; se conserva su versión:\n\n{lista}")
+        else:
+            self.statusbar.showMessage(f"{nfs_logic.EXPORTS_FILE} cambió en disco; se fusionaron los cambios.", 5000)
+
+    def on_muestra_nfs(self, muestra, ahora):
+        """Muestra de actividad tomada en el hilo del muestreador: actualiza la barra de estado y la lista."""
+        if muestra is None:
+            self.etiqueta_actividad.setText("NFS: sin datos")
+        else:
+            self.etiqueta_actividad.setText("NFS: " + nfs_logic.formatear_muestra(muestra))
+        # Solo se repintan los directorios cuyos clientes cambiaron
+        antes, self.clientes_por_directorio = self.clientes_por_directorio, ahora
+        cambiados = {d for d in antes.keys() | ahora.keys() if antes.get(d) != ahora.get(d)}
+        if cambiados:
+            self._actualizar_detalles_directorios(cambiados)
+
+    def _detalle_directorio(self, directorio):
+        """Texto que se muestra a la derecha de un directorio en listaDirectorios."""
+        partes = []
+        uso = self.uso_disco.get(directorio)
+        if uso is not None and uso["error"] is None:
+            partes.append(nfs_logic.formatear_bytes(uso["bytes"]))
+        clientes = len(self.clientes_por_directorio.get(directorio, ()))
+        if clientes:
+            partes.append(f"{clientes} cliente(s)")
+        return " · ".join(partes)
+
+    def cargar_uso_en_cache(self, rutas):
+        """Muestra el último uso guardado de 'rutas' (se lee la caché en segundo plano, sin recorrer el disco)."""
+        if rutas:
+            self.tareas.lanzar("uso_cache", nfs_logic.uso_en_cache, rutas, list(self.config_data),
+                               al_terminar=self._on_uso_en_cache)
+
+    def medir_uso_disco(self, rutas=None, completo=False):
+        """
+        Mide en segundo plano lo que ocupa 'rutas' (por defecto, todos los
+        directorios exportados). Solo se releen los subdirectorios que cambiaron
+        desde la última medida; completo=True lo mide todo de nuevo (por
+        ejemplo, si crecieron archivos).
+        """
+        rutas = list(self.config_data) if rutas is None else list(rutas)
+        if not rutas:
+            return
+        if self.tareas.ocupado("uso"):
+            # La petición pendiente sustituye a la anterior: se acumula lo pedido
+            self._rutas_uso_pendientes.update(rutas)
+            self._uso_completo_pendiente |= completo
+            rutas, completo = list(self._rutas_uso_pendientes), self._uso_completo_pendiente
+        self.tareas.lanzar("uso", nfs_logic.medir_uso_exportaciones, rutas, completo,
+                           exportaciones=list(self.config_data), al_terminar=self._on_uso_medido)
+
+    def _on_uso_en_cache(self, resultados):
+        if not isinstance(resultados, dict):
+            return
+        # Lo medido en esta sesión es más reciente que la caché
+        resultados = {d: uso for d, uso in resultados.items() if d not in self.uso_disco}
+        self.uso_disco.update(resultados)
+        self._actualizar_detalles_directorios(resultados)
+
+    def _on_uso_medido(self, resultados):
+        # La petición pendiente, si la hay, ya lleva sus rutas
+        self._rutas_uso_pendientes.clear()
+        self._uso_completo_pendiente = False
+        if not isinstance(resultados, dict):
+            return
+        cambiados = [d for d, uso in resultados.items() if self.uso_disco.get(d) != uso]
+        self.uso_disco.update(resultados)
+        self._actualizar_detalles_directorios(cambiados)
+        if "Midiendo uso de disco" in self.statusbar.currentMessage():
+            self.statusbar.clearMessage()
+
+    def _actualizar_detalles_directorios(self, directorios=None):
+        """Actualiza el detalle de los directorios indicados (o de todos si es None)."""
+        if directorios is None:
+            items = [self.listaDirectorios.item(f) for f in range(self.listaDirectorios.count())]
+        else:
+            items = [i for d in directorios for i in self.listaDirectorios.findItems(d, Qt.MatchFlag.MatchExactly)]
+        for item in items:
+            detalle = self._detalle_directorio(item.text())
+            if item.data(ROL_DETALLE) != detalle:
+                item.setData(ROL_DETALLE, detalle)
+
+    def actualizar_panel_tiempos(self):
+        """Árbol de la última operación medida y percentiles acumulados por operación."""
+        if not self.panel_tiempos.isVisible():
+            return
+        self.texto_tiempos.setPlainText(nfs_logic.formatear_ultima_operacion() + "\n\n" +
+                                        nfs_logic.formatear_resumen_tiempos())
+
+    def on_guardar_traza(self):
+        """Guarda los tramos grabados en un JSON que se abre con chrome://tracing o Perfetto."""
+        if nfs_logic.trazador.eventos is None:
+            QMessageBox.information(self, "Guardar traza",
+                                    "Active primero 'Tiempos > Grabar traza' y repita la operación.")
+            return
+        ruta, _ = QFileDialog.getSaveFileName(self, "Guardar traza", "traza_nfs.json", "JSON (*.json)")
+        if not ruta:
+            return
+        exito, mensaje = nfs_logic.trazador.exportar_traza(ruta)
+        if exito:
+            self.statusbar.showMessage(mensaje, 5000)
+        else:
+            QMessageBox.critical(self, "Guardar traza", mensaje)
+
+    def _registrar_cambio(self, directorios, descripcion):
+        """Guarda una instantánea tras una edición (solo cuesta lo que cambió en 'directorios')."""
+        self.historial.registrar(self.config_data, directorios, descripcion)
+        self._actualizar_acciones_historial()
+
+    def _actualizar_acciones_historial(self):
+        self.accion_deshacer.setEnabled(self.historial.puede_deshacer())
+        self.accion_deshacer.setText(f"Deshacer {self.historial.descripcion_deshacer()}".strip())
+        self.accion_rehacer.setEnabled(self.historial.puede_rehacer())
+        self.accion_rehacer.setText(f"Rehacer {self.historial.descripcion_rehacer()}".strip())
+
+    def on_deshacer(self):
+        self._aplicar_historial(self.historial.deshacer(self.config_data), "Deshecho")
+
+    def on_rehacer(self):
+        self._aplicar_historial(self.historial.rehacer(self.config_data), "Rehecho")
+
+    def _aplicar_historial(self, resultado, verbo):
+        """Refleja en la lista y la tabla solo los directorios que cambiaron."""
+        if resultado is None:
+            return
+        descripcion, cambiados = resultado
+        for directorio in cambiados:
+            items = self.listaDirectorios.findItems(directorio, Qt.MatchFlag.MatchExactly)
+            if directorio not in self.config_data:
+                for item in items:
+                    self.listaDirectorios.takeItem(self.listaDirectorios.row(item))
+            elif not items:
+                self.listaDirectorios.addItem(directorio)
+        if self.modelo_hosts.directorio in cambiados or self.modelo_hosts.directorio not in self.config_data:
+            # La lista de reglas del directorio mostrado se reemplazó: el modelo debe apuntar a la nueva
             self.actualizar_tabla_hosts(self.listaDirectorios.currentItem())
+        self._actualizar_acciones_historial()
+        self.statusbar.showMessage(f"{verbo}: {descripcion}", 5000)
+
+    def on_comparar_kernel(self):
+        """Compara /etc/exports con lo que el kernel está sirviendo realmente."""
+        self.statusbar.showMessage("Leyendo la tabla de exportaciones del kernel...")
+        self.tareas.lanzar("deriva", nfs_logic.comprobar_deriva, al_terminar=self._on_deriva_calculada)
+
+    def _on_deriva_calculada(self, resultado):
+        self.statusbar.clearMessage()
+        exito, deriva = resultado
+        if not exito:
+            QMessageBox.warning(self, "Comparar con el kernel", deriva)
+            return
+        QMessageBox.information(self, "Comparar con el kernel",
+                                f"Origen: {deriva['origen']}\n\n{nfs_logic.formatear_deriva(deriva)}")
+
+    def _on_deriva_silenciosa(self, resultado):
+        """Tras un cambio en etab solo se avisa en la barra de estado."""
+        exito, deriva = resultado
+        if not exito:
+            return
+        total = len(deriva["solo_archivo"]) + len(deriva["solo_kernel"]) + len(deriva["distintas"])
+        if total:
+            self.statusbar.showMessage(f"El kernel no coincide con {nfs_logic.EXPORTS_FILE}: "
+                                       f"{total} diferencia(s). Ver Herramientas > Comparar con el kernel.")
+        else:
+            self.statusbar.showMessage("La tabla del kernel coincide con el archivo.", 5000)
+
+    def _ofrecer_ajuste_permisos(self, directorio, opciones):
+        """Con all_squash el contenido existente debe ser de anonuid:anongid; se ofrece ajustarlo."""
+        permisos, mensaje = nfs_logic.permisos_implicados(opciones)
+        if permisos is None:
+            if "all_squash" in nfs_logic.normalizar_opciones(opciones):
+                self.statusbar.showMessage(f"No se ajustan los permisos de {directorio}: {mensaje}", 8000)
+            return
+        if not nfs_logic.verificar_directorio(directorio):
+            return
+        respuesta = QMessageBox.question(self, "Ajustar permisos",
+                                         f"Con all_squash los clientes escriben como {permisos['uid']}:{permisos['gid']}.\n\n"
+                                         f"¿Desea cambiar el dueño de todo el contenido de '{directorio}' "
+                                         f"a {permisos['uid']}:{permisos['gid']}?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if respuesta == QMessageBox.StandardButton.Yes:
+            self._lanzar_ajuste_permisos(directorio, permisos)
+
+    def on_ajustar_permisos(self):
+        """Aplica al árbol del directorio seleccionado el dueño que piden sus reglas all_squash."""
+        item_actual = self.listaDirectorios.currentItem()
+        if not item_actual:
+            QMessageBox.warning(self, "Nada seleccionado", "Por favor, selecciona un directorio.")
+            return
+        directorio = item_actual.text()
+        permisos, mensaje = nfs_logic.permisos_de_reglas(self.config_data[directorio])
+        if permisos is None:
+            QMessageBox.information(self, "Ajustar permisos", mensaje)
+            return
+        respuesta = QMessageBox.question(self, "Ajustar permisos",
+                                         f"{mensaje}\n\n¿Desea aplicarlo a todo el contenido de '{directorio}'?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if respuesta == QMessageBox.StandardButton.Yes:
+            self._lanzar_ajuste_permisos(directorio, permisos)
+
+    def _lanzar_ajuste_permisos(self, directorio, permisos):
+        self.statusbar.showMessage(f"Ajustando permisos de {directorio}...")
+        self.tareas.lanzar("permisos", nfs_logic.aplicar_permisos_arbol, directorio,
+                           permisos["uid"], permisos["gid"], permisos["modo_dirs"], permisos["modo_archivos"],
+                           al_terminar=lambda informe: self._on_permisos_ajustados(directorio, informe))
+
+    def _on_permisos_ajustados(self, directorio, informe):
+        self.statusbar.clearMessage()
+        if not isinstance(informe, dict):
+            return
+        resumen = nfs_logic.resumir_permisos(informe)
+        if informe["errores"]:
+            QMessageBox.warning(self, f"Permisos de {directorio}", resumen)
+        else:
+            QMessageBox.information(self, f"Permisos de {directorio}", resumen)
+
+    def on_desplegar_servidores(self):
+        """Envía la configuración actual a varios servidores NFS por SSH, en paralelo."""
+        texto, ok = QInputDialog.getMultiLineText(self, "Desplegar en servidores",
+                                                  "Servidores destino ([usuario@]host), uno por línea:",
+                                                  getattr(self, "_ultimos_servidores", ""))
+        hosts = [h.strip() for h in texto.splitlines() if h.strip() and not h.strip().startswith('#')]
+        if not ok or not hosts:
+            return
+        self._ultimos_servidores = texto
+
+        respuesta = QMessageBox.question(self, "Desplegar en servidores",
+                                         f"Se copiará la configuración actual a {len(hosts)} servidores "
+                                         f"y se ejecutará 'exportfs -ra' en cada uno.\n\n¿Continuar?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if respuesta != QMessageBox.StandardButton.Yes:
+            return
+
+        # Los textos se renderizan aquí para no leer config_data desde otro hilo;
+        # /etc/exports y cada archivo de /etc/exports.d van por separado
+        contenido = nfs_logic.textos_por_archivo(self.config_data)
+        self.statusbar.showMessage(f"Desplegando en {len(hosts)} servidores...")
+        self.tareas.lanzar("desplegar", nfs_logic.desplegar_flota, hosts, contenido,
+                           al_terminar=self._on_despliegue_terminado)
+
+    def _on_despliegue_terminado(self, informe):
+        self.statusbar.clearMessage()
+        if not isinstance(informe, dict):
+            return
+        resumen = nfs_logic.resumir_despliegue(informe)
+        if all(r["exito"] for r in informe["resultados"]):
+            QMessageBox.information(self, "Desplegar en servidores", resumen)
+        else:
+            QMessageBox.warning(self, "Desplegar en servidores", resumen)
 
     def on_editar_directorio_clicked(self):
         """Edita la ruta de un directorio con opción de renombrado físico."""
@@ -300,8 +793,7 @@ class NFSApp(QMainWindow):
             return # No hubo cambios
 
         # --- VALIDACIÓN DE DIRECTORIO ---
-        patron_dir = r'^/[a-zA-Z0-9_\-/]+$'
-        if not re.match(patron_dir, directorio_nuevo):
+        if not nfs_logic.validar_directorio(directorio_nuevo):
             QMessageBox.warning(self, "Formato Inválido", 
                                 "La ruta debe empezar con / y solo contener letras, números, _ y -")
             return
@@ -312,8 +804,6 @@ class NFSApp(QMainWindow):
             return
 
         # --- LÓGICA DE RENOMBRADO ---
-        carpeta_renombrada = False
-        
         # 1. Verificamos si la carpeta VIEJA existe físicamente y la NUEVA no existe
         if nfs_logic.verificar_directorio(directorio_viejo) and not nfs_logic.verificar_directorio(directorio_nuevo):
             
@@ -328,17 +818,16 @@ class NFSApp(QMainWindow):
             )
             
             if resp_rename == QMessageBox.StandardButton.Yes:
-                exito, msg = nfs_logic.renombrar_directorio_fs(directorio_viejo, directorio_nuevo)
-                if exito:
-                    QMessageBox.information(self, "Éxito", msg)
-                    carpeta_renombrada = True
-                else:
-                    QMessageBox.critical(self, "Error", f"No se pudo renombrar:\n{msg}")
-                    return # Cancelamos la operación si falla el renombrado
+                # En otro disco es una copia que puede tardar horas: se hace en segundo
+                # plano y el avance (MiB y velocidad) sale en la barra de estado
+                self.statusbar.showMessage(f"Moviendo {directorio_viejo} a {directorio_nuevo}...")
+                self.tareas.lanzar("mover", nfs_logic.renombrar_directorio_fs, directorio_viejo, directorio_nuevo,
+                                   al_terminar=lambda r: self._on_carpeta_movida(r, directorio_viejo, directorio_nuevo))
+                return
 
         # 2. Si NO se renombró (porque no existía la vieja o el usuario dijo NO),
         #    entonces verificamos si hace falta CREAR la nueva.
-        if not carpeta_renombrada and not nfs_logic.verificar_directorio(directorio_nuevo):
+        if not nfs_logic.verificar_directorio(directorio_nuevo):
             respuesta = QMessageBox.question(self, "Directorio no encontrado",
                                              f"El directorio '{directorio_nuevo}' no existe. ¿Desea crearlo?",
                                              QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -352,16 +841,41 @@ class NFSApp(QMainWindow):
                 return # El usuario no quiso crear el nuevo directorio ni existe
 
         # ----------------------------------
-
+        self._renombrar_en_configuracion(directorio_viejo, directorio_nuevo)
+
+    def _on_carpeta_movida(self, resultado, directorio_viejo, directorio_nuevo):
+        """Fin del renombrado físico: si salió bien se actualiza también la configuración."""
+        self.statusbar.clearMessage()
+        if not isinstance(resultado, tuple):
+            return # La tarea falló (ya se mostró el error)
+        exito, msg = resultado
+        if not exito:
+            QMessageBox.critical(self, "Error", f"No se pudo renombrar:\n{msg}")
+            return # Cancelamos la operación si falla el renombrado
+        QMessageBox.information(self, "Éxito", msg)
+        if directorio_viejo in self.config_data and directorio_nuevo not in self.config_data:
+            self._renombrar_en_configuracion(directorio_viejo, directorio_nuevo)
+
+    def _renombrar_en_configuracion(self, directorio_viejo, directorio_nuevo):
         # 3. Actualizar la memoria (configuración)
+        origen = self.config_data.origen(directorio_viejo)
         datos_hosts = self.config_data.pop(directorio_viejo) 
         self.config_data[directorio_nuevo] = datos_hosts
+        # Sigue guardándose en el mismo archivo de /etc/exports.d
+        self.config_data.asignar_origen(directorio_nuevo, origen)
         
-        # 4. Actualizar UI
-        item_actual.setText(directorio_nuevo)
+        # 4. Actualizar UI (el elemento se busca de nuevo: el movimiento pudo tardar)
+        items = self.listaDirectorios.findItems(directorio_viejo, Qt.MatchFlag.MatchExactly)
+        for item in items:
+            item.setText(directorio_nuevo)
         
         # Actualizar título del grupo de detalles
-        self.actualizar_tabla_hosts(item_actual)
+        if items and self.listaDirectorios.currentItem() is items[0]:
+            self.actualizar_tabla_hosts(items[0])
+        self._registrar_cambio([directorio_viejo, directorio_nuevo],
+                               f"Renombrar {directorio_viejo} a {directorio_nuevo}")
+        self.uso_disco.pop(directorio_viejo, None)
+        self.medir_uso_disco([directorio_nuevo])
 
     def on_suprimir_directorio_clicked(self):
         """
@@ -394,6 +908,7 @@ class NFSApp(QMainWindow):
             #    Esto automáticamente disparará la señal 'currentItemChanged',
             #    que llamará a 'actualizar_tabla_hosts' y limpiará la tabla de abajo.
             self.listaDirectorios.takeItem(self.listaDirectorios.row(item_actual))
+            self._registrar_cambio([directorio_a_borrar], f"Eliminar {directorio_a_borrar}")
             
     def on_anadir_host_clicked(self):
         """
@@ -413,7 +928,7 @@ class NFSApp(QMainWindow):
         directorio_key = item_directorio_actual.text()
 
         # 2. Lanzar el diálogo de host (vacío)
-        dialog = CargarHostDialog(self)
+        dialog = self._dialogo_host()
         
         # 3. Si el usuario presiona "Aceptar"
         if dialog.exec() == QDialog.DialogCode.Accepted:
@@ -426,13 +941,10 @@ class NFSApp(QMainWindow):
                 return
                 
             # --- VALIDACIÓN DE HOST ---
-            # Regex simple para IP: 4 grupos de números separados por puntos
-            patron_ip = r'^(\d{1,3}\.){3}\d{1,3}$'
-            
-            if host != "*" and not re.match(patron_ip, host):
-                QMessageBox.warning(self, "Host Inválido", 
-                                    "El host debe ser el comodín '*' o una IP válida (ej. 192.168.1.10).\n"
-                                    "No se aceptan nombres de dominio ni texto arbitrario.")
+            # IP, red, nombre, comodín, @netgroup o "*" (validador compartido)
+            valido, mensaje = nfs_logic.validar_host(host)
+            if not valido:
+                QMessageBox.warning(self, "Host Inválido", f"{mensaje}\n\n{nfs_logic.MENSAJE_HOST_INVALIDO}")
                 return
             # --------------------------
             
@@ -443,14 +955,13 @@ class NFSApp(QMainWindow):
                                     "Asegúrate de añadir opciones (ej. 'rw') más tarde.")
 
             # 4. Crear la nueva entrada de datos
-            nuevo_host_info = {"host": host, "options": opciones}
-            
-            # 5. Añadir al "cerebro" (self.config_data)
-            self.config_data[directorio_key].append(nuevo_host_info)
+            nuevo_host_info = nfs_logic.HostRule(host, opciones)
             
-            # 6. Refrescar la tabla de hosts (el "Detalle")
-            #    Llamamos a la función que ya teníamos para actualizar la tabla.
-            self.actualizar_tabla_hosts(item_directorio_actual)   
+            # 5. Añadir al "cerebro" (self.config_data) a través del modelo,
+            #    que solo notifica a la tabla la fila nueva
+            self.modelo_hosts.anadir_regla(nuevo_host_info)
+            self._registrar_cambio([directorio_key], f"Añadir {host} a {directorio_key}")
+            self._ofrecer_ajuste_permisos(directorio_key, opciones)
             
     def on_editar_host_clicked(self):
         """
@@ -463,7 +974,7 @@ class NFSApp(QMainWindow):
             return 
             
         # 2. Validar que haya una fila de Host seleccionada (Detalle)
-        current_row = self.tableHost.currentRow()
+        current_row = self._fila_host_actual()
         
         if current_row < 0:
             QMessageBox.warning(self, "Nada seleccionado", 
@@ -474,13 +985,11 @@ class NFSApp(QMainWindow):
         #    Usamos el índice de la fila (current_row) para encontrar el dato exacto en la lista
         dir_key = item_dir.text()
         lista_hosts = self.config_data[dir_key]
-        datos_host_actual = lista_hosts[current_row] # Es un dict: {'host': '...', 'options': '...'}
+        datos_host_actual = lista_hosts[current_row] # Es una HostRule: admite ['host'] y ['options']
 
-        # 4. Crear el diálogo y PRE-RELLENARLO
-        dialog = CargarHostDialog(self)
-        
-        # Llamamos a la función auxiliar para marcar los checkboxes y poner el texto
-        dialog.set_datos(datos_host_actual['host'], datos_host_actual['options'])
+        # 4. Reutilizar el diálogo y PRE-RELLENARLO
+        #    (set_datos marca los checkboxes y pone el texto)
+        dialog = self._dialogo_host(datos_host_actual['host'], datos_host_actual['options'])
 
         # 5. Mostrar el diálogo
         if dialog.exec() == QDialog.DialogCode.Accepted:
@@ -493,22 +1002,17 @@ class NFSApp(QMainWindow):
                 return
                 
             # --- VALIDACIÓN DE HOST ---
-            patron_ip = r'^(\d{1,3}\.){3}\d{1,3}$'
-            if nuevo_host != "*" and not re.match(patron_ip, nuevo_host):
-                QMessageBox.warning(self, "Host Inválido", 
-                                    "El host debe ser '*' o una IP válida (ej. 192.168.1.10).")
+            valido, mensaje = nfs_logic.validar_host(nuevo_host)
+            if not valido:
+                QMessageBox.warning(self, "Host Inválido", f"{mensaje}\n\n{nfs_logic.MENSAJE_HOST_INVALIDO}")
                 return
             # --------------------------
 
-            # 7. Actualizar la memoria
-            #    Reemplazamos el diccionario viejo por el nuevo en la misma posición
-            self.config_data[dir_key][current_row] = {
-                'host': nuevo_host, 
-                'options': nuevas_opciones
-            }
-
-            # 8. Refrescar la tabla visualmente
-            self.actualizar_tabla_hosts(item_dir)    
+            # 7. Actualizar la memoria (y solo esa fila de la tabla)
+            #    Reemplazamos la regla vieja por la nueva en la misma posición
+            self.modelo_hosts.reemplazar_regla(current_row, nfs_logic.HostRule(nuevo_host, nuevas_opciones))
+            self._registrar_cambio([dir_key], f"Editar {nuevo_host} en {dir_key}")
+            self._ofrecer_ajuste_permisos(dir_key, nuevas_opciones)
             
     def on_suprimir_host_clicked(self):
         """
@@ -521,7 +1025,7 @@ class NFSApp(QMainWindow):
             return
 
         # 2. Validar selección de Host (Detalle)
-        current_row = self.tableHost.currentRow()
+        current_row = self._fila_host_actual()
         if current_row < 0:
             QMessageBox.warning(self, "Nada seleccionado", 
                                 "Por favor, selecciona un host de la tabla de abajo para eliminar.")
@@ -530,7 +1034,7 @@ class NFSApp(QMainWindow):
         # 3. Obtener datos para mostrar en la pregunta
         dir_key = item_dir.text()
         lista_hosts = self.config_data[dir_key]
-        host_info = lista_hosts[current_row] # {'host': '...', 'options': '...'}
+        host_info = lista_hosts[current_row] # HostRule('...', '...')
         nombre_host = host_info['host']
 
         # 4. Pedir confirmación
@@ -541,36 +1045,48 @@ class NFSApp(QMainWindow):
                                          QMessageBox.StandardButton.No)
 
         if respuesta == QMessageBox.StandardButton.Yes:
-            # 5. Eliminar de la memoria
-            #    Usamos 'del' con el índice de la lista
-            del self.config_data[dir_key][current_row]
-
-            # 6. Refrescar la tabla visualmente
-            self.actualizar_tabla_hosts(item_dir) 
+            # 5. Eliminar de la memoria (el modelo quita la fila de la tabla)
+            self.modelo_hosts.eliminar_regla(current_row)
+            self._registrar_cambio([dir_key], f"Eliminar {nombre_host} de {dir_key}")
             
     def actualizar_tabla_hosts(self, item_directorio_actual):
         """
-        Limpia y rellena la tabla de hosts (el "Detalle")
-        basado en el directorio seleccionado (el "Maestro").
+        Muestra en la tabla de hosts (el "Detalle") los del directorio
+        seleccionado (el "Maestro"). El modelo lee config_data directamente,
+        no se copia nada.
         """
-        self.tableHost.clearContents()
-        self.tableHost.setRowCount(0)
+        with nfs_logic.trazador.tramo("gui.tabla_hosts"):
+            if not item_directorio_actual:
+                self.modelo_hosts.set_directorio(self.config_data, None) # No hay nada seleccionado
+                return
 
-        if not item_directorio_actual:
-            return # No hay nada seleccionado
+            self.modelo_hosts.set_directorio(self.config_data, item_directorio_actual.text())
 
-        directorio_key = item_directorio_actual.text()
-        if directorio_key in self.config_data:
-            hosts_lista = self.config_data[directorio_key]
-            
-            self.tableHost.setRowCount(len(hosts_lista))
-            
-            for fila_idx, host_info in enumerate(hosts_lista):
-                item_host = QtWidgets.QTableWidgetItem(host_info["host"])
-                item_opciones = QtWidgets.QTableWidgetItem(host_info["options"])
-                
-                self.tableHost.setItem(fila_idx, 0, item_host)
-                self.tableHost.setItem(fila_idx, 1, item_opciones)
+    def _fila_host_actual(self):
+        """Fila seleccionada en la tabla, traducida del proxy (orden/filtro) a config_data. -1 si no hay."""
+        indice = self.tableHost.currentIndex()
+        if not indice.isValid():
+            return -1
+        return self.proxy_hosts.mapToSource(indice).row()
+
+    def on_buscar_cliente(self):
+        """Muestra qué directorios puede montar el cliente escrito y con qué opciones."""
+        cliente = self.buscarCliente.text().strip()
+        if not cliente:
+            return
+
+        # Solo se re-indexan los directorios que cambiaron desde la última búsqueda
+        self.indice_clientes.sincronizar(self.config_data)
+        resultados = self.indice_clientes.consultar(cliente)
+
+        if not resultados:
+            QMessageBox.information(self, "Búsqueda de cliente",
+                                    f"El cliente '{cliente}' no puede montar ningún directorio.")
+            return
+
+        lineas = [f"{directorio}  ←  {host}({opciones})" for directorio, host, opciones in resultados]
+        QMessageBox.information(self, "Búsqueda de cliente",
+                                f"El cliente '{cliente}' puede montar:\n\n" + "\n".join(lineas))
 
     def on_finalizar_clicked(self):
         """
@@ -578,21 +1094,51 @@ class NFSApp(QMainWindow):
         aplica los cambios y cierra la aplicación.
         """
         
+        # 0. Revisar conflictos entre reglas antes de guardar
+        reporte = nfs_logic.analizar_configuracion(self.config_data)
+        if reporte["problemas"]:
+            respuesta = QMessageBox.question(self,
+                                             "Problemas en la configuración",
+                                             nfs_logic.formatear_reporte(reporte, limite=15) +
+                                             "\n\n¿Desea guardar de todos modos?",
+                                             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                             QMessageBox.StandardButton.No)
+            if respuesta != QMessageBox.StandardButton.Yes:
+                return
+
         # 1. Guardar los datos de la memoria (self.config_data) en el archivo
         exito_escritura, mensaje = nfs_logic.escribir_configuracion_exports(self.config_data)
+        self.actualizar_panel_tiempos()
         
         if not exito_escritura:
             # Si algo sale mal al escribir, muestra un error y NO continúes
             QMessageBox.critical(self, "Error al Guardar", mensaje)
             return
-
-        # 2. Aplicar los cambios (ejecutar 'exportfs -ra')
-        exito_aplicar, mensaje = nfs_logic.aplicar_cambios_nfs()
+        # El vigilante verá nuestra propia escritura: no hay nada que fusionar
+        aplicada = self.config_data.copia()
+        self.config_en_disco = aplicada.copia()
+
+        # 2. Aplicar los cambios (solo los 'exportfs' necesarios) en segundo plano.
+        #    Si se pulsa Finalizar varias veces, las peticiones se fusionan.
+        self.Finalizar.setEnabled(False)
+        self.statusbar.showMessage("Aplicando cambios con exportfs...")
+        self.tareas.lanzar("aplicar", nfs_logic.aplicar_cambios_nfs,
+                           self.config_original, aplicada,
+                           al_terminar=lambda resultado: self.on_cambios_aplicados(resultado, aplicada))
+
+    def on_cambios_aplicados(self, resultado, aplicada=None):
+        """Resultado de aplicar_cambios_nfs, ya de vuelta en el hilo de la GUI."""
+        self.Finalizar.setEnabled(True)
+        exito_aplicar, mensaje = resultado
         
         if not exito_aplicar:
-            # Si algo sale mal al aplicar, muestra un error
+            # Si algo sale mal al aplicar, muestra un error. config_original
+            # sigue siendo lo que tiene el kernel: reintentar vuelve a aplicarlo todo
+            self.statusbar.clearMessage()
             QMessageBox.critical(self, "Error al Aplicar", mensaje)
             return
+        if aplicada is not None:
+            self.config_original = aplicada
 
         # 3. Si todo salió bien, informa al usuario y cierra la app
         QMessageBox.information(self, "Éxito", 
@@ -612,6 +1158,19 @@ class NFSApp(QMainWindow):
 
         if respuesta == QMessageBox.StandardButton.Yes:
             self.close() # Cierra la aplicación
+
+    def closeEvent(self, evento):
+        """Detiene el vigilante de archivos y el muestreo antes de cerrar."""
+        self.vigilante.detener()
+        self.muestreo.detener()
+        # Un movimiento a otro disco a medias se corta limpio; se reanuda repitiéndolo
+        # (igual que un ajuste de permisos, que se salta lo ya hecho al repetirlo)
+        ocupadas = [clave for clave in ("mover", "permisos", "uso") if self.tareas.ocupado(clave)]
+        for clave in ocupadas:
+            self.tareas.cancelar(clave)
+        if ocupadas:
+            self.tareas.esperar()
+        super().closeEvent(evento)
     
 
 # --- PUNTO DE ENTRADA PRINCIPAL DE LA APLICACIÓN ---
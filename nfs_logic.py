@@ -1,9 +1,368 @@
 import os
-import subprocess
-import shlex # Para ejecutar comandos de forma segura
+import re
+import errno
+import sys
+import functools
+import hashlib
+import math
+import select
+import time
+import threading
+import stat
+import struct
+import contextlib
+from array import array
+from collections import deque
+from collections.abc import MutableMapping
 
 # La ruta al archivo de configuración
 EXPORTS_FILE = '/etc/exports' 
+# Otros archivos que describen las exportaciones y el estado del kernel
+EXPORTS_DIR = '/etc/exports.d'
+ETAB_FILE = '/var/lib/nfs/etab'
+PROC_EXPORTS_FILE = '/proc/fs/nfsd/exports'
+# Estadísticas del servidor y clientes conectados
+PROC_NFSD_STATS = '/proc/net/rpc/nfsd'
+PROC_NFSD_CLIENTS = '/proc/fs/nfsd/clients'
+RMTAB_FILE = '/var/lib/nfs/rmtab'
+
+# --- MEDICIÓN DE TIEMPOS ---
+# Cada operación (leer, serializar, escribir, fsync, cada proceso lanzado...)
+# se mide como un "tramo". Los tramos se anidan por hilo, sus duraciones van
+# a un histograma por nombre (percentiles sin guardar cada muestra) y,
+# si se pide, se guardan como eventos para abrirlos en un visor de trazas
+# (formato Trace Event de Chrome: chrome://tracing o Perfetto).
+
+class HistogramaLatencias:
+    """Histograma de cubos geométricos (x1.2) desde 1 µs; memoria fija."""
+    __slots__ = ('cuentas', 'total', 'suma', 'maximo')
+    BASE = 1e-6
+    FACTOR = 1.2
+    CUBOS = 110   # hasta ~ 500 s
+
+    def __init__(self):
+        self.cuentas = array('Q', bytes(8 * self.CUBOS))
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def anadir(self, segundos):
+        if segundos <= self.BASE:
+            cubo = 0
+        else:
+            cubo = min(self.CUBOS - 1, int(math.log(segundos / self.BASE, self.FACTOR)) + 1)
+        self.cuentas[cubo] += 1
+        self.total += 1
+        self.suma += segundos
+        self.maximo = max(self.maximo, segundos)
+
+    def percentil(self, p):
+        """Límite superior del cubo donde cae el percentil p (0-100), en segundos."""
+        if not self.total:
+            return 0.0
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for cubo, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if cuenta and acumulado >= objetivo:
+                return min(self.maximo, self.BASE * self.FACTOR ** cubo)
+        return self.maximo
+
+    def resumen(self):
+        return {"n": self.total, "media": self.suma / self.total if self.total else 0.0,
+                "p50": self.percentil(50), "p90": self.percentil(90),
+                "p99": self.percentil(99), "max": self.maximo}
+
+class Trazador:
+    """
+    Registro de tramos de tiempo. Uso:
+        with trazador.tramo("exports.escribir", bytes=1234): ...
+    o como decorador con @trazado("nombre").
+    """
+
+    def __init__(self, max_eventos=100000):
+        self.histogramas = {}
+        self.ultima_operacion = []   # [(nombre, segundos, profundidad, atributos)] del último tramo raíz
+        self.eventos = None          # deque de eventos Trace Event, solo si se graba
+        self.contar_asignaciones = False
+        self.max_eventos = max_eventos
+        self._local = threading.local()
+        self._cerrojo = threading.Lock()
+        self._origen = time.perf_counter()
+
+    def grabar(self, activo=True):
+        """Empieza (o deja) de guardar eventos para exportar_traza()."""
+        self.eventos = deque(maxlen=self.max_eventos) if activo else None
+
+    def medir_asignaciones(self, activo=True):
+        """Con activo=True cada tramo anota memoria asignada (tracemalloc) y bloques netos."""
+        import tracemalloc
+        self.contar_asignaciones = activo
+        if activo and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not activo and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def tramo(self, nombre, **atributos):
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+            self._local.completados = []
+        profundidad = len(pila)
+        pila.append(nombre)
+        asignaciones = None
+        if self.contar_asignaciones:
+            import tracemalloc
+            asignaciones = (sys.getallocatedblocks(), tracemalloc.get_traced_memory()[0])
+        inicio = time.perf_counter()
+        try:
+            yield atributos
+        finally:
+            duracion = time.perf_counter() - inicio
+            pila.pop()
+            if asignaciones is not None:
+                atributos["bloques"] = sys.getallocatedblocks() - asignaciones[0]
+                atributos["bytes_asignados"] = tracemalloc.get_traced_memory()[0] - asignaciones[1]
+            self._registrar(nombre, inicio, duracion, profundidad, atributos)
+
+    def _registrar(self, nombre, inicio, duracion, profundidad, atributos):
+        completados = self._local.completados
+        completados.append((inicio, nombre, duracion, profundidad, atributos))
+        with self._cerrojo:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = HistogramaLatencias()
+            histograma.anadir(duracion)
+            if self.eventos is not None:
+                self.eventos.append({
+                    "name": nombre, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                    "ts": (inicio - self._origen) * 1e6, "dur": duracion * 1e6,
+                    "args": {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in atributos.items()},
+                })
+            if profundidad == 0:
+                # Los hijos terminan antes que el padre: se ordena por inicio
+                completados.sort(key=lambda t: t[0])
+                self.ultima_operacion = [t[1:] for t in completados]
+                self._local.completados = []
+
+    def resumen(self):
+        """{nombre: {"n", "media", "p50", "p90", "p99", "max"}} en segundos."""
+        with self._cerrojo:
+            return {nombre: h.resumen() for nombre, h in sorted(self.histogramas.items())}
+
+    def reiniciar(self):
+        with self._cerrojo:
+            self.histogramas = {}
+            self.ultima_operacion = []
+            if self.eventos is not None:
+                self.eventos.clear()
+
+    def exportar_traza(self, ruta):
+        """Guarda los eventos grabados en 'ruta' (JSON Trace Event). Devuelve (bool, mensaje)."""
+        import json
+        with self._cerrojo:
+            eventos = list(self.eventos or ())
+        try:
+            with open(ruta, 'w') as f:
+                json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f)
+        except OSError as e:
+            return False, f"No se pudo guardar la traza: {e}"
+        return True, f"{len(eventos)} eventos guardados en {ruta}."
+
+trazador = Trazador()
+
+def trazado(nombre):
+    """Decorador: mide cada llamada a la función como un tramo 'nombre'."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with trazador.tramo(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def formatear_ultima_operacion(ultima=None):
+    """Árbol de tiempos del último tramo raíz, con sangría por nivel."""
+    ultima = trazador.ultima_operacion if ultima is None else ultima
+    if not ultima:
+        return "Todavía no se ha medido ninguna operación."
+    lineas = []
+    for nombre, duracion, profundidad, atributos in ultima:
+        extra = ", ".join(f"{k}={v}" for k, v in atributos.items())
+        lineas.append(f"{'  ' * profundidad}{nombre}: {duracion * 1000:.2f} ms" + (f"  ({extra})" if extra else ""))
+    return "\n".join(lineas)
+
+def formatear_resumen_tiempos(resumen=None):
+    """Tabla de percentiles por operación, en milisegundos."""
+    resumen = trazador.resumen() if resumen is None else resumen
+    lineas = [f"{'operación':<28} {'n':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"]
+    for nombre, r in resumen.items():
+        lineas.append(f"{nombre:<28} {r['n']:>6} " + " ".join(
+            f"{r[k] * 1000:>9.2f}" for k in ("p50", "p90", "p99", "max")))
+    return "\n".join(lineas)
+
+# --- MODELO COMPACTO DE EXPORTACIONES ---
+# Con cientos de miles de hosts, una lista de dicts por directorio ocupa
+# cientos de MB. HostRule usa __slots__ y cadenas internadas (sys.intern),
+# así que los hosts y opciones repetidos comparten el mismo objeto.
+
+class HostRule:
+    """
+    Una entrada "host(opciones)" de un directorio exportado. Es inmutable:
+    para cambiarla se crea otra. Admite rule["host"] y rule["options"]
+    para seguir funcionando donde antes había un dict.
+    """
+    __slots__ = ('host', 'options')
+
+    def __init__(self, host, options):
+        object.__setattr__(self, 'host', sys.intern(host))
+        object.__setattr__(self, 'options', sys.intern(options))
+
+    @classmethod
+    def desde(cls, valor):
+        """Convierte un dict {"host", "options"} (o una HostRule) en HostRule."""
+        if isinstance(valor, cls):
+            return valor
+        return cls(valor["host"], valor["options"])
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("HostRule es inmutable; cree una nueva regla.")
+
+    @property
+    def opciones(self):
+        """Las opciones analizadas (ExportOptions, compartida por todas las reglas equivalentes)."""
+        return ExportOptions.analizar(self.options)
+
+    def __getitem__(self, clave):
+        if clave == "host":
+            return self.host
+        if clave == "options":
+            return self.options
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def keys(self):
+        return ("host", "options")
+
+    def __eq__(self, otra):
+        if isinstance(otra, HostRule):
+            return self.host == otra.host and self.options == otra.options
+        if isinstance(otra, dict):
+            return otra.get("host") == self.host and otra.get("options") == self.options
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.host, self.options))
+
+    def __repr__(self):
+        return f"HostRule({self.host!r}, {self.options!r})"
+
+class _ListaReglas(list):
+    """Lista de HostRule que convierte al vuelo los dicts que se le añadan."""
+    __slots__ = ()
+
+    def __init__(self, reglas=()):
+        super().__init__(HostRule.desde(r) for r in reglas)
+
+    def append(self, regla):
+        super().append(HostRule.desde(regla))
+
+    def insert(self, indice, regla):
+        super().insert(indice, HostRule.desde(regla))
+
+    def extend(self, reglas):
+        super().extend(HostRule.desde(r) for r in reglas)
+
+    def __setitem__(self, indice, valor):
+        if isinstance(indice, slice):
+            super().__setitem__(indice, [HostRule.desde(r) for r in valor])
+        else:
+            super().__setitem__(indice, HostRule.desde(valor))
+
+class ExportTable(MutableMapping):
+    """
+    Tabla de exportaciones: {directorio: [HostRule, ...]}.
+    Se comporta como el dict de listas de antes, así que la GUI y
+    escribir_configuracion_exports no necesitan saber la diferencia.
+    """
+    __slots__ = ('_datos', '_disposicion', '_archivos', '_origen')
+
+    def __init__(self, datos=None):
+        self._datos = {}
+        # Cómo estaba escrito el archivo (_Disposicion): dónde empieza cada
+        # bloque y qué directorio declara. Permite al escritor re-emitir
+        # intactas las líneas que no cambiaron.
+        self._disposicion = None
+        # Solo en tablas de varios archivos (leer_configuracion_completa):
+        # {ruta: disposición} de cada archivo y {directorio: ruta de donde vino}
+        self._archivos = None
+        self._origen = None
+        if datos:
+            for directorio, reglas in datos.items():
+                self[directorio] = reglas
+
+    def __getitem__(self, directorio):
+        return self._datos[directorio]
+
+    def __setitem__(self, directorio, reglas):
+        if not isinstance(reglas, _ListaReglas):
+            reglas = _ListaReglas(reglas)
+        self._datos[sys.intern(directorio)] = reglas
+
+    def __delitem__(self, directorio):
+        del self._datos[directorio]
+        if self._origen is not None:
+            self._origen.pop(directorio, None)
+
+    def __iter__(self):
+        return iter(self._datos)
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, directorio):
+        return directorio in self._datos
+
+    def setdefault(self, directorio, reglas=()):
+        # MutableMapping.setdefault devolvería la lista original, no la convertida
+        if directorio not in self._datos:
+            self[directorio] = reglas
+        return self._datos[directorio]
+
+    def __repr__(self):
+        return f"ExportTable({self._datos!r})"
+
+    def copia(self):
+        """Copia barata: listas nuevas, pero las HostRule (inmutables) se comparten."""
+        nueva = ExportTable()
+        for directorio, reglas in self._datos.items():
+            lista = _ListaReglas()
+            list.extend(lista, reglas)
+            nueva._datos[directorio] = lista
+        nueva._disposicion = self._disposicion
+        if self._archivos is not None:
+            nueva._archivos = dict(self._archivos)
+            nueva._origen = dict(self._origen)
+        return nueva
+
+    def origen(self, directorio):
+        """Archivo del que procede un directorio (None si la tabla es de un solo archivo)."""
+        return self._origen.get(directorio) if self._origen is not None else None
+
+    def asignar_origen(self, directorio, ruta):
+        """Indica en qué archivo debe guardarse un directorio (tablas de varios archivos)."""
+        if self._origen is not None:
+            self._origen[directorio] = ruta
+
+    def total_reglas(self):
+        """Número total de entradas host(opciones) en la tabla."""
+        return sum(len(reglas) for reglas in self._datos.values())
 
 def verificar_directorio(path):
     """Comprueba si una ruta de directorio existe."""
@@ -37,121 +396,3448 @@ def crear_directorio(path):
     except Exception as e:
         return False, f"Error inesperado: {e}"
 
+# --- VALIDACIÓN DE RUTAS Y HOSTS ---
+# Expresiones compiladas una sola vez y compartidas por la GUI, nfsctl y el
+# importador de inventarios.
+_PATRON_DIRECTORIO = re.compile(r'^/[a-zA-Z0-9_\-/]+$')
+_PATRON_NOMBRE_HOST = re.compile(
+    r'^(?=.{1,253}$)[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?(\.[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?)*$',
+    re.IGNORECASE)
+_PATRON_COMODIN = re.compile(r'^[a-z0-9_*?\[\]\-.]{1,253}$', re.IGNORECASE)
+_PATRON_SOLO_NUMEROS = re.compile(r'^[\d.]+$')
+
+MENSAJE_HOST_INVALIDO = ("El host debe ser '*', una IP (IPv4/IPv6), una red (ej. 192.168.1.0/24), "
+                         "un nombre de host, un comodín (ej. *.empresa.com) o un @netgroup.")
+
+def validar_directorio(ruta):
+    """True si la ruta es absoluta y solo tiene letras, números, _, - y /."""
+    return bool(_PATRON_DIRECTORIO.match(ruta))
+
+@functools.lru_cache(maxsize=65536)
+def validar_host(host):
+    """
+    Comprueba una especificación de host de /etc/exports.
+    Devuelve (True, tipo) o (False, mensaje de error).
+    """
+    import ipaddress
+    if not host:
+        return False, "El host no puede estar vacío."
+    if host == '*':
+        return True, "anónimo"
+    if host.startswith('@'):
+        if _PATRON_NOMBRE_HOST.match(host[1:]):
+            return True, "netgroup"
+        return False, f"Netgroup inválido: '{host}'."
+    if '/' in host:
+        try:
+            ipaddress.ip_network(host, strict=False)
+            return True, "red"
+        except ValueError:
+            return False, f"Red inválida: '{host}'."
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True, "ip"
+    except ValueError:
+        pass
+    if _PATRON_SOLO_NUMEROS.match(host):
+        # Parece una IPv4 pero no lo es (p. ej. 999.1.1.1)
+        return False, f"IP inválida: '{host}'."
+    if any(c in host for c in '*?['):
+        if _PATRON_COMODIN.match(host):
+            return True, "comodín"
+        return False, f"Comodín inválido: '{host}'."
+    if _PATRON_NOMBRE_HOST.match(host):
+        return True, "nombre"
+    return False, f"Host inválido: '{host}'."
+
+def validar_hosts(hosts):
+    """Valida muchos hosts de una vez (los repetidos solo se comprueban una vez). {host: (bool, msg)}"""
+    return {host: validar_host(host) for host in set(hosts)}
+
+# --- APROVISIONAMIENTO MASIVO DE DIRECTORIOS ---
+# Para dar de alta cientos de directorios (a veces en sistemas de archivos
+# de red lentos) se comprueban y crean en paralelo, con un número limitado
+# de hilos, y se devuelve un informe por ruta en lugar de preguntar una a una.
+
+HILOS_APROVISIONAMIENTO = 8
+
+def verificar_directorios(rutas, max_hilos=HILOS_APROVISIONAMIENTO):
+    """Comprueba en paralelo qué rutas existen. Devuelve {ruta: bool}."""
+    from concurrent.futures import ThreadPoolExecutor
+    rutas = list(dict.fromkeys(rutas))
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        return dict(zip(rutas, pool.map(verificar_directorio, rutas)))
+
+def crear_directorios(rutas, max_hilos=HILOS_APROVISIONAMIENTO, progreso=None):
+    """
+    Crea en paralelo (makedirs + chmod, como crear_directorio) las rutas dadas.
+    Devuelve [{"ruta", "exito", "mensaje"}, ...] en el mismo orden.
+    'progreso(hechos, total, mensaje)' se llama al terminar cada ruta, con un
+    mensaje que dice cuál se creó o por qué falló.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    rutas = list(dict.fromkeys(rutas))
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        futuros = {pool.submit(crear_directorio, ruta): ruta for ruta in rutas}
+        for hechos, futuro in enumerate(as_completed(futuros), 1):
+            ruta = futuros[futuro]
+            exito, mensaje = futuro.result()
+            resultados[ruta] = {"ruta": ruta, "exito": exito, "mensaje": mensaje}
+            if progreso:
+                progreso(hechos, len(rutas), f"Directorio creado: {ruta}" if exito
+                         else f"No se pudo crear {ruta}: {mensaje}")
+    return [resultados[ruta] for ruta in rutas]
+
+def provisionar_directorios(rutas, crear=True, max_hilos=HILOS_APROVISIONAMIENTO, progreso=None):
+    """
+    Comprueba todas las rutas y (si crear=True) crea las que falten.
+    Devuelve [{"ruta", "existia", "exito", "mensaje"}, ...] en el orden recibido.
+    """
+    existe = verificar_directorios(rutas, max_hilos)
+    faltan = [ruta for ruta, si in existe.items() if not si]
+    creados = {}
+    if crear and faltan:
+        creados = {r["ruta"]: r for r in crear_directorios(faltan, max_hilos, progreso)}
+
+    informe = []
+    for ruta in existe:
+        if existe[ruta]:
+            informe.append({"ruta": ruta, "existia": True, "exito": True, "mensaje": "Ya existía."})
+        elif ruta in creados:
+            informe.append(dict(creados[ruta], existia=False))
+        else:
+            informe.append({"ruta": ruta, "existia": False, "exito": False, "mensaje": "No existe."})
+    return informe
+
+def resumir_aprovisionamiento(informe):
+    """Texto breve para mostrar al usuario: cuántas existían, se crearon o fallaron."""
+    existian = sum(1 for r in informe if r["existia"])
+    creadas = sum(1 for r in informe if not r["existia"] and r["exito"])
+    fallos = [r for r in informe if not r["exito"]]
+    lineas = [f"{existian} ya existían, {creadas} creadas, {len(fallos)} con error."]
+    lineas += [f"  {r['ruta']}: {r['mensaje']}" for r in fallos[:20]]
+    if len(fallos) > 20:
+        lineas.append(f"  ... y {len(fallos) - 20} más.")
+    return "\n".join(lineas)
+
+
+# --- PERMISOS DEL CONTENIDO EXPORTADO ---
+# Con all_squash todos los clientes escriben como anonuid:anongid, así que
+# el contenido ya existente debe pertenecer a ese usuario o los clientes
+# reciben "Permission denied". El árbol se recorre con scandir repartiendo
+# los directorios entre varios hilos; solo se toca lo que no coincide, de
+# modo que repetir la tarea sobre un árbol ya ajustado solo cuesta leerlo.
+
+HILOS_PERMISOS = 16
+# Mayor uid/gid utilizable: (uid_t)-1 está reservado para "no cambiar"
+MAX_ID_ANONIMO = 2**32 - 2
+
+def permisos_implicados(opciones):
+    """
+    Dueño y bits de permiso que exigen unas opciones de exportación.
+    Devuelve (permisos, mensaje): permisos es {"uid", "gid", "modo_dirs",
+    "modo_archivos"} (los modos son bits que se añaden, no se quitan) o None
+    si las opciones no implican ningún dueño o anonuid/anongid no son válidos.
+    """
+    efectivas = dict(o.partition('=')[::2] for o in normalizar_opciones(opciones))
+    if "all_squash" not in efectivas:
+        return None, "Las opciones no incluyen all_squash: no hay un dueño que imponer."
+    ids = {}
+    for clave in ("anonuid", "anongid"):
+        valor = efectivas[clave]
+        if not valor.isascii() or not valor.isdigit() or int(valor) > MAX_ID_ANONIMO:
+            return None, f"{clave}={valor} no es un identificador numérico válido."
+        ids[clave] = int(valor)
+    escritura = "rw" in efectivas
+    permisos = {"uid": ids["anonuid"], "gid": ids["anongid"],
+                "modo_dirs": 0o700 if escritura else 0o500,
+                "modo_archivos": 0o600 if escritura else 0o400}
+    return permisos, f"Dueño {permisos['uid']}:{permisos['gid']}."
+
+def permisos_de_reglas(reglas):
+    """
+    Permisos que exigen todas las reglas de un directorio juntas.
+    Devuelve (permisos, mensaje); permisos es None si ninguna regla los
+    implica o si dos reglas all_squash piden dueños distintos.
+    """
+    elegidos = None
+    for regla in reglas:
+        permisos, mensaje = permisos_implicados(regla.options)
+        if permisos is None:
+            if regla.opciones.tiene("all_squash"):
+                return None, mensaje
+            continue
+        if elegidos is None:
+            elegidos = dict(permisos)
+        elif (elegidos["uid"], elegidos["gid"]) != (permisos["uid"], permisos["gid"]):
+            return None, (f"Las reglas piden dueños distintos ({elegidos['uid']}:{elegidos['gid']} "
+                          f"y {permisos['uid']}:{permisos['gid']}).")
+        else:
+            elegidos["modo_dirs"] |= permisos["modo_dirs"]
+            elegidos["modo_archivos"] |= permisos["modo_archivos"]
+    if elegidos is None:
+        return None, "Ninguna regla usa all_squash: no hay un dueño que imponer."
+    return elegidos, f"Dueño {elegidos['uid']}:{elegidos['gid']}."
+
+def _ajustar_entrada(ruta, st, uid, gid, modo_extra, errores):
+    """Cambia dueño y modo de una entrada si no coinciden. Devuelve True si la tocó."""
+    cambiada = False
+    try:
+        if (uid is not None and st.st_uid != uid) or (gid is not None and st.st_gid != gid):
+            os.chown(ruta, -1 if uid is None else uid, -1 if gid is None else gid, follow_symlinks=False)
+            cambiada = True
+        # Los enlaces simbólicos no tienen modo propio en Linux
+        if modo_extra and not stat.S_ISLNK(st.st_mode) and (st.st_mode & modo_extra) != modo_extra:
+            # chown puede haber quitado setuid/setgid: se parte del modo leído
+            os.chmod(ruta, stat.S_IMODE(st.st_mode) | modo_extra)
+            cambiada = True
+    except OSError as e:
+        errores.append(f"{ruta}: {e.strerror}")
+    return cambiada
+
+def _ajustar_directorio(ruta, dispositivo, uid, gid, modo_dirs, modo_archivos):
+    """
+    Ajusta el contenido directo de 'ruta' sin tocar los puntos de montaje
+    (subdirectorios de otro dispositivo). Devuelve (subdirectorios, revisadas,
+    cambiadas, errores).
+    """
+    subdirectorios, revisadas, cambiadas, errores = [], 0, 0, []
+    try:
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                try:
+                    st = entrada.stat(follow_symlinks=False)
+                except OSError as e:
+                    errores.append(f"{entrada.path}: {e.strerror}")
+                    continue
+                es_dir = stat.S_ISDIR(st.st_mode)
+                if es_dir and st.st_dev != dispositivo:
+                    continue  # Punto de montaje: otro sistema de archivos, no se cruza (como du -x)
+                revisadas += 1
+                cambiadas += _ajustar_entrada(entrada.path, st, uid, gid,
+                                              modo_dirs if es_dir else modo_archivos, errores)
+                if es_dir:
+                    subdirectorios.append(entrada.path)
+    except OSError as e:
+        errores.append(f"{ruta}: {e.strerror}")
+    return subdirectorios, revisadas, cambiadas, errores
+
+@trazado("fs.permisos")
+def aplicar_permisos_arbol(raiz, uid=None, gid=None, modo_dirs=0, modo_archivos=0,
+                           max_hilos=HILOS_PERMISOS, progreso=None, cancelacion=None):
+    """
+    Pone dueño uid:gid (None = no tocar) y añade los bits de modo a todo el
+    árbol 'raiz' sin seguir enlaces simbólicos ni cruzar a otros sistemas de
+    archivos montados dentro.
+    'progreso(hechos, total, mensaje)' cuenta directorios (el total crece
+    según se descubren). Devuelve {"revisadas", "cambiadas", "errores",
+    "segundos", "cancelado"}.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    inicio = time.monotonic()
+    informe = {"revisadas": 1, "cambiadas": 0, "errores": [], "segundos": 0.0, "cancelado": False}
+    try:
+        st = os.lstat(raiz)
+    except OSError as e:
+        informe["errores"].append(f"{raiz}: {e.strerror}")
+        return informe
+    if not stat.S_ISDIR(st.st_mode):
+        informe["errores"].append(f"{raiz}: no es un directorio")
+        return informe
+    informe["cambiadas"] += _ajustar_entrada(raiz, st, uid, gid, modo_dirs, informe["errores"])
+
+    hechos, descubiertos, ultimo_aviso = 0, 1, 0.0
+    with ThreadPoolExecutor(max_workers=max(1, max_hilos)) as pool:
+        pendientes = {pool.submit(_ajustar_directorio, raiz, st.st_dev, uid, gid, modo_dirs, modo_archivos)}
+        while pendientes:
+            listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                subdirectorios, revisadas, cambiadas, errores = futuro.result()
+                hechos += 1
+                informe["revisadas"] += revisadas
+                informe["cambiadas"] += cambiadas
+                informe["errores"].extend(errores)
+                if cancelacion is not None and cancelacion.cancelado:
+                    informe["cancelado"] = True
+                    continue
+                descubiertos += len(subdirectorios)
+                pendientes.update(pool.submit(_ajustar_directorio, d, st.st_dev, uid, gid, modo_dirs, modo_archivos)
+                                  for d in subdirectorios)
+            ahora = time.monotonic()
+            if progreso and (ahora - ultimo_aviso >= 0.25 or not pendientes):
+                ultimo_aviso = ahora
+                velocidad = informe["revisadas"] / max(ahora - inicio, 1e-6)
+                progreso(hechos, descubiertos, f"{informe['revisadas']} entradas revisadas, "
+                                               f"{informe['cambiadas']} cambiadas ({velocidad:.0f}/s)")
+    informe["segundos"] = time.monotonic() - inicio
+    return informe
+
+def resumir_permisos(informe, limite=20):
+    """Texto breve del resultado de aplicar_permisos_arbol."""
+    segundos = max(informe["segundos"], 1e-6)
+    lineas = [f"{informe['revisadas']} entradas revisadas, {informe['cambiadas']} cambiadas, "
+              f"{len(informe['errores'])} con error, en {informe['segundos']:.1f} s "
+              f"({informe['revisadas'] / segundos:.0f} entradas/s)."]
+    if informe["cancelado"]:
+        lineas.append("Cancelado: repita la operación para terminar (lo ya ajustado se salta).")
+    lineas += [f"  {error}" for error in informe["errores"][:limite]]
+    if len(informe["errores"]) > limite:
+        lineas.append(f"  ... y {len(informe['errores']) - limite} más.")
+    return "\n".join(lineas)
+
+
+# --- USO DE DISCO POR EXPORTACIÓN ---
+# Como 'du -sx', pero con memoria: de cada directorio se guarda su mtime,
+# lo que ocupan sus archivos y la lista de subdirectorios. Crear, borrar o
+# renombrar una entrada cambia el mtime del directorio que la contiene, así
+# que en un nuevo recorrido basta un stat por directorio y solo se vuelven
+# a leer (scandir + stat de cada archivo) los que cambiaron. Lo que no
+# cambia el mtime (un archivo que crece) se recoge con completo=True.
+# La caché es del sistema, como las exportaciones que describe: la GUI y
+# nfsctl se ejecutan como root y comparten el mismo archivo.
+
+HILOS_USO = 16
+CACHE_USO_FILE = '/var/cache/miappnfs/uso_disco.json'
+
+def _leer_directorio_uso(ruta, dispositivo):
+    """Lee un directorio: (bytes de sus archivos, número de archivos, subdirectorios del mismo disco)."""
+    ocupado, archivos, subdirectorios = 0, 0, []
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            try:
+                st = entrada.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                if st.st_dev == dispositivo:  # no se cruza a otros montajes (du -x)
+                    subdirectorios.append(entrada.name)
+            else:
+                # Espacio real en disco, como du (los archivos dispersos cuentan lo escrito)
+                ocupado += st.st_blocks * 512
+                archivos += 1
+    return ocupado, archivos, subdirectorios
+
+class EscanerUso:
+    """
+    Mide lo que ocupa cada exportación reutilizando lo medido antes.
+    La caché es un diccionario ruta -> [mtime_ns, bytes, archivos, subdirectorios]
+    que se guarda en 'ruta_cache' (None = solo en memoria).
+    """
+
+    def __init__(self, ruta_cache=CACHE_USO_FILE, max_hilos=HILOS_USO):
+        self.ruta_cache = ruta_cache
+        self.max_hilos = max_hilos
+        self._cache = None
+        self._cerrojo = threading.Lock()   # en_cache() y medir() pueden coincidir en hilos distintos
+
+    def _cargar(self):
+        import json
+        with self._cerrojo:
+            if self._cache is None:
+                self._cache = {}
+                if self.ruta_cache:
+                    try:
+                        with open(self.ruta_cache, encoding='utf-8', errors='surrogateescape') as f:
+                            datos = json.load(f)
+                        if datos.get("version") == 1:
+                            self._cache = datos["directorios"]
+                    except (OSError, ValueError, KeyError, AttributeError):
+                        pass # Caché ausente o dañada: se mide todo de nuevo
+            return self._cache
+
+    def guardar(self):
+        """Guarda la caché (temporal + rename; si falla se pierde solo la caché)."""
+        import json
+        import tempfile
+        if not self.ruta_cache or self._cache is None:
+            return False, "Sin caché que guardar."
+        try:
+            os.makedirs(os.path.dirname(self.ruta_cache), exist_ok=True)
+            fd, ruta_tmp = tempfile.mkstemp(prefix='.uso.', dir=os.path.dirname(self.ruta_cache))
+            with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                json.dump({"version": 1, "directorios": self._cache}, f, separators=(',', ':'))
+            os.replace(ruta_tmp, self.ruta_cache)
+            return True, f"Caché de uso guardada en {self.ruta_cache}."
+        except OSError as e:
+            return False, f"No se pudo guardar la caché de uso: {e}"
+
+    def _medir_directorio(self, ruta, dispositivo, completo):
+        """Un directorio: usa la caché si su mtime no cambió. Devuelve (ruta, entrada, releído)."""
+        st = os.lstat(ruta)
+        anterior = self._cache.get(ruta)
+        if not completo and anterior is not None and anterior[0] == st.st_mtime_ns:
+            return ruta, anterior, False
+        ocupado, archivos, subdirectorios = _leer_directorio_uso(ruta, dispositivo)
+        # El propio directorio también ocupa bloques
+        return ruta, [st.st_mtime_ns, ocupado + st.st_blocks * 512, archivos, subdirectorios], True
+
+    def en_cache(self, rutas, exportaciones=None):
+        """
+        Lo último medido de cada ruta, sin tocar el disco: se suma lo guardado
+        siguiendo las listas de subdirectorios de la caché. Las rutas que nunca
+        se midieron no aparecen en el resultado. Mismo formato que medir().
+        """
+        cache = self._cargar()
+        limites = set(exportaciones or ()) | set(rutas)
+        resultados = {}
+        for raiz in rutas:
+            if raiz not in cache:
+                continue
+            total = {"bytes": 0, "archivos": 0, "directorios": 0, "releidos": 0, "error": None}
+            pendientes = [raiz]
+            while pendientes:
+                ruta = pendientes.pop()
+                entrada = cache.get(ruta)
+                if entrada is None:
+                    continue
+                total["bytes"] += entrada[1]
+                total["archivos"] += entrada[2]
+                total["directorios"] += 1
+                for nombre in entrada[3]:
+                    subdirectorio = os.path.join(ruta, nombre)
+                    if subdirectorio not in limites:
+                        pendientes.append(subdirectorio)
+            resultados[raiz] = total
+        return resultados
+
+    @trazado("fs.uso")
+    def medir(self, rutas, completo=False, progreso=None, cancelacion=None, exportaciones=None):
+        """
+        Mide todas las 'rutas' a la vez, repartiendo los directorios entre hilos.
+        'exportaciones' son todas las de la configuración (por defecto, 'rutas'):
+        las que están anidadas en una ruta medida no se suman a ella.
+        Devuelve {ruta: {"bytes", "archivos", "directorios", "releidos", "error"}}.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        cache = self._cargar()
+        rutas = list(dict.fromkeys(rutas))
+        limites = set(exportaciones or ()) - set(rutas)
+        resultados = {r: {"bytes": 0, "archivos": 0, "directorios": 0, "releidos": 0, "error": None}
+                      for r in rutas}
+        nueva = {}
+        inicio, ultimo_aviso, hechos, descubiertos = time.monotonic(), 0.0, 0, 0
+        with ThreadPoolExecutor(max_workers=max(1, self.max_hilos)) as pool:
+            pendientes = {}
+            for raiz in rutas:
+                try:
+                    st = os.stat(raiz)
+                except OSError as e:
+                    resultados[raiz]["error"] = e.strerror
+                    continue
+                if not stat.S_ISDIR(st.st_mode):
+                    resultados[raiz]["error"] = "no es un directorio"
+                    continue
+                pendientes[pool.submit(self._medir_directorio, raiz, st.st_dev, completo)] = (raiz, st.st_dev)
+                descubiertos += 1
+            while pendientes:
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    raiz, dispositivo = pendientes.pop(futuro)
+                    hechos += 1
+                    try:
+                        ruta, entrada, releido = futuro.result()
+                    except OSError:
+                        continue # Borrado o sin permiso mientras se recorría
+                    nueva[ruta] = entrada
+                    total = resultados[raiz]
+                    total["bytes"] += entrada[1]
+                    total["archivos"] += entrada[2]
+                    total["directorios"] += 1
+                    total["releidos"] += releido
+                    if cancelacion is not None and cancelacion.cancelado:
+                        continue
+                    for nombre in entrada[3]:
+                        subdirectorio = os.path.join(ruta, nombre)
+                        if subdirectorio in resultados or subdirectorio in limites:
+                            continue # Otra exportación anidada: se mide por separado
+                        futuro = pool.submit(self._medir_directorio, subdirectorio, dispositivo, completo)
+                        pendientes[futuro] = (raiz, dispositivo)
+                        descubiertos += 1
+                ahora = time.monotonic()
+                if progreso and (ahora - ultimo_aviso >= 0.25 or not pendientes):
+                    ultimo_aviso = ahora
+                    progreso(hechos, descubiertos, f"Midiendo uso de disco: {hechos} directorios "
+                                                   f"({hechos / max(ahora - inicio, 1e-6):.0f}/s)")
+
+        if cancelacion is None or not cancelacion.cancelado:
+            # Se olvidan los directorios que ya no existen dentro de lo medido
+            # (lo que cuelga de otra exportación anidada no se ha recorrido)
+            prefijos = tuple(r.rstrip('/') + '/' for r in rutas)
+            ajenos = tuple(r.rstrip('/') + '/' for r in limites if r.startswith(prefijos))
+            for ruta in [r for r in cache if r in resultados or r.startswith(prefijos)]:
+                if ruta not in nueva and ruta not in limites and not (ajenos and ruta.startswith(ajenos)):
+                    del cache[ruta]
+        cache.update(nueva)
+        return resultados
+
+_escaner_uso = None
+
+def _escaner_compartido():
+    global _escaner_uso
+    if _escaner_uso is None:
+        _escaner_uso = EscanerUso()
+    return _escaner_uso
+
+def medir_uso_exportaciones(rutas=None, completo=False, guardar=True, progreso=None, cancelacion=None,
+                            exportaciones=None):
+    """
+    Uso de disco de cada exportación (por defecto, todas las de la
+    configuración), con la caché persistente compartida. Ver EscanerUso.medir.
+    """
+    escaner = _escaner_compartido()
+    if rutas is None:
+        rutas = list(leer_configuracion_completa())
+    resultados = escaner.medir(rutas, completo, progreso, cancelacion, exportaciones)
+    if guardar:
+        escaner.guardar()
+    return resultados
+
+def uso_en_cache(rutas, exportaciones=None):
+    """Último uso conocido de cada ruta, sin recorrer el disco. Ver EscanerUso.en_cache."""
+    return _escaner_compartido().en_cache(rutas, exportaciones)
+
+def formatear_uso(resultados):
+    """Tabla de texto: directorio, tamaño, archivos; de mayor a menor."""
+    lineas = []
+    for ruta, uso in sorted(resultados.items(), key=lambda par: -par[1]["bytes"]):
+        if uso["error"]:
+            lineas.append(f"{ruta:<40} {'-':>10}  ({uso['error']})")
+        else:
+            lineas.append(f"{ruta:<40} {formatear_bytes(uso['bytes']):>10}  {uso['archivos']} archivos")
+    return "\n".join(lineas)
+
+
+# --- CACHÉ DE LECTURA DE /etc/exports ---
+# Guarda el último resultado junto con la "huella" del archivo
+# (inodo, mtime_ns, tamaño, hash del contenido) y una memoria por línea,
+# para que las lecturas repetidas no vuelvan a analizar todo el archivo.
+# Cada archivo de /etc/exports.d tiene su propia caché con el mismo formato.
+def _cache_vacia():
+    return {
+        "clave_stat": None,   # (ruta, inodo, mtime_ns, tamaño)
+        "hash": None,         # sha1 del contenido
+        "lineas": {},         # línea lógica -> (directorio, (HostRule, ...)) o None
+        "resultado": None,    # estructura ya construida (no se entrega nunca directamente)
+        "aciertos": 0,
+        "fallos": 0,
+        "lineas_reanalizadas": 0,
+    }
+
+_cache_exports = _cache_vacia()
+_caches_exports_d = {}   # ruta -> caché de un archivo de /etc/exports.d
+# Las tareas "recargar" y "deriva" leen a la vez desde hilos distintos
+_cerrojo_cache_exports = threading.Lock()
+
+# --- OPCIONES COMO MÁSCARA DE BITS ---
+# Cada opción sí/no ocupa un bit y las dos de una pareja que se anulan
+# entre sí (rw/ro, sync/async...) ocupan bits vecinos, 2i y 2i+1. Así
+# "marcar rw desmarca ro" es flags & ~EXCLUSIONES['rw'] | BITS_OPCIONES['rw']
+# y "alguna pareja tiene las dos marcadas" es flags & (flags >> 1) & _MASCARA_PARES.
+# El orden de las parejas es también el orden de la forma canónica.
+_PAREJAS_OPCIONES = (
+    ('rw', 'ro'), ('sync', 'async'), ('root_squash', 'no_root_squash'),
+    ('all_squash', 'no_all_squash'), ('subtree_check', 'no_subtree_check'),
+    ('secure', 'insecure'), ('wdelay', 'no_wdelay'), ('hide', 'nohide'),
+    ('crossmnt', 'nocrossmnt'), ('secure_locks', 'insecure_locks'),
+    ('acl', 'no_acl'), ('pnfs', 'no_pnfs'),
+)
+BITS_OPCIONES = {nombre: 1 << (2 * i + j)
+                 for i, pareja in enumerate(_PAREJAS_OPCIONES) for j, nombre in enumerate(pareja)}
+_NOMBRES_BITS = tuple(sorted(BITS_OPCIONES, key=BITS_OPCIONES.get))
+_MASCARA_PARES = sum(1 << (2 * i) for i in range(len(_PAREJAS_OPCIONES)))
+
+# Pares de opciones que se anulan entre sí al combinar las opciones
+# por defecto de una línea ("-ro") con las propias de cada host.
+_OPCIONES_OPUESTAS = {a: b for pareja in _PAREJAS_OPCIONES for a, b in (pareja, pareja[::-1])}
+# Bit que se apaga al marcar cada opción (el de su pareja)
+EXCLUSIONES = {nombre: BITS_OPCIONES[_OPCIONES_OPUESTAS[nombre]] for nombre in BITS_OPCIONES}
+# Nombres antiguos que exportfs sigue aceptando
+_ALIAS_OPCIONES = {'no_auth_nlm': 'insecure_locks', 'auth_nlm': 'secure_locks'}
+# Orden de las opciones con valor en la forma canónica (el resto, alfabético)
+_ORDEN_VALORES = {'anonuid': 0, 'anongid': 1, 'fsid': 2, 'sec': 3}
+
+class ExportOptions:
+    """
+    Opciones de una regla ya analizadas e inmutables:
+    - flags:     máscara de BITS_OPCIONES
+    - valores:   tupla ordenada de (clave, valor): anonuid, anongid, fsid, sec...
+    - otras:     opciones sin pareja ni valor (mp, no_acl de otros sistemas...)
+    - repetidas: (clave, valor1, valor2) si una clave aparece con dos valores
+    Dos textos equivalentes ("rw,sync" y "sync,rw") dan el mismo objeto con
+    ExportOptions.analizar, así que comparar suele ser comparar identidades.
+    """
+    __slots__ = ('flags', 'valores', 'otras', 'repetidas', '_texto')
+
+    def __init__(self, flags=0, valores=(), otras=(), repetidas=()):
+        valores = dict(valores)
+        object.__setattr__(self, 'flags', flags)
+        object.__setattr__(self, 'valores', tuple(sorted(
+            valores.items(), key=lambda par: (_ORDEN_VALORES.get(par[0], len(_ORDEN_VALORES)), par[0]))))
+        object.__setattr__(self, 'otras', tuple(otras))
+        object.__setattr__(self, 'repetidas', tuple(repetidas))
+        object.__setattr__(self, '_texto', None)
+
+    @classmethod
+    def analizar(cls, texto):
+        """Opciones de un texto "rw,sync,anonuid=1000" (compartidas entre textos equivalentes)."""
+        return _analizar_opciones(texto or "")
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("ExportOptions es inmutable; use con() o sin().")
+
+    def _clave(self):
+        return (self.flags, self.valores, self.otras, self.repetidas)
+
+    def __eq__(self, otra):
+        if self is otra:
+            return True
+        if isinstance(otra, ExportOptions):
+            return self._clave() == otra._clave()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._clave())
+
+    def __repr__(self):
+        return f"ExportOptions({self.texto()!r})"
+
+    def __str__(self):
+        return self.texto()
+
+    def texto(self):
+        """Forma canónica: opciones sí/no en el orden de _PAREJAS_OPCIONES, luego las demás."""
+        if self._texto is None:
+            partes = [nombre for nombre in _NOMBRES_BITS if self.flags & BITS_OPCIONES[nombre]]
+            partes += self.otras
+            partes += [f"{clave}={valor}" for clave, valor in self.valores]
+            object.__setattr__(self, '_texto', sys.intern(",".join(partes)))
+        return self._texto
+
+    def tiene(self, nombre):
+        bit = BITS_OPCIONES.get(nombre)
+        if bit is not None:
+            return bool(self.flags & bit)
+        return nombre in self.otras or any(clave == nombre for clave, _ in self.valores)
+
+    def valor(self, clave, defecto=None):
+        for nombre, valor in self.valores:
+            if nombre == clave:
+                return valor
+        return defecto
+
+    def con(self, nombre, valor=None):
+        """Copia con 'nombre' marcado (y su opuesta desmarcada) o con clave=valor."""
+        nombre = _ALIAS_OPCIONES.get(nombre, nombre)
+        bit = BITS_OPCIONES.get(nombre)
+        if bit is not None:
+            return _internar_opciones(ExportOptions((self.flags & ~EXCLUSIONES[nombre]) | bit,
+                                                    self.valores, self.otras))
+        if valor is not None:
+            return _internar_opciones(ExportOptions(self.flags, dict(self.valores, **{nombre: valor}), self.otras))
+        otras = self.otras if nombre in self.otras else self.otras + (nombre,)
+        return _internar_opciones(ExportOptions(self.flags, self.valores, otras))
+
+    def sin(self, nombre):
+        """Copia sin 'nombre' (sea opción sí/no, con valor u otra)."""
+        nombre = _ALIAS_OPCIONES.get(nombre, nombre)
+        return _internar_opciones(ExportOptions(
+            self.flags & ~BITS_OPCIONES.get(nombre, 0),
+            [(c, v) for c, v in self.valores if c != nombre],
+            [o for o in self.otras if o != nombre]))
+
+    def contradicciones(self):
+        """Parejas marcadas a la vez, como [('rw', 'ro')]. Vacía en el caso normal sin recorrer nada."""
+        choque = self.flags & (self.flags >> 1) & _MASCARA_PARES
+        resultado = []
+        while choque:
+            bit = choque & -choque
+            resultado.append(_PAREJAS_OPCIONES[bit.bit_length() // 2])
+            choque ^= bit
+        return resultado
+
+    def diferencias(self, otra):
+        """Lo que cambia de self a 'otra': (añadidas, quitadas), como textos de opción."""
+        cambio = self.flags ^ otra.flags
+        anadidas = [n for n in _NOMBRES_BITS if cambio & otra.flags & BITS_OPCIONES[n]]
+        quitadas = [n for n in _NOMBRES_BITS if cambio & self.flags & BITS_OPCIONES[n]]
+        anadidas += [o for o in otra.otras if o not in self.otras]
+        quitadas += [o for o in self.otras if o not in otra.otras]
+        anadidas += [f"{c}={v}" for c, v in otra.valores if (c, v) not in self.valores]
+        quitadas += [f"{c}={v}" for c, v in self.valores if (c, v) not in otra.valores]
+        return anadidas, quitadas
+
+_opciones_internadas = {}
+
+def _internar_opciones(opciones):
+    """Devuelve el objeto ya existente igual a 'opciones' (o lo registra)."""
+    return _opciones_internadas.setdefault(opciones._clave(), opciones)
+
+@functools.lru_cache(maxsize=65536)
+def _analizar_opciones(texto):
+    flags, valores, otras, repetidas = 0, {}, [], []
+    for opcion in texto.split(','):
+        opcion = opcion.strip()
+        if not opcion:
+            continue
+        clave, igual, valor = opcion.partition('=')
+        clave = _ALIAS_OPCIONES.get(clave, clave)
+        bit = BITS_OPCIONES.get(clave)
+        if bit is not None and not igual:
+            flags |= bit
+        elif igual:
+            anterior = valores.get(clave)
+            if anterior is not None and anterior != valor:
+                repetidas.append((clave, anterior, valor))
+            valores[clave] = valor
+        elif clave not in otras:
+            otras.append(clave)
+    return _internar_opciones(ExportOptions(flags, valores, otras, repetidas))
+
+def _combinar_opciones(por_defecto, propias):
+    """
+    Aplica las opciones propias de un host sobre las opciones por defecto
+    de la línea. Las propias ganan si chocan (rw contra ro, anonuid=X contra anonuid=Y...).
+    """
+    if not por_defecto:
+        return propias
+    if not propias:
+        return por_defecto
+
+    lista_propias = [o for o in propias.split(',') if o]
+    anuladas = set()
+    for opcion in lista_propias:
+        clave = opcion.split('=', 1)[0]
+        anuladas.add(clave)
+        if clave in _OPCIONES_OPUESTAS:
+            anuladas.add(_OPCIONES_OPUESTAS[clave])
+
+    resultado = [o for o in por_defecto.split(',') if o and o.split('=', 1)[0] not in anuladas]
+    return ",".join(resultado + lista_propias)
+
+def _bloques_exports(lineas):
+    """
+    Generador: agrupa las líneas físicas (con su salto de línea) en bloques.
+    Cada bloque es (texto_crudo, linea_logica), donde las líneas terminadas en
+    '\\' se unen con la siguiente y linea_logica es None para comentarios y
+    líneas vacías.
+    """
+    crudo = []
+    pendiente = ""
+    for linea in lineas:
+        crudo.append(linea)
+        sin_salto = linea.rstrip('\r\n')
+        if sin_salto.endswith('\\'):
+            pendiente += sin_salto[:-1] + " "
+            continue
+        logica = (pendiente + sin_salto).strip()
+        pendiente = ""
+        yield "".join(crudo), (logica if logica and not logica.startswith('#') else None)
+        crudo = []
+    if crudo:
+        logica = pendiente.strip()
+        yield "".join(crudo), (logica if logica and not logica.startswith('#') else None)
+
+def _lineas_logicas(lineas):
+    """Generador: solo las líneas lógicas con contenido (sin comentarios ni vacías)."""
+    for _, logica in _bloques_exports(lineas):
+        if logica is not None:
+            yield logica
+
+def _dividir_tokens(linea):
+    """
+    Divide una línea lógica en tokens respetando comillas ("/mi ruta")
+    y cortando en un '#' que empiece un token (comentario al final de línea).
+    """
+    # Camino rápido: lo habitual es que no haya comillas ni comentarios
+    if '"' not in linea and '#' not in linea:
+        return linea.split()
+
+    tokens = []
+    actual = []
+    en_comillas = False
+    hay_token = False
+    for caracter in linea:
+        if caracter == '"':
+            en_comillas = not en_comillas
+            hay_token = True
+        elif not en_comillas and caracter in ' \t':
+            if hay_token:
+                tokens.append("".join(actual))
+                actual = []
+                hay_token = False
+        elif not en_comillas and caracter == '#' and not hay_token:
+            break
+        else:
+            actual.append(caracter)
+            hay_token = True
+    if hay_token:
+        tokens.append("".join(actual))
+    return tokens
+
+def _parsear_linea(linea):
+    """
+    Analiza una línea lógica de /etc/exports.
+    Devuelve (directorio, [(host, opciones), ...]) o None si no contiene nada.
+    Soporta opciones por defecto tras la ruta: "/srv -ro host1 host2(rw)".
+    """
+    partes = _dividir_tokens(linea)
+    if not partes:
+        return None
+
+    # La ruta puede llevar caracteres en octal (\040), como la lee exportfs
+    directorio = _desescapar_ruta(partes[0])
+    por_defecto = ""
+    hosts = []
+
+    for host_info in partes[1:]:
+        # "-ro,sync": opciones por defecto para los hosts que vienen detrás
+        if host_info.startswith('-') and not hosts:
+            por_defecto = host_info[1:]
+            continue
+
+        # host_info es como "*(rw,sync)" o solo "*"
+        inicio = host_info.find('(')
+        if inicio < 0:
+            hosts.append((host_info, por_defecto))
+        elif host_info.endswith(')'):
+            hosts.append((host_info[:inicio], _combinar_opciones(por_defecto, host_info[inicio + 1:-1])))
+        else:
+            print(f"Advertencia: Ignorando línea mal formada: {host_info}")
+
+    return directorio, hosts
+
+def tokenizar_exports(lineas):
+    """
+    Generador de una sola pasada sobre las líneas de un archivo exports
+    (por ejemplo, el propio objeto archivo abierto). Emite tuplas
+    (directorio, host, opciones) sin cargar el archivo entero en memoria.
+    """
+    for linea in _lineas_logicas(lineas):
+        registro = _parsear_linea(linea)
+        if registro is None:
+            continue
+        directorio, hosts = registro
+        for host, opciones in hosts:
+            yield directorio, host, opciones
+
+def _compactar_registro(registro):
+    """Convierte (directorio, [(host, opciones)]) en (directorio, (HostRule, ...))."""
+    if registro is None:
+        return None
+    directorio, hosts = registro
+    return sys.intern(directorio), tuple(HostRule(host, opciones) for host, opciones in hosts)
+
+def _construir_configuracion(registros_por_linea):
+    """Une los registros de cada línea en la tabla {directorio: [HostRule, ...]}."""
+    config_data = ExportTable()
+    datos = config_data._datos
+    for registro in registros_por_linea:
+        if registro is None:
+            continue
+        directorio, reglas = registro
+        lista = datos.get(directorio)
+        if lista is None:
+            lista = datos[directorio] = _ListaReglas()
+        list.extend(lista, reglas)
+    return config_data
+
+class _Disposicion:
+    """
+    Cómo estaba escrito un archivo exports, sin guardar su texto. De cada
+    bloque (una línea, o varias unidas con '\\') se guarda dónde empieza,
+    una huella de su texto y el directorio que declara (None en comentarios
+    y líneas vacías). Al guardar se vuelve a leer el archivo y los bloques
+    cuya huella coincide se copian tal cual.
+    """
+    __slots__ = ('ruta', 'inicios', 'huellas', 'directorios')
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta
+        self.inicios = array('Q', [0])  # posición (en caracteres) de cada bloque, más el final
+        self.huellas = array('q')
+        self.directorios = []
+
+    def anadir(self, crudo, directorio):
+        self.inicios.append(self.inicios[-1] + len(crudo))
+        self.huellas.append(hash(crudo))
+        self.directorios.append(directorio)
+
+    def __len__(self):
+        return len(self.directorios)
+
+    def bloques(self):
+        """
+        Relee el archivo y genera (crudo, directorio, registro) por bloque.
+        'crudo' es None si el bloque ya no está igual en disco (se editó fuera
+        de la aplicación); 'registro' es None en comentarios y líneas vacías.
+        """
+        texto = ""
+        if self.ruta is not None:
+            try:
+                with open(self.ruta, 'rb') as f:
+                    texto = f.read().decode('utf-8', errors='surrogateescape')
+            except OSError:
+                pass
+        memoria = _memoria_lineas(self.ruta)
+        inicios, huellas = self.inicios, self.huellas
+        for i, directorio in enumerate(self.directorios):
+            crudo = texto[inicios[i]:inicios[i + 1]]
+            if len(crudo) != inicios[i + 1] - inicios[i] or hash(crudo) != huellas[i]:
+                yield None, directorio, None
+                continue
+            registro = None
+            if directorio is not None:
+                for _, linea in _bloques_exports(crudo.splitlines(keepends=True)):
+                    registro = memoria.get(linea) or _compactar_registro(_parsear_linea(linea))
+            yield crudo, directorio, registro
+
+def _memoria_lineas(ruta):
+    """Líneas ya analizadas del archivo 'ruta' según su caché de lectura ({} si no hay)."""
+    with _cerrojo_cache_exports:
+        for cache in (_cache_exports, *_caches_exports_d.values()):
+            if cache["clave_stat"] is not None and cache["clave_stat"][0] == ruta:
+                return cache["lineas"]
+    return {}
+
+def _analizar_contenido(contenido, memoria_anterior, ruta=None):
+    """
+    Convierte el contenido (bytes) de un archivo exports en una ExportTable.
+    Las líneas lógicas ya vistas en 'memoria_anterior' no se vuelven a analizar.
+    Devuelve (tabla, memoria_nueva, lineas_reanalizadas).
+    """
+    memoria_nueva = {}
+    registros = []
+    disposicion = _Disposicion(ruta)
+    reanalizadas = 0
+    # surrogateescape: cualquier byte no UTF-8 se conserva intacto al reescribir
+    texto = contenido.decode('utf-8', errors='surrogateescape')
+    for crudo, linea in _bloques_exports(texto.splitlines(keepends=True)):
+        if linea is None:
+            disposicion.anadir(crudo, None)
+            continue
+        if linea in memoria_nueva:
+            registro = memoria_nueva[linea]
+        elif linea in memoria_anterior:
+            registro = memoria_anterior[linea]
+        else:
+            registro = _compactar_registro(_parsear_linea(linea))
+            reanalizadas += 1
+        memoria_nueva[linea] = registro
+        registros.append(registro)
+        disposicion.anadir(crudo, registro[0] if registro is not None else None)
+
+    config_data = _construir_configuracion(registros)
+    config_data._disposicion = disposicion
+    return config_data, memoria_nueva, reanalizadas
+
+def estadisticas_cache_exports():
+    """Devuelve los contadores de la caché de lectura (aciertos, fallos, líneas re-analizadas)."""
+    with _cerrojo_cache_exports:
+        return {
+            "aciertos": _cache_exports["aciertos"],
+            "fallos": _cache_exports["fallos"],
+            "lineas_reanalizadas": _cache_exports["lineas_reanalizadas"],
+            "lineas_en_memoria": len(_cache_exports["lineas"]),
+        }
+
+def limpiar_cache_exports():
+    """Vacía la caché de lectura (por ejemplo, tras cambiar EXPORTS_FILE)."""
+    with _cerrojo_cache_exports:
+        _cache_exports.update(_cache_vacia())
+        _caches_exports_d.clear()
+
+def _leer_archivo_cacheado(ruta, cache):
+    """
+    Lee un archivo exports pasando por su caché. Devuelve una ExportTable
+    propia (copia). Deja pasar FileNotFoundError y PermissionError.
+    """
+    with _cerrojo_cache_exports:
+        return _leer_archivo_cacheado_sin_cerrojo(ruta, cache)
+
+def _leer_archivo_cacheado_sin_cerrojo(ruta, cache):
+    st = os.stat(ruta)
+    clave_stat = (ruta, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    # 1. Acierto rápido: mismo inodo, mtime y tamaño
+    if cache["resultado"] is not None and cache["clave_stat"] == clave_stat:
+        cache["aciertos"] += 1
+        return cache["resultado"].copia()
+
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+    huella = hashlib.sha1(contenido).hexdigest()
+
+    # 2. El archivo se tocó pero el contenido es idéntico
+    if cache["resultado"] is not None and cache["hash"] == huella:
+        cache["clave_stat"] = clave_stat
+        cache["aciertos"] += 1
+        return cache["resultado"].copia()
+
+    # 3. Hubo cambios: solo se analizan las líneas que no conocemos
+    cache["fallos"] += 1
+    with trazador.tramo("exports.analizar", archivo=ruta, bytes=len(contenido)) as tramo:
+        config_data, memoria_nueva, reanalizadas = _analizar_contenido(contenido, cache["lineas"], ruta)
+        tramo["lineas_reanalizadas"] = reanalizadas
+    cache["lineas_reanalizadas"] += reanalizadas
+    cache.update(clave_stat=clave_stat, hash=huella, lineas=memoria_nueva, resultado=config_data)
+    return config_data.copia()
+
+@trazado("exports.leer")
 def leer_configuracion_exports():
     """
     Lee /etc/exports y lo convierte en una estructura de datos fácil de usar.
     
-    Estructura de datos devuelta:
+    Estructura de datos devuelta (una ExportTable, que se usa como un dict):
     {
         "/opt/docus": [
-            {"host": "*", "options": "rw,sync"},
-            {"host": "192.168.1.1", "options": "ro,all_squash"}
+            HostRule("*", "rw,sync"),
+            HostRule("192.168.1.1", "ro,all_squash")
         ],
         "/home/public": [
-            {"host": "*.miempresa.com", "options": "rw,no_root_squash"}
+            HostRule("*.miempresa.com", "rw,no_root_squash")
         ]
     }
+    Cada HostRule admite rule["host"] y rule["options"] como los dicts de antes.
+
+    Si el archivo no cambió desde la última lectura se devuelve una copia del
+    resultado en caché. Si cambió, solo se analizan las líneas nuevas o
+    modificadas; el resto se reutiliza de la lectura anterior.
     """
-    config_data = {}
     try:
-        with open(EXPORTS_FILE, 'r') as f:
-            for linea in f:
-                linea = linea.strip()
-                if not linea or linea.startswith('#'):
-                    continue
-                
-                # Análisis (parsing) de la línea
-                partes = linea.split()
-                directorio = partes[0]
-                hosts_info = partes[1:]
-                
-                if directorio not in config_data:
-                    config_data[directorio] = []
-                
-                for host_info in hosts_info:
-                    try:
-                        # host_info es como "*(rw,sync)"
-                        host, opciones_bruto = host_info.split('(', 1)
-                        opciones = opciones_bruto.replace(')', '')
-                        config_data[directorio].append({"host": host, "options": opciones})
-                    except ValueError:
-                        print(f"Advertencia: Ignorando línea mal formada: {host_info}")
-                        
+        return _leer_archivo_cacheado(EXPORTS_FILE, _cache_exports)
     except FileNotFoundError:
         print(f"Advertencia: {EXPORTS_FILE} no encontrado. Se creará uno nuevo al guardar.")
     except PermissionError:
         # Esto no debería pasar si la comprobación en main.py funciona
         raise PermissionError(f"¡Error fatal! No se pudo leer {EXPORTS_FILE}.")
         
+    return ExportTable()
+
+# --- VARIOS ARCHIVOS: /etc/exports + /etc/exports.d/*.exports ---
+# Cada archivo se lee con su propia caché (si no cambió, basta un stat) y la
+# tabla combinada recuerda de qué archivo vino cada directorio. Al guardar
+# solo se reescriben los archivos cuyos directorios cambiaron; los demás ni
+# se releen mientras su stat coincida con el de su caché de lectura.
+
+def listar_archivos_exports(directorio=None):
+    """Archivos *.exports de /etc/exports.d, en el orden en que los lee exportfs."""
+    directorio = directorio or EXPORTS_DIR
+    try:
+        nombres = sorted(n for n in os.listdir(directorio) if n.endswith('.exports') and not n.startswith('.'))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return [os.path.join(directorio, n) for n in nombres]
+
+@trazado("exports.leer_todo")
+def leer_configuracion_completa(directorio=None):
+    """
+    Como leer_configuracion_exports, pero añadiendo los archivos de
+    /etc/exports.d. Si un directorio aparece en varios archivos, sus reglas
+    se unen en orden y se considera que pertenece al primero.
+    """
+    config_data = ExportTable()
+    config_data._archivos = {}
+    config_data._origen = {}
+    datos = config_data._datos
+
+    partes = [(EXPORTS_FILE, leer_configuracion_exports())]
+    vigentes = listar_archivos_exports(directorio)
+    for ruta in vigentes:
+        with _cerrojo_cache_exports:
+            cache = _caches_exports_d.setdefault(ruta, _cache_vacia())
+        try:
+            partes.append((ruta, _leer_archivo_cacheado(ruta, cache)))
+        except FileNotFoundError:
+            continue  # Borrado entre el listdir y la lectura
+        except PermissionError:
+            raise PermissionError(f"¡Error fatal! No se pudo leer {ruta}.")
+    # Los archivos que ya no existen no deben seguir ocupando memoria
+    with _cerrojo_cache_exports:
+        for ruta in [r for r in _caches_exports_d if r not in vigentes]:
+            del _caches_exports_d[ruta]
+
+    for ruta, tabla in partes:
+        config_data._archivos[ruta] = tabla._disposicion
+        for directorio_export, reglas in tabla._datos.items():
+            if directorio_export in datos:
+                list.extend(datos[directorio_export], reglas)
+            else:
+                datos[directorio_export] = reglas
+                config_data._origen[directorio_export] = ruta
     return config_data
 
-def escribir_configuracion_exports(config_data):
+def _reglas_en_cache(ruta, disposicion):
     """
-    Toma la estructura de datos y la escribe de vuelta en /etc/exports.
+    {directorio: [HostRule]} del archivo según su caché de lectura, si la
+    tabla se leyó de ella ('disposicion' es la suya) y el archivo no ha
+    cambiado desde entonces (basta un stat). None si hay que releerlo.
     """
-    try:
-        lineas_a_escribir = ["# Archivo de configuración de NFS generado por MiAppNFS\n"]
-        
-        for directorio, hosts_lista in config_data.items():
-            hosts_str_lista = []
-            for host_info in hosts_lista:
-                hosts_str_lista.append(f"{host_info['host']}({host_info['options']})")
-            
-            # Une todos los hosts para ese directorio en una línea
-            linea_final = f"{directorio} {' '.join(hosts_str_lista)}"
-            lineas_a_escribir.append(linea_final)
-            
-        with open(EXPORTS_FILE, 'w') as f:
-            f.write("\n".join(lineas_a_escribir))
-        return True, "Configuración guardada."
-        
-    except PermissionError:
-        return False, f"Error de Permisos: No se pudo escribir en {EXPORTS_FILE}."
-    except Exception as e:
-        return False, f"Error inesperado al guardar: {e}"
+    with _cerrojo_cache_exports:
+        for cache in (_cache_exports, _caches_exports_d.get(ruta)):
+            if cache is None or cache["resultado"] is None or cache["resultado"]._disposicion is not disposicion:
+                continue
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                return None
+            if cache["clave_stat"] == (ruta, st.st_ino, st.st_mtime_ns, st.st_size):
+                return cache["resultado"]._datos
+    return None
 
-def aplicar_cambios_nfs():
+def _reglas_por_archivo(archivos):
     """
-    Ejecuta 'exportfs -ra' para aplicar la nueva configuración.
+    Devuelve ({ruta: {directorio: [HostRule]}}, alterados) según lo que hay en
+    cada archivo. 'alterados' son los directorios cuyas líneas cambiaron en
+    disco desde que se leyeron: se tratan como modificados. Los archivos que
+    siguen como se leyeron salen de la caché de lectura; solo se releen los
+    que cambiaron o que esta aplicación acaba de escribir.
     """
-    try:
-        subprocess.run(shlex.split("exportfs -ra"), check=True, capture_output=True)
-        return True, "Configuración de NFS aplicada exitosamente."
-    except subprocess.CalledProcessError as e:
-        return False, f"Error al ejecutar 'exportfs -ra': {e.stderr.decode()}"
-    except FileNotFoundError:
-        return False, "Error: El comando 'exportfs' no se encontró en el PATH."
-        
-def habilitar_servicio_nfs():
+    por_archivo, alterados = {}, set()
+    for ruta, disposicion in archivos.items():
+        if disposicion is None:
+            por_archivo[ruta] = {}
+            continue
+        en_cache = _reglas_en_cache(ruta, disposicion)
+        if en_cache is not None:
+            por_archivo[ruta] = en_cache
+            continue
+        propios = por_archivo[ruta] = {}
+        for crudo, directorio, registro in disposicion.bloques():
+            if directorio is None:
+                continue
+            reglas = propios.setdefault(directorio, [])
+            if crudo is None:
+                alterados.add(directorio)
+            elif registro is not None:
+                reglas.extend(registro[1])
+    return por_archivo, alterados
+
+def _repartir_por_archivo(config_data, todos=False):
     """
-    Verifica si el servicio ya está activo. Si no, intenta iniciarlo.
+    Reparte una tabla de leer_configuracion_completa entre sus archivos.
+    Un directorio modificado o nuevo va a su archivo de origen (los nuevos, a
+    /etc/exports) y se quita de los demás; el resto se queda donde estaba.
+    Genera (ruta, tabla parcial con la disposición del archivo, directorios
+    que pasan a pertenecer a 'ruta'). Con todos=False se omiten los archivos
+    en los que no cambió ningún directorio.
     """
-    try:
-        # PASO 1: Verificar estado actual
-        check_cmd = "systemctl is-active nfs-server"
-        check = subprocess.run(shlex.split(check_cmd), capture_output=True, text=True)
-        
-        if check.stdout.strip() == "active":
-            return True, "El servicio ya estaba activo."
+    por_archivo, alterados = _reglas_por_archivo(config_data._archivos)
+    originales = {}
+    for propios in por_archivo.values():
+        for directorio, reglas in propios.items():
+            originales.setdefault(directorio, []).extend(reglas)
 
-        # PASO 2: Intentar iniciar con timeout
-        start_cmd = "systemctl enable --now nfs-server"
-        subprocess.run(shlex.split(start_cmd), check=True, capture_output=True, timeout=5)
-        
-        return True, "Servicio NFS habilitado e iniciado correctamente."
+    cambiados = {d for d, reglas in config_data.items() if list(reglas) != originales.get(d)}
+    cambiados.update(d for d in originales if d not in config_data)
+    cambiados |= alterados
+    destinos = {}
+    for directorio in cambiados:
+        if directorio in config_data:
+            destinos.setdefault(config_data.origen(directorio) or EXPORTS_FILE, []).append(directorio)
 
-    except subprocess.TimeoutExpired:
-        return False, "Error: El inicio del servicio tardó demasiado (Timeout)."
-    except Exception as e:
-        return False, f"Error: {e}"
-     
-     
-def renombrar_directorio_fs(ruta_vieja, ruta_nueva):
+    for ruta in list(por_archivo) + [r for r in destinos if r not in por_archivo]:
+        propios = por_archivo.get(ruta, {})
+        if not todos and not destinos.get(ruta) and cambiados.isdisjoint(propios):
+            continue  # Nada de este archivo cambió: no se serializa
+
+        parcial = ExportTable()
+        parcial._disposicion = config_data._archivos.get(ruta)
+        for directorio, reglas in propios.items():
+            if directorio not in cambiados:
+                parcial._datos[directorio] = reglas
+        for directorio in destinos.get(ruta, ()):
+            parcial._datos[directorio] = config_data[directorio]
+        yield ruta, parcial, destinos.get(ruta, ())
+
+def escribir_configuracion_completa(config_data):
     """
-    Renombra una carpeta en el sistema de archivos (equivalente a 'mv').
+    Guarda una tabla de leer_configuracion_completa. Un directorio modificado
+    o nuevo se escribe en su archivo de origen (los nuevos, en /etc/exports) y
+    se quita de los demás; los archivos sin directorios cambiados no se reescriben.
     """
+    escritos = []
+    for ruta, parcial, propios_nuevos in list(_repartir_por_archivo(config_data)):
+        texto, nueva_disposicion = serializar_exports(parcial)
+        datos = texto.encode('utf-8', errors='surrogateescape')
+        try:
+            with open(ruta, 'rb') as f:
+                iguales = f.read() == datos
+        except FileNotFoundError:
+            iguales = False
+        if not iguales:
+            _escribir_atomico(ruta, datos)
+            escritos.append(ruta)
+        nueva_disposicion.ruta = ruta
+        config_data._archivos[ruta] = nueva_disposicion
+        for directorio in propios_nuevos:
+            config_data._origen[directorio] = ruta
+
+    if not escritos:
+        return True, "Configuración sin cambios: no fue necesario escribir."
+    return True, f"Configuración guardada ({len(escritos)} archivo(s): {', '.join(escritos)})."
+
+CABECERA_EXPORTS = "# Archivo de configuración de NFS generado por MiAppNFS\n"
+
+def _formatear_ruta(directorio):
+    """
+    Pone comillas a las rutas con espacios, como espera exportfs. Las comillas
+    y las barras invertidas no pueden ir tal cual: se escriben en octal
+    (\\042, \\134), que exportfs y _parsear_linea traducen de vuelta.
+    """
+    if '"' in directorio or '\\' in directorio:
+        directorio = directorio.replace('\\', '\\134').replace('"', '\\042')
+    if any(c in directorio for c in ' \t#'):
+        return '"' + directorio + '"'
+    return directorio
+
+def _formatear_linea(directorio, hosts_lista):
+    """Genera la línea "directorio host1(opts) host2(opts)" para un directorio."""
+    hosts_str_lista = [f"{h['host']}({h['options']})" for h in hosts_lista]
+    return " ".join([_formatear_ruta(directorio)] + hosts_str_lista) + "\n"
+
+@trazado("exports.serializar")
+def serializar_exports(config_data):
+    """
+    Convierte la tabla en el texto del archivo exports.
+    Si la tabla viene de leer_configuracion_exports, los comentarios, las líneas
+    vacías y los directorios que no cambiaron se copian tal cual del original
+    (se releen del archivo); solo se formatean de nuevo los directorios
+    modificados o añadidos, y los que alguien editó en disco entretanto.
+    Devuelve (texto, nueva_disposicion); la disposición no tiene ruta hasta
+    que quien escribe el texto se la asigna.
+    """
+    disposicion = getattr(config_data, '_disposicion', None)
+    if disposicion:
+        bloques = list(disposicion.bloques())
+    else:
+        bloques = [(CABECERA_EXPORTS, None, None)]
+
+    # 1. Reglas originales de cada directorio (puede aparecer en varias líneas)
+    originales = {}
+    alterados = set()
+    for crudo, directorio, registro in bloques:
+        if directorio is None:
+            continue
+        reglas = originales.setdefault(directorio, [])
+        if crudo is None:
+            alterados.add(directorio)
+        elif registro is not None:
+            reglas.extend(registro[1])
+
+    sin_cambios = set()
+    for directorio, reglas in originales.items():
+        if directorio not in alterados and directorio in config_data and list(config_data[directorio]) == reglas:
+            sin_cambios.add(directorio)
+
+    # 2. Recorrer el archivo original en orden
+    partes = []
+    nueva_disposicion = _Disposicion()
+    emitidos = set()
+    for crudo, directorio, _ in bloques:
+        if directorio is None:
+            if crudo is not None:
+                partes.append(crudo)
+                nueva_disposicion.anadir(crudo, None)
+            continue
+        if directorio not in config_data or directorio in emitidos and directorio not in sin_cambios:
+            continue  # Eliminado, o ya re-emitido en una sola línea
+        if directorio in sin_cambios:
+            # Si la última línea del archivo no tenía salto, se lo añadimos
+            if not crudo.endswith('\n'):
+                crudo += '\n'
+            linea = crudo
+        else:
+            linea = _formatear_linea(directorio, config_data[directorio])
+        partes.append(linea)
+        nueva_disposicion.anadir(linea, directorio)
+        emitidos.add(directorio)
+
+    # 3. Directorios nuevos, al final
+    for directorio, hosts_lista in config_data.items():
+        if directorio not in originales:
+            linea = _formatear_linea(directorio, hosts_lista)
+            partes.append(linea)
+            nueva_disposicion.anadir(linea, directorio)
+
+    return "".join(partes), nueva_disposicion
+
+def _escribir_atomico(ruta, datos):
+    """
+    Escribe 'datos' (bytes) en 'ruta' sin dejar nunca un archivo a medias:
+    archivo temporal en el mismo directorio + fsync + rename.
+    Conserva los permisos y el dueño del archivo original.
+    """
+    import tempfile
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    fd, ruta_tmp = tempfile.mkstemp(prefix='.exports.', dir=directorio)
+    try:
+        try:
+            st = os.stat(ruta)
+            os.fchmod(fd, st.st_mode & 0o7777)
+            if os.geteuid() == 0:
+                os.fchown(fd, st.st_uid, st.st_gid)
+        except FileNotFoundError:
+            os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            with trazador.tramo("exports.escribir", bytes=len(datos)):
+                f.write(datos)
+                f.flush()
+            with trazador.tramo("exports.fsync"):
+                os.fsync(f.fileno())
+        os.replace(ruta_tmp, ruta)
+    except BaseException:
+        try:
+            os.unlink(ruta_tmp)
+        except OSError:
+            pass
+        raise
+
+    # Que el propio rename también quede en disco
+    fd_dir = os.open(directorio, os.O_RDONLY)
+    try:
+        with trazador.tramo("exports.fsync_directorio"):
+            os.fsync(fd_dir)
+    finally:
+        os.close(fd_dir)
+
+@trazado("exports.guardar")
+def escribir_configuracion_exports(config_data):
+    """
+    Toma la estructura de datos y la escribe de vuelta en /etc/exports.
+    La escritura es atómica y se omite si el contenido no cambió.
+    Las tablas de leer_configuracion_completa se reparten entre sus archivos.
+    """
+    try:
+        if getattr(config_data, '_archivos', None) is not None:
+            return escribir_configuracion_completa(config_data)
+        texto, nueva_disposicion = serializar_exports(config_data)
+        datos = texto.encode('utf-8', errors='surrogateescape')
+
+        # Si el archivo ya tiene exactamente estos bytes, no hay nada que hacer
+        try:
+            with open(EXPORTS_FILE, 'rb') as f:
+                iguales = f.read() == datos
+        except FileNotFoundError:
+            iguales = False
+
+        if not iguales:
+            _escribir_atomico(EXPORTS_FILE, datos)
+        if isinstance(config_data, ExportTable):
+            nueva_disposicion.ruta = EXPORTS_FILE
+            config_data._disposicion = nueva_disposicion
+        if iguales:
+            return True, "Configuración sin cambios: no fue necesario escribir."
+        return True, "Configuración guardada."
+        
+    except PermissionError as e:
+        return False, f"Error de Permisos: No se pudo escribir en {e.filename or EXPORTS_FILE}."
+    except Exception as e:
+        return False, f"Error inesperado al guardar: {e}"
+
+# Máximo de "host:/ruta" por cada invocación de exportfs
+LOTE_EXPORTFS = 64
+
+def _reglas_efectivas(config_data):
+    """
+    {(directorio, host): opciones}. Si un host aparece repetido en un mismo
+    directorio, exportfs usa la primera entrada, así que nos quedamos con esa.
+    """
+    efectivas = {}
+    for directorio, hosts_lista in config_data.items():
+        for h in hosts_lista:
+            efectivas.setdefault((directorio, h['host']), h['options'])
+    return efectivas
+
+def calcular_cambios_exportfs(config_vieja, config_nueva):
+    """
+    Compara dos tablas de exportaciones.
+    Devuelve (exportar, retirar):
+      exportar = [(directorio, host, opciones), ...]  nuevas o con opciones distintas
+      retirar  = [(directorio, host), ...]            que ya no existen
+    """
+    viejas = _reglas_efectivas(config_vieja)
+    nuevas = _reglas_efectivas(config_nueva)
+
+    # "rw,sync" y "sync,rw" son la misma exportación: no hace falta repetirla
+    exportar = [(d, h, o) for (d, h), o in nuevas.items()
+                if (d, h) not in viejas or ExportOptions.analizar(viejas[d, h]) is not ExportOptions.analizar(o)]
+    retirar = [(d, h) for (d, h) in viejas if (d, h) not in nuevas]
+    return exportar, retirar
+
+def _destino_exportfs(host, directorio):
+    """
+    'cliente:/ruta' tal como lo espera exportfs. Las direcciones y redes IPv6
+    van entre corchetes ([2001:db8::1]:/srv): sin ellos exportfs cortaría el
+    cliente en el primer ':'.
+    """
+    if ':' in host:
+        tipo, valor = clasificar_host(host)
+        if tipo in (TIPO_HOST, TIPO_RED) and getattr(valor, 'version', None) == 6:
+            return f"[{host.strip('[]')}]:{directorio}"
+    return f"{host}:{directorio}"
+
+def planificar_comandos_exportfs(config_vieja, config_nueva, comando_exportfs="exportfs"):
+    """
+    Traduce las diferencias a comandos exportfs agrupados en lotes.
+    Orden seguro: primero se exporta lo nuevo/modificado (ningún cliente pierde
+    acceso a mitad del cambio) y después se retira lo eliminado.
+    """
+    exportar, retirar = calcular_cambios_exportfs(config_vieja, config_nueva)
+    comandos = []
+
+    # 1. Exportaciones agrupadas por opciones (un -o por comando)
+    por_opciones = {}
+    for directorio, host, opciones in exportar:
+        # Las opciones equivalentes (otro orden) van en el mismo comando
+        por_opciones.setdefault(ExportOptions.analizar(opciones).texto(), []).append(
+            _destino_exportfs(host, directorio))
+    for opciones, destinos in por_opciones.items():
+        base = [comando_exportfs, "-i"] + (["-o", opciones] if opciones else [])
+        for i in range(0, len(destinos), LOTE_EXPORTFS):
+            comandos.append(base + destinos[i:i + LOTE_EXPORTFS])
+
+    # 2. Retiradas
+    destinos = [_destino_exportfs(host, directorio) for directorio, host in retirar]
+    for i in range(0, len(destinos), LOTE_EXPORTFS):
+        comandos.append([comando_exportfs, "-u"] + destinos[i:i + LOTE_EXPORTFS])
+
+    return comandos
+
+def _ejecutar_comando(args):
+    """Ejecutor por defecto: lanza el comando y falla si devuelve error."""
+    import shlex
+    import subprocess
+    with trazador.tramo("subproceso", comando=shlex.join(args[:3])):
+        subprocess.run(args, check=True, capture_output=True)
+
+@trazado("exportfs.aplicar")
+def aplicar_cambios_nfs(config_vieja=None, config_nueva=None, dry_run=False,
+                        ejecutar=None, comando_exportfs="exportfs", progreso=None):
+    """
+    Aplica la nueva configuración al kernel.
+    - Sin tablas: ejecuta 'exportfs -ra' (re-exporta todo).
+    - Con la tabla anterior y la nueva: solo lanza los 'exportfs -o' y
+      'exportfs -u' necesarios. Si alguno falla, se recurre a 'exportfs -ra'.
+    - dry_run=True: no ejecuta nada, devuelve los comandos que se lanzarían.
+    'ejecutar' permite sustituir la forma de lanzar comandos (pruebas, remoto...).
+    'progreso(hecho, total, mensaje)' se llama tras cada comando.
+    """
+    import shlex
+    import subprocess
+    ejecutar = ejecutar or _ejecutar_comando
+    completo = [comando_exportfs, "-ra"]
+
+    if config_vieja is None or config_nueva is None:
+        comandos = [completo]
+    else:
+        comandos = planificar_comandos_exportfs(config_vieja, config_nueva, comando_exportfs)
+        if not comandos:
+            return True, "No hay cambios que aplicar en las exportaciones."
+
+    if dry_run:
+        return True, "\n".join(shlex.join(c) for c in comandos)
+
+    try:
+        for i, comando in enumerate(comandos, 1):
+            ejecutar(comando)
+            if progreso:
+                progreso(i, len(comandos), shlex.join(comando))
+        if comandos == [completo]:
+            return True, "Configuración de NFS aplicada exitosamente."
+        return True, f"Configuración de NFS aplicada exitosamente ({len(comandos)} operaciones exportfs)."
+    except subprocess.CalledProcessError as e:
+        if comandos != [completo]:
+            # Un cambio puntual falló: se re-exporta todo desde el archivo ya guardado
+            try:
+                ejecutar(completo)
+                return True, "Un cambio puntual falló; se aplicó 'exportfs -ra' completo."
+            except subprocess.CalledProcessError as e2:
+                e = e2
+            except FileNotFoundError:
+                return False, "Error: El comando 'exportfs' no se encontró en el PATH."
+        stderr = e.stderr.decode() if isinstance(e.stderr, bytes) else (e.stderr or "")
+        return False, f"Error al ejecutar '{shlex.join(e.cmd)}': {stderr}"
+    except FileNotFoundError:
+        return False, "Error: El comando 'exportfs' no se encontró en el PATH."
+        
+@trazado("systemctl.servicio")
+def habilitar_servicio_nfs():
+    """
+    Verifica si el servicio ya está activo. Si no, intenta iniciarlo.
+    """
+    import shlex
+    import subprocess
+    try:
+        # PASO 1: Verificar estado actual
+        check_cmd = "systemctl is-active nfs-server"
+        with trazador.tramo("subproceso", comando=check_cmd):
+            check = subprocess.run(shlex.split(check_cmd), capture_output=True, text=True)
+        
+        if check.stdout.strip() == "active":
+            return True, "El servicio ya estaba activo."
+
+        # PASO 2: Intentar iniciar con timeout
+        start_cmd = "systemctl enable --now nfs-server"
+        with trazador.tramo("subproceso", comando=start_cmd):
+            subprocess.run(shlex.split(start_cmd), check=True, capture_output=True, timeout=5)
+        
+        return True, "Servicio NFS habilitado e iniciado correctamente."
+
+    except subprocess.TimeoutExpired:
+        return False, "Error: El inicio del servicio tardó demasiado (Timeout)."
+    except Exception as e:
+        return False, f"Error: {e}"
+     
+     
+# Copia entre sistemas de archivos (ver mover_entre_sistemas)
+HILOS_COPIA = 8
+BLOQUE_COPIA = 1 << 30              # máximo por llamada a copy_file_range/sendfile
+INTERVALO_PROGRESO_COPIA = 0.25     # segundos entre avisos de progreso
+_ERRORES_SIN_COPIA_KERNEL = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+@trazado("fs.renombrar")
+def renombrar_directorio_fs(ruta_vieja, ruta_nueva, progreso=None, cancelacion=None,
+                            max_hilos=HILOS_COPIA):
+    """
+    Renombra una carpeta en el sistema de archivos (equivalente a 'mv').
+    Si el destino está en otro sistema de archivos (EXDEV) copia el árbol
+    y borra el original (ver mover_entre_sistemas). Un movimiento
+    interrumpido se reanuda llamando de nuevo con las mismas rutas.
+    """
+    if os.path.exists(_ruta_diario(ruta_nueva)):
+        return mover_entre_sistemas(ruta_vieja, ruta_nueva, progreso, cancelacion, max_hilos)
     try:
         os.rename(ruta_vieja, ruta_nueva)
         return True, f"Carpeta renombrada de '{ruta_vieja}' a '{ruta_nueva}'."
     except OSError as e:
+        if e.errno == errno.EXDEV:
+            return mover_entre_sistemas(ruta_vieja, ruta_nueva, progreso, cancelacion, max_hilos)
         return False, f"Error al renombrar carpeta: {e}"
+
+
+# --- MOVER ENTRE SISTEMAS DE ARCHIVOS ---
+# os.rename no cruza puntos de montaje. En ese caso se recorre el origen,
+# se crean los directorios, se copian los archivos en paralelo dentro del
+# kernel (copy_file_range o sendfile: los datos no pasan por Python) y se
+# copian modo, dueño, atributos extendidos y fechas. Cada archivo terminado
+# se apunta en un diario junto al destino; si la copia se corta, la
+# siguiente llamada salta lo ya copiado. El origen solo se borra cuando
+# todo está copiado y sincronizado en disco.
+
+def _ruta_diario(destino):
+    destino = os.path.normpath(destino)
+    return os.path.join(os.path.dirname(destino), f".{os.path.basename(destino)}.nfs-mover")
+
+def _copiar_contenido(fd_origen, fd_destino, tamano, metodo, al_avanzar=None, cancelacion=None):
+    """
+    Copia 'tamano' bytes entre dos descriptores. 'metodo' es una lista de un
+    elemento compartida entre hilos: si copy_file_range no está permitido
+    entre estos sistemas de archivos se baja a sendfile y, si tampoco, a
+    read/write, y el resto de archivos ya no lo vuelve a intentar.
+    """
+    copiado = 0
+    while copiado < tamano:
+        if cancelacion is not None and cancelacion.cancelado:
+            return copiado
+        pedido = min(BLOQUE_COPIA, tamano - copiado)
+        try:
+            if metodo[0] == "copy_file_range":
+                n = os.copy_file_range(fd_origen, fd_destino, pedido)
+            elif metodo[0] == "sendfile":
+                n = os.sendfile(fd_destino, fd_origen, copiado, pedido)
+            else:
+                datos = os.read(fd_origen, min(pedido, 1 << 20))
+                n = len(datos)
+                while datos:
+                    datos = datos[os.write(fd_destino, datos):]
+        except OSError as e:
+            if e.errno not in _ERRORES_SIN_COPIA_KERNEL or metodo[0] == "read":
+                raise
+            metodo[0] = "sendfile" if metodo[0] == "copy_file_range" else "read"
+            # Se vuelve a empezar el archivo con el método más simple
+            os.lseek(fd_origen, 0, os.SEEK_SET)
+            os.lseek(fd_destino, 0, os.SEEK_SET)
+            os.ftruncate(fd_destino, 0)
+            if al_avanzar:
+                al_avanzar(-copiado)
+            copiado = 0
+            continue
+        if n == 0:
+            break # El archivo encogió mientras se copiaba
+        copiado += n
+        if al_avanzar:
+            al_avanzar(n)
+    return copiado
+
+def _copiar_metadatos(origen, destino, st, avisos, es_enlace=False):
+    """Dueño, modo, atributos extendidos y fechas. Lo que no se puede copiar se cuenta en 'avisos'."""
+    seguir = not es_enlace
+    try:
+        os.chown(destino, st.st_uid, st.st_gid, follow_symlinks=seguir)
+    except PermissionError:
+        avisos["dueño"] += 1
+    except (NotImplementedError, OSError):
+        pass
+    if not es_enlace:
+        os.chmod(destino, stat.S_IMODE(st.st_mode))
+    if hasattr(os, "listxattr"):
+        try:
+            for nombre in os.listxattr(origen, follow_symlinks=seguir):
+                try:
+                    os.setxattr(destino, nombre, os.getxattr(origen, nombre, follow_symlinks=seguir),
+                                follow_symlinks=seguir)
+                except OSError:
+                    avisos["xattr"] += 1
+        except OSError:
+            pass # El sistema de archivos no tiene xattrs
+    try:
+        os.utime(destino, ns=(st.st_atime_ns, st.st_mtime_ns), follow_symlinks=seguir)
+    except (NotImplementedError, OSError):
+        pass
+
+def _recorrer_arbol(raiz):
+    """
+    Recorre 'raiz' con scandir. Devuelve (directorios, archivos, enlaces, especiales)
+    con rutas relativas y su stat; los directorios en preorden.
+    """
+    directorios, archivos, enlaces, especiales = [("", os.lstat(raiz))], [], [], []
+    pendientes = [""]
+    while pendientes:
+        relativa = pendientes.pop()
+        with os.scandir(os.path.join(raiz, relativa)) as entradas:
+            for entrada in entradas:
+                ruta = os.path.join(relativa, entrada.name)
+                st = entrada.stat(follow_symlinks=False)
+                if stat.S_ISDIR(st.st_mode):
+                    directorios.append((ruta, st))
+                    pendientes.append(ruta)
+                elif stat.S_ISREG(st.st_mode):
+                    archivos.append((ruta, st))
+                elif stat.S_ISLNK(st.st_mode):
+                    enlaces.append((ruta, st))
+                else:
+                    especiales.append((ruta, st))
+    return directorios, archivos, enlaces, especiales
+
+def _leer_diario(ruta_diario, origen, destino):
+    """Rutas ya copiadas según el diario, o None si el diario es de otro movimiento."""
+    import json
+    try:
+        with open(ruta_diario, encoding='utf-8', errors='surrogateescape') as f:
+            cabecera = json.loads(f.readline() or "{}")
+            if cabecera.get("origen") != origen or cabecera.get("destino") != destino:
+                return None
+            # Una línea sin '\n' final es una escritura cortada: no cuenta
+            return {linea[:-1] for linea in f if linea.endswith("\n")}
+    except (OSError, ValueError):
+        return None
+
+@trazado("fs.mover")
+def mover_entre_sistemas(origen, destino, progreso=None, cancelacion=None, max_hilos=HILOS_COPIA):
+    """
+    Mueve el árbol 'origen' a 'destino' copiando y borrando, para cuando
+    os.rename da EXDEV. Reanudable: vuelve a llamarse con las mismas rutas.
+    'progreso(hecho, total, mensaje)' recibe MiB copiados / MiB totales.
+    Devuelve (bool, mensaje).
+    """
+    import json
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    origen, destino = os.path.normpath(origen), os.path.normpath(destino)
+    ruta_diario = _ruta_diario(destino)
+    hechos = set()
+    if os.path.exists(ruta_diario):
+        hechos = _leer_diario(ruta_diario, origen, destino)
+        if hechos is None:
+            return False, f"El diario {ruta_diario} pertenece a otro movimiento; bórrelo para continuar."
+        if not os.path.isdir(origen):
+            # Se cortó durante el borrado del origen: la copia ya estaba completa
+            os.unlink(ruta_diario)
+            return True, f"Carpeta movida de '{origen}' a '{destino}'."
+    elif os.path.lexists(destino):
+        return False, f"Error al mover carpeta: '{destino}' ya existe."
+
+    try:
+        with trazador.tramo("fs.mover.recorrer"):
+            directorios, archivos, enlaces, especiales = _recorrer_arbol(origen)
+    except OSError as e:
+        return False, f"Error al leer '{origen}': {e}"
+
+    # Los enlaces duros se copian una vez y el resto se enlaza a la copia
+    primeros, duros = {}, []
+    copiar = []
+    for relativa, st in archivos:
+        if st.st_nlink > 1:
+            clave = (st.st_dev, st.st_ino)
+            if clave in primeros:
+                duros.append((relativa, primeros[clave]))
+                continue
+            primeros[clave] = relativa
+        copiar.append((relativa, st))
+
+    # Lo apuntado en el diario puede no haber llegado a disco si se fue la
+    # luz: solo se da por bueno si el tamaño coincide
+    for relativa, st in copiar:
+        if relativa in hechos:
+            try:
+                if os.lstat(os.path.join(destino, relativa)).st_size != st.st_size:
+                    hechos.discard(relativa)
+            except OSError:
+                hechos.discard(relativa)
+
+    total = sum(st.st_size for _, st in copiar)
+    avisos = {"dueño": 0, "xattr": 0}
+    metodo = ["copy_file_range" if hasattr(os, "copy_file_range") else "sendfile"]
+    cerrojo = threading.Lock()
+    estado = {"bytes": sum(st.st_size for r, st in copiar if r in hechos), "aviso": 0.0}
+    inicio = time.monotonic()
+    base = estado["bytes"]
+
+    def avisar(forzar=False):
+        if not progreso:
+            return
+        ahora = time.monotonic()
+        with cerrojo:
+            if not forzar and ahora - estado["aviso"] < INTERVALO_PROGRESO_COPIA:
+                return
+            estado["aviso"] = ahora
+        velocidad = (estado["bytes"] - base) / max(ahora - inicio, 1e-6)
+        progreso(estado["bytes"] >> 20, max(total >> 20, 1),
+                 f"Moviendo a {destino}: {formatear_bytes(estado['bytes'])} de {formatear_bytes(total)} "
+                 f"({formatear_bytes(velocidad)}/s)")
+
+    def al_avanzar(n):
+        with cerrojo:
+            estado["bytes"] += n
+        avisar()
+
+    try:
+        with open(ruta_diario, "a", encoding='utf-8', errors='surrogateescape') as diario:
+            # La cabecera solo al crear el diario; al reanudar ya está escrita
+            # (aunque no se hubiera llegado a copiar nada)
+            if diario.tell() == 0:
+                diario.write(json.dumps({"origen": origen, "destino": destino}) + "\n")
+                diario.flush()
+
+            def apuntar(relativa):
+                with cerrojo:
+                    diario.write(relativa + "\n")
+                    diario.flush()
+
+            with trazador.tramo("fs.mover.directorios", cantidad=len(directorios)):
+                for relativa, st in directorios:
+                    os.makedirs(os.path.join(destino, relativa), mode=0o700, exist_ok=True)
+
+            def copiar_archivo(relativa, st):
+                if cancelacion is not None and cancelacion.cancelado:
+                    return False
+                ruta_origen = os.path.join(origen, relativa)
+                ruta_destino = os.path.join(destino, relativa)
+                fd_origen = os.open(ruta_origen, os.O_RDONLY)
+                try:
+                    fd_destino = os.open(ruta_destino, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    try:
+                        copiado = _copiar_contenido(fd_origen, fd_destino, st.st_size, metodo,
+                                                    al_avanzar, cancelacion)
+                    finally:
+                        os.close(fd_destino)
+                finally:
+                    os.close(fd_origen)
+                if cancelacion is not None and cancelacion.cancelado:
+                    al_avanzar(-copiado)
+                    return False
+                _copiar_metadatos(ruta_origen, ruta_destino, st, avisos)
+                apuntar(relativa)
+                return True
+
+            pendientes = [(r, st) for r, st in copiar if r not in hechos]
+            with trazador.tramo("fs.mover.copiar", archivos=len(pendientes), bytes=total - base):
+                # Los grandes primero, para que el último hilo no se quede solo con uno enorme
+                pendientes.sort(key=lambda par: par[1].st_size, reverse=True)
+                with ThreadPoolExecutor(max_workers=max(1, max_hilos)) as pool:
+                    for futuro in as_completed([pool.submit(copiar_archivo, r, st) for r, st in pendientes]):
+                        futuro.result()
+            if cancelacion is not None and cancelacion.cancelado:
+                return False, (f"Movimiento cancelado ({formatear_bytes(estado['bytes'])} de "
+                               f"{formatear_bytes(total)}). Repita la operación para continuar.")
+
+            for relativa, primero in duros:
+                if relativa not in hechos:
+                    ruta_destino = os.path.join(destino, relativa)
+                    if os.path.lexists(ruta_destino):
+                        os.unlink(ruta_destino)
+                    os.link(os.path.join(destino, primero), ruta_destino)
+                    apuntar(relativa)
+            for relativa, st in enlaces:
+                if relativa not in hechos:
+                    ruta_destino = os.path.join(destino, relativa)
+                    if os.path.lexists(ruta_destino):
+                        os.unlink(ruta_destino)
+                    os.symlink(os.readlink(os.path.join(origen, relativa)), ruta_destino)
+                    _copiar_metadatos(os.path.join(origen, relativa), ruta_destino, st, avisos, es_enlace=True)
+                    apuntar(relativa)
+            for relativa, st in especiales:
+                if relativa not in hechos and not stat.S_ISSOCK(st.st_mode):
+                    ruta_destino = os.path.join(destino, relativa)
+                    if not os.path.lexists(ruta_destino):
+                        os.mknod(ruta_destino, st.st_mode, st.st_rdev)
+                    _copiar_metadatos(os.path.join(origen, relativa), ruta_destino, st, avisos)
+                    apuntar(relativa)
+            # Directorios al final y de dentro hacia fuera, para que copiar
+            # un archivo no les cambie la fecha de modificación
+            for relativa, st in reversed(directorios):
+                _copiar_metadatos(os.path.join(origen, relativa), os.path.join(destino, relativa), st, avisos)
+
+        avisar(forzar=True)
+        with trazador.tramo("fs.mover.sincronizar"):
+            os.sync()
+        with trazador.tramo("fs.mover.borrar_origen"):
+            shutil.rmtree(origen)
+        os.unlink(ruta_diario)
+    except OSError as e:
+        return False, (f"Error al mover '{origen}' a '{destino}': {e}. "
+                       "Lo copiado se conserva; repita la operación para continuar.")
+
+    segundos = time.monotonic() - inicio
+    mensaje = (f"Carpeta movida de '{origen}' a '{destino}' (otro sistema de archivos): "
+               f"{len(copiar)} archivos, {formatear_bytes(total)} en {segundos:.1f} s "
+               f"({formatear_bytes((total - base) / max(segundos, 1e-6))}/s).")
+    if avisos["dueño"] or avisos["xattr"]:
+        mensaje += (f" No se pudo conservar el dueño de {avisos['dueño']} entradas"
+                    f" ni {avisos['xattr']} atributos extendidos.")
+    return True, mensaje
+
+
+# --- ÍNDICE DE CLIENTES: "¿qué exportaciones ve el host X?" ---
+# Orden de preferencia de exportfs cuando un cliente encaja en varias
+# entradas de un mismo directorio (exports(5)): host concreto, red IP,
+# comodín, netgroup y, por último, '*'. Entre dos del mismo tipo gana la
+# que aparece antes en la línea.
+TIPO_HOST, TIPO_RED, TIPO_COMODIN, TIPO_NETGROUP, TIPO_ANONIMO = range(5)
+
+@functools.lru_cache(maxsize=65536)
+def clasificar_host(host):
+    """
+    Devuelve (tipo, valor) para una especificación de host de /etc/exports:
+    - TIPO_HOST:     ip_address o nombre en minúsculas
+    - TIPO_RED:      ip_network
+    - TIPO_COMODIN:  patrón en minúsculas (con * ? [)
+    - TIPO_NETGROUP: nombre del grupo (sin '@')
+    - TIPO_ANONIMO:  None
+    """
+    import ipaddress
+    if host in ('*', ''):
+        return TIPO_ANONIMO, None
+    if host.startswith('@'):
+        return TIPO_NETGROUP, host[1:]
+    if '/' in host:
+        try:
+            return TIPO_RED, ipaddress.ip_network(host, strict=False)
+        except ValueError:
+            pass
+    try:
+        return TIPO_HOST, ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        pass
+    if any(c in host for c in '*?['):
+        return TIPO_COMODIN, host.lower()
+    return TIPO_HOST, host.lower()
+
+@functools.lru_cache(maxsize=4096)
+def _compilar_comodin(patron):
+    """Compila (una sola vez) un comodín de exports a expresión regular."""
+    import fnmatch
+    return re.compile(fnmatch.translate(patron))
+
+def _literales_comodin(patron):
+    """
+    (prefijo, sufijo) fijos de un comodín: el texto antes del primer * ? [ y
+    después del último * ? [ ]. Todo nombre que encaje empieza y acaba así.
+    """
+    especiales = [i for i, c in enumerate(patron) if c in '*?[]']
+    primero = min((i for i in especiales if patron[i] != ']'), default=len(patron))
+    return patron[:primero], patron[max(especiales, default=-1) + 1:]
+
+class IndiceClientes:
+    """
+    Índice precalculado sobre una tabla de exportaciones para resolver,
+    en microsegundos, qué directorios puede montar un cliente y con qué opciones.
+
+    - IPs y redes: una tabla hash por longitud de prefijo (búsqueda del prefijo
+      más largo); como mucho 33 (IPv4) o 129 (IPv6) consultas a dict.
+    - Nombres exactos: dict.
+    - Comodines "*.dominio": dict por sufijo. El resto se agrupa por su texto
+      fijo final (o inicial): "web*.empresa.com" va al cubo ".empresa.com" y
+      solo se prueba con nombres que acaban así. Una consulta mira un cubo por
+      cada longitud de sufijo/prefijo presente, no todos los patrones; solo
+      los patrones sin texto fijo en ningún extremo ("*web*") se prueban siempre.
+    - Anónimos ("*"): resueltos una vez por directorio al indexar.
+    - Se puede actualizar un directorio sin reconstruir todo el índice.
+
+    Coste de consultar: O(L + P + k log k), con L las longitudes de prefijo o
+    sufijo presentes (acotadas por la del nombre), P los patrones sin texto
+    fijo y k los directorios de la respuesta.
+    """
+
+    def __init__(self, config_data=None):
+        self._prefijos = {4: {}, 6: {}}   # familia -> {longitud: {red_int: [entrada]}}
+        self._longitudes = {4: [], 6: []} # longitudes presentes, de mayor a menor
+        self._nombres = {}                # nombre -> [entrada]
+        self._sufijos = {}                # ".dominio.com" -> [entrada]
+        self._comodines = {'prefijo': {}, 'sufijo': {}}  # extremo -> {texto fijo: [(directorio, patrón, entrada)]}
+        self._largos_comodin = {'prefijo': [], 'sufijo': []}  # longitudes presentes de cada extremo
+        self._patrones = []               # [(regex compilada, entrada)] sin texto fijo en los extremos
+        self._netgroups = {}              # grupo -> [entrada]
+        self._anonimos = {}               # directorio -> primera entrada anónima
+        self._indexado = {}               # directorio -> tupla de reglas indexadas
+        self._ubicaciones = {}            # directorio -> [(dict contenedor, clave)] para borrar rápido
+        self._orden_dir = {}              # directorio -> posición en la tabla
+        if config_data is not None:
+            self.reconstruir(config_data)
+
+    # Una entrada es (directorio, tipo, orden_en_linea, host, opciones)
+
+    def reconstruir(self, config_data):
+        """Vuelve a indexar la tabla entera."""
+        self.__init__()
+        for directorio, reglas in config_data.items():
+            self.actualizar_directorio(directorio, reglas)
+
+    def sincronizar(self, config_data):
+        """Re-indexa solo los directorios que cambiaron respecto a lo indexado."""
+        for directorio in [d for d in self._indexado if d not in config_data]:
+            self.eliminar_directorio(directorio)
+        for directorio, reglas in config_data.items():
+            if self._indexado.get(directorio) != tuple(reglas):
+                self.actualizar_directorio(directorio, reglas)
+
+    def actualizar_directorio(self, directorio, reglas):
+        """(Re)indexa las reglas de un directorio."""
+        import ipaddress
+        if directorio in self._indexado:
+            self._quitar(directorio)
+        self._orden_dir.setdefault(directorio, len(self._orden_dir))
+        reglas = tuple(HostRule.desde(r) for r in reglas)
+        self._indexado[directorio] = reglas
+        ubicaciones = self._ubicaciones[directorio] = []
+
+        def guardar(contenedor, clave, entrada):
+            contenedor.setdefault(clave, []).append(entrada)
+            ubicaciones.append((contenedor, clave))
+
+        for orden, regla in enumerate(reglas):
+            tipo, valor = clasificar_host(regla.host)
+            entrada = (directorio, tipo, orden, regla.host, regla.options)
+            if tipo == TIPO_ANONIMO:
+                # Entre anónimos del mismo directorio gana el primero
+                self._anonimos.setdefault(directorio, entrada)
+            elif tipo == TIPO_NETGROUP:
+                guardar(self._netgroups, valor, entrada)
+            elif tipo == TIPO_COMODIN:
+                resto = valor[1:]
+                prefijo, sufijo = _literales_comodin(valor)
+                if valor.startswith('*.') and not any(c in resto for c in '*?['):
+                    guardar(self._sufijos, resto, entrada)
+                elif prefijo or sufijo:
+                    extremo, fijo = ('sufijo', sufijo) if len(sufijo) >= len(prefijo) else ('prefijo', prefijo)
+                    # Se compila al consultar, y solo si el texto fijo coincide
+                    guardar(self._tabla_comodin(extremo, len(fijo)), fijo, (directorio, valor, entrada))
+                else:
+                    self._patrones.append((_compilar_comodin(valor), entrada))
+            elif tipo == TIPO_RED:
+                guardar(self._tabla_prefijo(valor.version, valor.prefixlen), int(valor.network_address), entrada)
+            elif isinstance(valor, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+                guardar(self._tabla_prefijo(valor.version, valor.max_prefixlen), int(valor), entrada)
+            else:
+                guardar(self._nombres, valor, entrada)
+
+    def eliminar_directorio(self, directorio):
+        """Quita un directorio del índice."""
+        if directorio in self._indexado:
+            self._quitar(directorio)
+            del self._indexado[directorio]
+            del self._orden_dir[directorio]
+
+    def _tabla_prefijo(self, familia, longitud):
+        """Dict {red_int: [entrada]} para una familia (4/6) y longitud de prefijo."""
+        por_longitud = self._prefijos[familia]
+        if longitud not in por_longitud:
+            por_longitud[longitud] = {}
+            self._longitudes[familia] = sorted(por_longitud, reverse=True)
+        return por_longitud[longitud]
+
+    def _tabla_comodin(self, extremo, longitud):
+        """Dict {texto fijo: [(directorio, patrón, entrada)]} de comodines por 'prefijo' o 'sufijo'."""
+        if longitud not in self._largos_comodin[extremo]:
+            self._largos_comodin[extremo] = sorted(self._largos_comodin[extremo] + [longitud])
+        return self._comodines[extremo]
+
+    def _quitar(self, directorio):
+        """Elimina las entradas de un directorio (solo se tocan sus propios cubos)."""
+        for contenedor, clave in self._ubicaciones.pop(directorio, ()):
+            entradas = contenedor.get(clave)
+            if entradas is None:
+                continue
+            restantes = [e for e in entradas if e[0] != directorio]
+            if restantes:
+                contenedor[clave] = restantes
+            else:
+                del contenedor[clave]
+        self._anonimos.pop(directorio, None)
+        if any(e[0] == directorio for _, e in self._patrones):
+            self._patrones = [(p, e) for p, e in self._patrones if e[0] != directorio]
+
+    def consultar(self, cliente, nombre=None, netgroups=()):
+        """
+        Devuelve [(directorio, host_que_coincide, opciones), ...] en el orden de
+        la tabla, con la entrada que exportfs aplicaría a ese cliente en cada directorio.
+        'cliente' puede ser una IP o un nombre; 'nombre' añade el nombre DNS de la IP
+        (no se resuelve nada por red). 'netgroups' son los grupos del cliente.
+        """
+        import ipaddress
+        candidatas = []
+        ip = None
+        try:
+            ip = ipaddress.ip_address(cliente)
+        except ValueError:
+            nombre = cliente
+
+        # 1. IPs y redes: prefijo más largo primero
+        if ip is not None:
+            valor = int(ip)
+            bits = ip.max_prefixlen
+            por_longitud = self._prefijos[ip.version]
+            for longitud in self._longitudes[ip.version]:
+                mascara = ((1 << longitud) - 1) << (bits - longitud) if longitud else 0
+                candidatas.extend(por_longitud[longitud].get(valor & mascara, ()))
+
+        # 2. Nombres y comodines
+        if nombre:
+            nombre = nombre.lower().rstrip('.')
+            candidatas.extend(self._nombres.get(nombre, ()))
+            partes = nombre.split('.')
+            for i in range(1, len(partes)):
+                candidatas.extend(self._sufijos.get('.' + '.'.join(partes[i:]), ()))
+            largo = len(nombre)
+            for n in self._largos_comodin['sufijo']:
+                if n > largo:
+                    break
+                for _, patron, entrada in self._comodines['sufijo'].get(nombre[largo - n:], ()):
+                    if _compilar_comodin(patron).match(nombre):
+                        candidatas.append(entrada)
+            for n in self._largos_comodin['prefijo']:
+                if n > largo:
+                    break
+                for _, patron, entrada in self._comodines['prefijo'].get(nombre[:n], ()):
+                    if _compilar_comodin(patron).match(nombre):
+                        candidatas.append(entrada)
+            for patron, entrada in self._patrones:
+                if patron.match(nombre):
+                    candidatas.append(entrada)
+
+        # 3. Netgroups
+        for grupo in netgroups:
+            candidatas.extend(self._netgroups.get(grupo, ()))
+
+        # 4. Primera coincidencia por directorio según la precedencia de exportfs;
+        # los anónimos (la más baja) son el punto de partida
+        mejores = dict(self._anonimos)
+        for entrada in candidatas:
+            directorio, tipo, orden = entrada[0], entrada[1], entrada[2]
+            actual = mejores.get(directorio)
+            if actual is None or (tipo, orden) < (actual[1], actual[2]):
+                mejores[directorio] = entrada
+
+        resultado = sorted(mejores.values(), key=lambda e: self._orden_dir[e[0]])
+        return [(e[0], e[3], e[4]) for e in resultado]
+
+def consultar_cliente(config_data, cliente, nombre=None):
+    """Atajo: construye un índice y resuelve un único cliente."""
+    return IndiceClientes(config_data).consultar(cliente, nombre)
+
+
+# --- ANÁLISIS DE CONFLICTOS ENTRE REGLAS ---
+# Revisa la tabla completa en O(n log n): rutas ordenadas para las
+# exportaciones anidadas y un recorrido con pila sobre intervalos de IPs
+# para las redes tapadas por otra anterior. Nunca se comparan todas las
+# reglas contra todas.
+
+def _problema(tipo, directorio, detalle, host=None):
+    return {"tipo": tipo, "directorio": directorio, "host": host, "detalle": detalle}
+
+def _buscar_duplicados(config_data, problemas):
+    """Mismo host repetido en un directorio: exportfs solo usa el primero."""
+    for directorio, reglas in config_data.items():
+        vistos = set()
+        for regla in reglas:
+            clave = regla['host'].lower()
+            if clave in vistos:
+                problemas.append(_problema(
+                    "duplicado", directorio,
+                    f"El host '{regla['host']}' aparece más de una vez; solo se aplica la primera.",
+                    regla['host']))
+            vistos.add(clave)
+
+def _buscar_anidados(config_data, problemas):
+    """Directorios exportados dentro de otro directorio exportado (/srv y /srv/a)."""
+    # Se ordena por componentes: como cadena, '/srv-a' quedaría entre '/srv' y '/srv/a'
+    rutas = sorted(((os.path.normpath(d), d) for d in config_data), key=lambda par: par[0].split('/'))
+    pila = []  # ancestros exportados de la ruta actual
+    for normalizada, directorio in rutas:
+        while pila and not (normalizada.startswith(pila[-1][0].rstrip('/') + '/')):
+            pila.pop()
+        if pila:
+            problemas.append(_problema(
+                "anidado", directorio,
+                f"Está dentro de '{pila[-1][1]}', que también se exporta."))
+        pila.append((normalizada, directorio))
+
+def _buscar_contradicciones(config_data, problemas):
+    """Opciones opuestas en una misma regla (rw y ro, anonuid=1 y anonuid=2...)."""
+    for directorio, reglas in config_data.items():
+        for regla in reglas:
+            opciones = regla.opciones
+            if not opciones.repetidas and not opciones.flags & (opciones.flags >> 1) & _MASCARA_PARES:
+                continue # Lo normal: una operación con enteros por regla
+            for una, otra in opciones.contradicciones():
+                problemas.append(_problema(
+                    "contradiccion", directorio,
+                    f"Las opciones '{una}' y '{otra}' se contradicen.", regla['host']))
+            for clave, valor1, valor2 in opciones.repetidas:
+                problemas.append(_problema(
+                    "contradiccion", directorio,
+                    f"La opción '{clave}' tiene valores distintos ('{valor1}' y '{valor2}').",
+                    regla['host']))
+
+def _buscar_sombreados(config_data, problemas):
+    """
+    Reglas que nunca se aplican porque una anterior del mismo tipo ya cubre a
+    todos sus clientes (por ejemplo 10.0.0.0/8 antes de 10.1.0.0/16, o
+    *.empresa.com antes de *.dept.empresa.com).
+    """
+    import fnmatch
+    for directorio, reglas in config_data.items():
+        redes = []          # (familia, inicio, -fin, orden, host)
+        sufijos = {}        # ".dominio" -> (orden, host) del primer "*.dominio"
+        otros_comodines = []
+        for orden, regla in enumerate(reglas):
+            tipo, valor = clasificar_host(regla['host'])
+            if tipo == TIPO_RED:
+                inicio = int(valor.network_address)
+                redes.append((valor.version, inicio, -(inicio + valor.num_addresses - 1), orden, regla['host']))
+            elif tipo == TIPO_COMODIN:
+                # 1. ¿Lo cubre un "*.dominio" anterior?
+                partes = valor.lstrip('*?').split('.')
+                cubridor = None
+                for i in range(1, len(partes)):
+                    previo = sufijos.get('.' + '.'.join(partes[i:]))
+                    if previo and previo[0] < orden:
+                        cubridor = previo[1]
+                        break
+                # 2. ¿Lo cubre otro comodín anterior? (suelen ser pocos)
+                if cubridor is None:
+                    for previo in otros_comodines:
+                        if fnmatch.fnmatchcase(valor, previo):
+                            cubridor = previo
+                            break
+                if cubridor is not None and cubridor.lower() != valor:
+                    problemas.append(_problema(
+                        "sombreado", directorio,
+                        f"'{regla['host']}' nunca se aplica: '{cubridor}' aparece antes y lo cubre.",
+                        regla['host']))
+                resto = valor[1:]
+                if valor.startswith('*.') and not any(c in resto for c in '*?['):
+                    sufijos.setdefault(resto, (orden, regla['host']))
+                else:
+                    otros_comodines.append(valor)
+
+        # Redes: ordenadas por inicio y de mayor a menor tamaño; la pila guarda
+        # las redes que contienen a la actual y la de menor orden entre ellas.
+        redes.sort()
+        pila = []  # (familia, fin, orden_minimo, host_de_ese_orden)
+        for familia, inicio, menos_fin, orden, host in redes:
+            fin = -menos_fin
+            while pila and (pila[-1][0] != familia or pila[-1][1] < inicio):
+                pila.pop()
+            # (el mismo texto repetido ya se informa como duplicado)
+            if pila and pila[-1][2] < orden and pila[-1][3].lower() != host.lower():
+                problemas.append(_problema(
+                    "sombreado", directorio,
+                    f"'{host}' nunca se aplica: '{pila[-1][3]}' aparece antes y lo cubre.", host))
+            if pila and pila[-1][2] < orden:
+                pila.append((familia, fin, pila[-1][2], pila[-1][3]))
+            else:
+                pila.append((familia, fin, orden, host))
+
+@trazado("analisis.conflictos")
+def analizar_configuracion(config_data):
+    """
+    Busca problemas en toda la tabla: hosts duplicados, exportaciones anidadas,
+    opciones contradictorias y reglas tapadas por otra anterior.
+    Devuelve {"problemas": [...], "tiempos": {comprobación: segundos}, ...}.
+    """
+    problemas = []
+    tiempos = {}
+    comprobaciones = [
+        ("duplicados", _buscar_duplicados),
+        ("anidados", _buscar_anidados),
+        ("contradicciones", _buscar_contradicciones),
+        ("sombreados", _buscar_sombreados),
+    ]
+    inicio_total = time.perf_counter()
+    for nombre, comprobacion in comprobaciones:
+        inicio = time.perf_counter()
+        comprobacion(config_data, problemas)
+        tiempos[nombre] = time.perf_counter() - inicio
+    tiempos["total"] = time.perf_counter() - inicio_total
+
+    return {
+        "problemas": problemas,
+        "tiempos": tiempos,
+        "directorios": len(config_data),
+        "reglas": sum(len(r) for r in config_data.values()),
+    }
+
+def formatear_reporte(reporte, limite=None):
+    """Texto legible del resultado de analizar_configuracion."""
+    problemas = reporte["problemas"]
+    if not problemas:
+        lineas = ["No se encontraron problemas."]
+    else:
+        lineas = [f"Se encontraron {len(problemas)} problema(s):"]
+        for p in problemas[:limite]:
+            lineas.append(f"  [{p['tipo']}] {p['directorio']}: {p['detalle']}")
+        if limite is not None and len(problemas) > limite:
+            lineas.append(f"  ... y {len(problemas) - limite} más.")
+    lineas.append(f"({reporte['directorios']} directorios, {reporte['reglas']} reglas, "
+                  f"{reporte['tiempos']['total'] * 1000:.1f} ms)")
+    return "\n".join(lineas)
+
+
+
+# --- IMPORTACIÓN DE INVENTARIOS ---
+# Archivos CSV/TSV con filas (directorio, host, opciones). Se validan con los
+# validadores compartidos y se fusionan en la tabla en una sola pasada; los
+# errores de cada fila se recogen sin detener la importación.
+_CABECERAS_INVENTARIO = {"path", "ruta", "directorio", "dir"}
+
+def _detectar_delimitador(primera_linea):
+    for delimitador in ('\t', ';'):
+        if delimitador in primera_linea:
+            return delimitador
+    return ','
+
+def leer_inventario(lineas, delimitador=None):
+    """
+    Analiza las filas (directorio, host[, opciones]) de 'lineas' (un archivo
+    abierto o una lista de líneas) sin tocar ninguna tabla, así puede hacerse
+    en otro hilo. Con coma como separador, las opciones deben ir entre
+    comillas: "rw,sync".
+
+    Devuelve (filas, errores): filas es [(número de línea, directorio, HostRule)]
+    y errores [{"linea", "error"}].
+    """
+    import csv
+    lineas = iter(lineas)
+    primera = next(lineas, None)
+    filas, errores = [], []
+    if primera is None:
+        return filas, errores
+    delimitador = delimitador or _detectar_delimitador(primera)
+
+    def texto():
+        yield primera
+        yield from lineas
+
+    for numero, fila in enumerate(csv.reader(texto(), delimiter=delimitador), 1):
+        fila = [c.strip() for c in fila]
+        if not fila or not any(fila) or fila[0].startswith('#'):
+            continue
+        if numero == 1 and fila[0].lower() in _CABECERAS_INVENTARIO:
+            continue  # Cabecera
+        if len(fila) < 2:
+            errores.append({"linea": numero, "error": "Faltan columnas (directorio, host, opciones)."})
+            continue
+
+        directorio, host = fila[0], fila[1]
+        opciones = fila[2] if len(fila) > 2 else ""
+        if not validar_directorio(directorio):
+            errores.append({"linea": numero, "error": f"Ruta inválida: '{directorio}'."})
+            continue
+        valido, mensaje = validar_host(host)
+        if not valido:
+            errores.append({"linea": numero, "error": mensaje})
+            continue
+        filas.append((numero, directorio, HostRule(host, opciones.strip('()'))))
+    return filas, errores
+
+def fusionar_inventario(filas, config_data, errores=()):
+    """
+    Aplica a 'config_data' las filas de leer_inventario. Si el host ya existe
+    en ese directorio se actualizan sus opciones; si no, se añade al final.
+
+    Devuelve {"anadidas", "actualizadas", "directorios_nuevos", "errores": [{"linea", "error"}]}.
+    """
+    informe = {"anadidas": 0, "actualizadas": 0, "directorios_nuevos": 0, "errores": list(errores)}
+
+    # Posición de cada (directorio, host) ya existente, solo en los directorios
+    # del inventario, para actualizar en O(1)
+    posiciones = {}
+    for directorio in {d for _, d, _ in filas}:
+        for i, regla in enumerate(config_data.get(directorio, ())):
+            posiciones.setdefault((directorio, regla['host']), i)
+
+    for _, directorio, regla in filas:
+        posicion = posiciones.get((directorio, regla.host))
+        if posicion is not None:
+            config_data[directorio][posicion] = regla
+            informe["actualizadas"] += 1
+            continue
+        if directorio not in config_data:
+            config_data[directorio] = []
+            informe["directorios_nuevos"] += 1
+        reglas = config_data[directorio]
+        posiciones[(directorio, regla.host)] = len(reglas)
+        reglas.append(regla)
+        informe["anadidas"] += 1
+
+    return informe
+
+def importar_inventario(lineas, config_data, delimitador=None):
+    """
+    Lee el inventario de 'lineas' y lo fusiona en 'config_data'
+    (leer_inventario + fusionar_inventario). Devuelve el informe de fusionar_inventario.
+    """
+    filas, errores = leer_inventario(lineas, delimitador)
+    return fusionar_inventario(filas, config_data, errores)
+
+@trazado("inventario.leer")
+def leer_inventario_archivo(ruta):
+    """Como leer_inventario, desde un archivo. Devuelve (bool, mensaje, (filas, errores) o None)."""
+    try:
+        with open(ruta, newline='', encoding='utf-8') as f:
+            filas, errores = leer_inventario(f)
+    except OSError as e:
+        return False, f"No se pudo leer el inventario: {e}", None
+    return True, f"{len(filas)} filas leídas, {len(errores)} con error.", (filas, errores)
+
+@trazado("inventario.importar")
+def importar_inventario_archivo(ruta, config_data):
+    """Como importar_inventario, leyendo desde un archivo. Devuelve (bool, mensaje, informe)."""
+    exito, mensaje, leido = leer_inventario_archivo(ruta)
+    if not exito:
+        return False, mensaje, None
+    filas, errores = leido
+    informe = fusionar_inventario(filas, config_data, errores)
+    return True, resumir_importacion(informe), informe
+
+def resumir_importacion(informe, limite=20):
+    """Texto breve con el resultado de una importación."""
+    lineas = [f"{informe['anadidas']} reglas añadidas, {informe['actualizadas']} actualizadas, "
+              f"{informe['directorios_nuevos']} directorios nuevos, {len(informe['errores'])} errores."]
+    for error in informe["errores"][:limite]:
+        lineas.append(f"  línea {error['linea']}: {error['error']}")
+    if len(informe["errores"]) > limite:
+        lineas.append(f"  ... y {len(informe['errores']) - limite} más.")
+    return "\n".join(lineas)
+
+
+# --- VIGILANCIA DE CAMBIOS EN DISCO ---
+# Si Puppet u otro administrador cambia /etc/exports con la GUI abierta,
+# hay que enterarse antes de guardar encima. Se usa inotify (el hilo queda
+# bloqueado en select y no gasta CPU mientras no pase nada) y, si no está
+# disponible, se comprueba el stat de cada archivo cada pocos segundos.
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_MASCARA_INOTIFY = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+def _abrir_inotify():
+    """Devuelve (libc, fd) o None si inotify no está disponible."""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    return libc, fd
+
+class VigilanteArchivos:
+    """
+    Vigila archivos y directorios y llama a callback(rutas_cambiadas) en un
+    hilo propio, agrupando las ráfagas de eventos (debounce).
+
+    - Para un archivo se vigila su directorio padre, así se detectan también
+      las escrituras atómicas (archivo temporal + rename).
+    - Para un directorio se informa de cualquier archivo que cambie dentro.
+    """
+
+    def __init__(self, rutas, callback, debounce=0.3, intervalo_sondeo=2.0):
+        self.rutas = [os.path.abspath(r) for r in rutas]
+        self.callback = callback
+        self.debounce = debounce
+        self.intervalo_sondeo = intervalo_sondeo
+        self.usa_inotify = False
+        self._hilo = None
+        self._parar = threading.Event()
+        self._despertar = None  # (lectura, escritura) del pipe que saca al hilo de select()
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        inotify = _abrir_inotify()
+        if inotify is not None:
+            self.usa_inotify = True
+            # El pipe se crea aquí y no en el hilo: detener() puede llamarse
+            # antes de que el hilo llegue a ejecutarse
+            self._despertar = os.pipe()
+            objetivo, args = self._bucle_inotify, (*inotify, self._despertar[0])
+        else:
+            objetivo, args = self._bucle_sondeo, ()
+        self._hilo = threading.Thread(target=objetivo, args=args, name="VigilanteArchivos", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._despertar is not None:
+            try:
+                os.write(self._despertar[1], b'x')
+            except OSError:
+                pass
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+            if self._hilo.is_alive():
+                return  # Sigue dentro de un callback; el pipe se cerrará en el próximo detener()
+        if self._despertar is not None:
+            for extremo in self._despertar:
+                os.close(extremo)
+            self._despertar = None
+        self._hilo = None
+
+    def _bucle_inotify(self, libc, fd, lectura):
+        try:
+            # Directorio vigilado -> (rutas de archivo que nos interesan, o None = todo el directorio)
+            por_wd = {}
+            for ruta in self.rutas:
+                directorio = ruta if os.path.isdir(ruta) else os.path.dirname(ruta)
+                wd = libc.inotify_add_watch(fd, os.fsencode(directorio), _MASCARA_INOTIFY)
+                if wd < 0:
+                    continue
+                interes = por_wd.setdefault(wd, (directorio, set()))
+                interes[1].add(None if ruta == directorio else ruta)
+
+            while not self._parar.is_set():
+                # Bloqueado sin consumir CPU hasta que haya eventos
+                listos, _, _ = select.select([fd, lectura], [], [])
+                if lectura in listos:
+                    break
+                cambiadas = self._leer_eventos(fd, por_wd)
+                # Debounce: seguir acumulando mientras lleguen eventos
+                while True:
+                    listos, _, _ = select.select([fd, lectura], [], [], self.debounce)
+                    if not listos or lectura in listos:
+                        break
+                    cambiadas |= self._leer_eventos(fd, por_wd)
+                if cambiadas and not self._parar.is_set():
+                    self.callback(cambiadas)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _leer_eventos(fd, por_wd):
+        cambiadas = set()
+        try:
+            datos = os.read(fd, 65536)
+        except BlockingIOError:
+            return cambiadas
+        desplazamiento = 0
+        while desplazamiento < len(datos):
+            wd, _, _, longitud = struct.unpack_from('iIII', datos, desplazamiento)
+            nombre = datos[desplazamiento + 16:desplazamiento + 16 + longitud].rstrip(b'\0')
+            desplazamiento += 16 + longitud
+            if wd not in por_wd or not nombre:
+                continue
+            directorio, interes = por_wd[wd]
+            ruta = os.path.join(directorio, os.fsdecode(nombre))
+            if ruta in interes:
+                cambiadas.add(ruta)
+            elif None in interes and not os.path.basename(ruta).startswith('.'):
+                cambiadas.add(ruta)
+        return cambiadas
+
+    def _firma(self):
+        """Estado (stat) de cada archivo vigilado, para el modo sondeo."""
+        firmas = {}
+        for ruta in self.rutas:
+            candidatos = [ruta]
+            if os.path.isdir(ruta):
+                candidatos = [os.path.join(ruta, n) for n in os.listdir(ruta) if not n.startswith('.')]
+            for candidato in candidatos:
+                try:
+                    st = os.stat(candidato)
+                    firmas[candidato] = (st.st_ino, st.st_mtime_ns, st.st_size)
+                except OSError:
+                    firmas[candidato] = None
+        return firmas
+
+    def _bucle_sondeo(self):
+        anterior = self._firma()
+        while not self._parar.wait(self.intervalo_sondeo):
+            actual = self._firma()
+            cambiadas = {r for r in anterior.keys() | actual.keys() if anterior.get(r) != actual.get(r)}
+            anterior = actual
+            if cambiadas:
+                self.callback(cambiadas)
+
+def fusionar_tres_vias(base, local, remoto):
+    """
+    Une los cambios hechos en la GUI (local) con los hechos en disco (remoto),
+    tomando como referencia lo que se leyó al principio (base).
+    Por directorio: si solo cambió un lado se toma ese; si cambiaron los dos
+    de forma distinta hay conflicto y se conserva la versión local.
+    Devuelve (tabla_fusionada, [directorios en conflicto]).
+    """
+    fusion = ExportTable()
+    conflictos = []
+    orden = list(remoto) + [d for d in local if d not in remoto]
+    for directorio in orden + [d for d in base if d not in remoto and d not in local]:
+        b = tuple(base[directorio]) if directorio in base else None
+        l = tuple(local[directorio]) if directorio in local else None
+        r = tuple(remoto[directorio]) if directorio in remoto else None
+        if l == b:
+            elegido = r
+        elif r == b or l == r:
+            elegido = l
+        else:
+            elegido = l
+            conflictos.append(directorio)
+        if elegido is not None and directorio not in fusion:
+            fusion[directorio] = elegido
+    # Así el escritor conserva los comentarios y el formato del archivo remoto
+    fusion._disposicion = remoto._disposicion
+    if remoto._archivos is not None:
+        fusion._archivos = dict(remoto._archivos)
+        fusion._origen = {**(local._origen or {}), **remoto._origen}
+    return fusion, conflictos
+
+
+# --- DERIVA ENTRE EL ARCHIVO Y EL KERNEL ---
+# Lo que está en /etc/exports no es necesariamente lo que el kernel sirve
+# (alguien lanzó exportfs a mano, falló un -ra...). Se lee la tabla viva
+# (etab o /proc/fs/nfsd/exports), se normalizan las opciones completando los
+# valores por defecto del kernel y se comparan regla a regla.
+
+# Opciones que el kernel aplica cuando no se indica lo contrario (exports(5))
+OPCIONES_KERNEL_DEFECTO = ("ro", "sync", "wdelay", "hide", "nocrossmnt", "secure", "root_squash",
+                           "no_all_squash", "no_subtree_check", "secure_locks", "acl", "no_pnfs",
+                           "anonuid=65534", "anongid=65534", "sec=sys")
+# Datos que el kernel añade y no corresponden a ninguna opción del archivo
+_OPCIONES_IGNORADAS_DERIVA = {"uuid", "fsid"}
+# /proc/fs/nfsd/exports muestra los sabores de seguridad por número
+_SABORES_SEC = {"1": "sys", "390003": "krb5", "390004": "krb5i", "390005": "krb5p"}
+_PATRON_OCTAL = re.compile(r'\\([0-7]{3})')
+
+_cache_kernel = {"ruta": None, "hash": None, "resultado": None}
+
+@functools.lru_cache(maxsize=4096)
+def normalizar_opciones(opciones):
+    """
+    Forma canónica de una cadena de opciones, con los valores por defecto del
+    kernel ya aplicados: tupla ordenada de "clave" o "clave=valor".
+    Dos cadenas equivalentes ("rw,sync" y "sync,rw,root_squash") dan la misma tupla.
+    """
+    efectivas = {}
+    for opcion in _combinar_opciones(",".join(OPCIONES_KERNEL_DEFECTO), opciones).split(','):
+        clave, igual, valor = opcion.partition('=')
+        if not clave or clave in _OPCIONES_IGNORADAS_DERIVA:
+            continue
+        if clave == "sec":
+            valor = ":".join(_SABORES_SEC.get(v, v) for v in valor.split(':'))
+        opuesta = _OPCIONES_OPUESTAS.get(clave)
+        if opuesta is not None:
+            # Una pareja (rw/ro...) se guarda bajo un solo nombre
+            efectivas[min(clave, opuesta)] = clave
+        else:
+            efectivas[clave] = clave + igual + valor
+    return tuple(sorted(efectivas.values()))
+
+def _desescapar_ruta(ruta):
+    """El kernel escribe los espacios y caracteres raros como \\040."""
+    if '\\' not in ruta:
+        return ruta
+    return _PATRON_OCTAL.sub(lambda m: chr(int(m.group(1), 8)), ruta)
+
+def parsear_tabla_kernel(lineas):
+    """
+    Convierte las líneas de etab o /proc/fs/nfsd/exports ("ruta\\thost(opciones)")
+    en una ExportTable, igual que leer_configuracion_exports.
+    """
+    config_data = ExportTable()
+    datos = config_data._datos
+    for linea in lineas:
+        if not linea or linea[0] == '#':
+            continue
+        partes = linea.split()
+        if len(partes) < 2:
+            continue
+        directorio = sys.intern(_desescapar_ruta(partes[0]))
+        host_info = partes[1]
+        inicio = host_info.find('(')
+        if inicio < 0:
+            regla = HostRule(host_info, "")
+        else:
+            regla = HostRule(host_info[:inicio], host_info[inicio + 1:].rstrip(')'))
+        lista = datos.get(directorio)
+        if lista is None:
+            lista = datos[directorio] = _ListaReglas()
+        list.append(lista, regla)
+    return config_data
+
+@trazado("kernel.leer")
+def leer_exportaciones_kernel(ruta=None):
+    """
+    Lee la tabla de exportaciones activa. Sin 'ruta' se usa etab y, si no
+    existe, /proc/fs/nfsd/exports. Si el contenido no cambió desde la última
+    lectura no se vuelve a analizar (en /proc el stat no sirve para saberlo).
+    Devuelve (ExportTable, ruta_leída) o (None, mensaje de error).
+    """
+    candidatos = [ruta] if ruta else [ETAB_FILE, PROC_EXPORTS_FILE]
+    for candidato in candidatos:
+        try:
+            with open(candidato, 'rb') as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            continue
+        except PermissionError:
+            return None, f"Error de Permisos: no se pudo leer {candidato}."
+        huella = hashlib.sha1(contenido).digest()
+        cache = _cache_kernel
+        if cache["ruta"] != candidato or cache["hash"] != huella:
+            texto = contenido.decode('utf-8', errors='surrogateescape')
+            cache.update(ruta=candidato, hash=huella, resultado=parsear_tabla_kernel(texto.splitlines()))
+        return cache["resultado"].copia(), candidato
+    return None, "No se encontró la tabla de exportaciones del kernel (¿está arrancado nfs-server?)."
+
+def calcular_deriva(config_archivo, config_kernel):
+    """
+    Compara la configuración del archivo con la del kernel usando opciones normalizadas.
+    Devuelve {"solo_archivo": [(dir, host, opciones)], "solo_kernel": [(dir, host, opciones)],
+              "distintas": [(dir, host, opciones_archivo, opciones_kernel)]}.
+    """
+    archivo = {(d, h.lower()): (h, o) for (d, h), o in _reglas_efectivas(config_archivo).items()}
+    kernel = {(d, h.lower()): (h, o) for (d, h), o in _reglas_efectivas(config_kernel).items()}
+
+    deriva = {"solo_archivo": [], "solo_kernel": [], "distintas": []}
+    for clave, (host, opciones) in archivo.items():
+        en_kernel = kernel.get(clave)
+        if en_kernel is None:
+            deriva["solo_archivo"].append((clave[0], host, opciones))
+        elif normalizar_opciones(opciones) != normalizar_opciones(en_kernel[1]):
+            deriva["distintas"].append((clave[0], host, opciones, en_kernel[1]))
+    for clave, (host, opciones) in kernel.items():
+        if clave not in archivo:
+            deriva["solo_kernel"].append((clave[0], host, opciones))
+    return deriva
+
+@trazado("kernel.deriva")
+def comprobar_deriva(ruta_kernel=None):
+    """
+    Lee /etc/exports (y /etc/exports.d) y la tabla del kernel y las compara.
+    Devuelve (True, deriva) o (False, mensaje de error).
+    """
+    config_kernel, origen = leer_exportaciones_kernel(ruta_kernel)
+    if config_kernel is None:
+        return False, origen
+    deriva = calcular_deriva(leer_configuracion_completa(), config_kernel)
+    deriva["origen"] = origen
+    return True, deriva
+
+def formatear_deriva(deriva, limite=20):
+    """Texto legible del resultado de calcular_deriva."""
+    total = len(deriva["solo_archivo"]) + len(deriva["solo_kernel"]) + len(deriva["distintas"])
+    if not total:
+        return "El kernel sirve exactamente lo que dice el archivo."
+    lineas = [f"{total} diferencia(s) entre el archivo y el kernel:"]
+    detalle = ([f"  + solo en el archivo: {d} {h}({o})" for d, h, o in deriva["solo_archivo"]] +
+               [f"  - solo en el kernel: {d} {h}({o})" for d, h, o in deriva["solo_kernel"]] +
+               [f"  ~ {d} {h}: archivo ({oa}) / kernel ({ok})" for d, h, oa, ok in deriva["distintas"]])
+    lineas += detalle[:limite]
+    if len(detalle) > limite:
+        lineas.append(f"  ... y {len(detalle) - limite} más.")
+    return "\n".join(lineas)
+
+
+# --- ESTADÍSTICAS DEL SERVIDOR NFS ---
+# Se leen /proc/net/rpc/nfsd (contadores acumulados de todo el servidor),
+# rmtab (montajes NFSv3 por directorio) y /proc/fs/nfsd/clients (NFSv4).
+# El kernel no da contadores de operaciones por exportación: las tasas son
+# del servidor completo y los clientes sí se reparten por directorio.
+# El historial vive en arrays de tamaño fijo (anillo), sin crecer nunca.
+
+def leer_estadisticas_nfsd(ruta=None):
+    """
+    Contadores acumulados del servidor: {"llamadas", "bytes_leidos", "bytes_escritos"}.
+    Devuelve None si el archivo no existe (servidor NFS parado).
+    """
+    try:
+        with open(ruta or PROC_NFSD_STATS) as f:
+            lineas = f.read().splitlines()
+    except OSError:
+        return None
+    contadores = {"llamadas": 0, "bytes_leidos": 0, "bytes_escritos": 0}
+    for linea in lineas:
+        partes = linea.split()
+        if len(partes) < 3:
+            continue
+        if partes[0] == "rpc":
+            contadores["llamadas"] = int(partes[1])
+        elif partes[0] == "io":
+            contadores["bytes_leidos"] = int(partes[1])
+            contadores["bytes_escritos"] = int(partes[2])
+    return contadores
+
+def _quitar_puerto(direccion):
+    """'10.0.0.5:876' -> '10.0.0.5'; '[fe80::1]:876' -> 'fe80::1'."""
+    direccion = direccion.strip('"')
+    if direccion.startswith('['):
+        return direccion[1:direccion.find(']')]
+    if direccion.count(':') == 1:
+        return direccion.split(':', 1)[0]
+    return direccion
+
+def leer_clientes_activos(ruta_rmtab=None, dir_clientes=None, memoria=None):
+    """
+    Devuelve (por_directorio, clientes_v4):
+      por_directorio = {directorio: {cliente, ...}}  montajes NFSv3 vivos (rmtab)
+      clientes_v4    = {cliente, ...}                 clientes NFSv4 conectados
+
+    'memoria' (un dict que el llamador conserva entre lecturas) evita repetir
+    trabajo: rmtab solo se vuelve a leer si cambia su stat, y de cada entrada
+    de clients/ solo se lee 'info' la primera vez que aparece (el id de un
+    cliente NFSv4 no se reutiliza para otra dirección).
+    """
+    memoria = {} if memoria is None else memoria
+    ruta_rmtab = ruta_rmtab or RMTAB_FILE
+    try:
+        estado = os.stat(ruta_rmtab)
+        firma = (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+    except OSError:
+        firma = None
+    if firma is not None and memoria.get('rmtab', (None,))[0] == firma:
+        por_directorio = memoria['rmtab'][1]
+    else:
+        por_directorio = {}
+        try:
+            with open(ruta_rmtab) as f:
+                for linea in f:
+                    # cliente:directorio:0xcontador (contador 0 = ya desmontado). Se corta
+                    # desde la derecha: un cliente IPv6 (fe80::1) también lleva ':'
+                    resto, _, contador = linea.strip().rpartition(':')
+                    cliente, _, directorio = resto.rpartition(':')
+                    if cliente and directorio and int(contador, 16) > 0:
+                        por_directorio.setdefault(directorio, set()).add(cliente)
+        except (OSError, ValueError):
+            pass
+        memoria['rmtab'] = (firma, por_directorio)
+
+    dir_clientes = dir_clientes or PROC_NFSD_CLIENTS
+    try:
+        entradas = os.listdir(dir_clientes)
+    except OSError:
+        entradas = []
+    anteriores = memoria.get('direcciones', {})
+    direcciones = {}
+    for entrada in entradas:
+        if entrada in anteriores:
+            direcciones[entrada] = anteriores[entrada]
+            continue
+        try:
+            with open(os.path.join(dir_clientes, entrada, 'info')) as f:
+                for linea in f:
+                    if linea.startswith('address:'):
+                        direcciones[entrada] = _quitar_puerto(linea.split(':', 1)[1].strip())
+                        break
+        except OSError:
+            continue
+    memoria['direcciones'] = direcciones
+    return por_directorio, set(direcciones.values())
+
+class HistorialMuestras:
+    """
+    Historial circular de tamaño fijo. Cada serie es un array('d') de
+    'capacidad' elementos, así que la memoria no depende del tiempo que
+    lleve abierta la aplicación.
+    """
+    SERIES = ("instante", "ops", "lectura", "escritura", "clientes")
+
+    def __init__(self, capacidad=900):
+        self.capacidad = capacidad
+        self._series = {nombre: array('d', bytes(8 * capacidad)) for nombre in self.SERIES}
+        self._siguiente = 0
+        self.total = 0
+
+    def anadir(self, **valores):
+        i = self._siguiente
+        for nombre, serie in self._series.items():
+            serie[i] = valores.get(nombre, 0.0)
+        self._siguiente = (i + 1) % self.capacidad
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacidad)
+
+    def serie(self, nombre):
+        """Valores de una serie, del más antiguo al más reciente."""
+        serie = self._series[nombre]
+        if self.total < self.capacidad:
+            return serie[:self.total]
+        return serie[self._siguiente:] + serie[:self._siguiente]
+
+    def ultima(self):
+        """Última muestra como dict, o None si todavía no hay ninguna."""
+        if not self.total:
+            return None
+        i = (self._siguiente - 1) % self.capacidad
+        return {nombre: serie[i] for nombre, serie in self._series.items()}
+
+class MuestreadorNFS:
+    """
+    Toma muestras de la actividad del servidor y calcula tasas por segundo.
+    Se puede llamar a muestrear() directamente (nfsctl) o lanzar un hilo propio
+    con iniciar(), que duerme en un Event entre muestras y llama a
+    callback(muestra) tras cada una, en ese hilo (muestra None = sin datos).
+    La GUI usa el hilo: leer /proc no debe bloquear la interfaz.
+    """
+
+    def __init__(self, intervalo=2.0, capacidad=900, callback=None,
+                 ruta_stats=None, ruta_rmtab=None, dir_clientes=None):
+        self.intervalo = intervalo
+        self.callback = callback
+        self.ruta_stats = ruta_stats
+        self.ruta_rmtab = ruta_rmtab
+        self.dir_clientes = dir_clientes
+        self.historial = HistorialMuestras(capacidad)
+        self.clientes_por_directorio = {}
+        self.clientes_v4 = set()
+        self._anterior = None   # (instante, contadores)
+        self._memoria_clientes = {}
+        self._clientes_v3 = (None, frozenset())   # (por_directorio, unión de sus clientes)
+        self._hilo = None
+        self._parar = threading.Event()
+
+    def muestrear(self, instante=None):
+        """
+        Lee los contadores y añade una muestra al historial.
+        Devuelve la muestra ({"ops", "lectura", "escritura", "clientes"} por
+        segundo o en número) o None si es la primera lectura o no hay datos.
+        """
+        instante = time.monotonic() if instante is None else instante
+        contadores = leer_estadisticas_nfsd(self.ruta_stats)
+        self.clientes_por_directorio, self.clientes_v4 = leer_clientes_activos(
+            self.ruta_rmtab, self.dir_clientes, self._memoria_clientes)
+        if contadores is None:
+            self._anterior = None
+            return None
+
+        anterior, self._anterior = self._anterior, (instante, contadores)
+        if anterior is None or instante <= anterior[0]:
+            return None
+        segundos = instante - anterior[0]
+        # max(0, ...): los contadores vuelven a cero si se reinicia nfsd
+        tasa = lambda clave: max(0, contadores[clave] - anterior[1][clave]) / segundos
+        # La unión solo se rehace cuando rmtab se ha vuelto a leer
+        if self._clientes_v3[0] is not self.clientes_por_directorio:
+            self._clientes_v3 = (self.clientes_por_directorio,
+                                 frozenset().union(*self.clientes_por_directorio.values()))
+        clientes = self._clientes_v3[1] | self.clientes_v4
+        muestra = {"ops": tasa("llamadas"), "lectura": tasa("bytes_leidos"),
+                   "escritura": tasa("bytes_escritos"), "clientes": len(clientes)}
+        self.historial.anadir(instante=instante, **muestra)
+        return muestra
+
+    def clientes_de(self, directorio):
+        """Número de clientes NFSv3 con 'directorio' montado."""
+        return len(self.clientes_por_directorio.get(directorio, ()))
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="MuestreadorNFS", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+        self._hilo = None
+
+    def _bucle(self):
+        self.muestrear()
+        while not self._parar.wait(self.intervalo):
+            muestra = self.muestrear()
+            if self.callback:
+                self.callback(muestra)
+
+def formatear_bytes(cantidad):
+    """1536 -> '1.5 KiB'."""
+    for unidad in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if abs(cantidad) < 1024 or unidad == "TiB":
+            return f"{cantidad:.0f} {unidad}" if unidad == "B" else f"{cantidad:.1f} {unidad}"
+        cantidad /= 1024
+
+def formatear_muestra(muestra):
+    """Texto breve de una muestra: '120 ops/s · L 3.2 MiB/s · E 1.0 MiB/s · 5 clientes'."""
+    return (f"{muestra['ops']:.0f} ops/s · L {formatear_bytes(muestra['lectura'])}/s · "
+            f"E {formatear_bytes(muestra['escritura'])}/s · {muestra['clientes']:.0f} clientes")
+
+
+# --- DESHACER / REHACER CON INSTANTÁNEAS PERSISTENTES ---
+# Copiar una tabla de 100k directorios en cada edición no es viable. Cada
+# instantánea es un MapaPersistente (trie de hash, 32 ramas por nivel):
+# cambiar un directorio solo copia el camino de la raíz a su hoja (unos
+# pocos nodos) y el resto del árbol se comparte con la instantánea anterior.
+# Comparar dos instantáneas salta los subárboles compartidos (mismo objeto),
+# así que cuesta lo proporcional a sus diferencias.
+
+_BITS_NIVEL = 5
+_MASCARA_NIVEL = (1 << _BITS_NIVEL) - 1
+_BITS_HASH = 64
+_FALTA = object()
+
+class _Nodo:
+    """Nodo interno: 'mapa' indica qué ranuras están ocupadas; 'hijos' solo guarda esas."""
+    __slots__ = ('mapa', 'hijos')
+
+    def __init__(self, mapa, hijos):
+        self.mapa = mapa
+        self.hijos = hijos   # tupla de _Nodo, _Colision o (clave, valor)
+
+class _Colision:
+    """Claves distintas con el mismo hash completo (muy raro)."""
+    __slots__ = ('pares',)
+
+    def __init__(self, pares):
+        self.pares = pares   # tupla de (clave, valor)
+
+def _hash64(clave):
+    return hash(clave) & ((1 << _BITS_HASH) - 1)
+
+def _fusionar_hojas(nivel, par1, h1, par2, h2):
+    """Nodo (o cadena de nodos) que contiene dos hojas cuyo hash coincide hasta 'nivel'."""
+    if nivel >= _BITS_HASH:
+        return _Colision((par1, par2))
+    i1 = (h1 >> nivel) & _MASCARA_NIVEL
+    i2 = (h2 >> nivel) & _MASCARA_NIVEL
+    if i1 == i2:
+        return _Nodo(1 << i1, (_fusionar_hojas(nivel + _BITS_NIVEL, par1, h1, par2, h2),))
+    if i1 < i2:
+        return _Nodo((1 << i1) | (1 << i2), (par1, par2))
+    return _Nodo((1 << i1) | (1 << i2), (par2, par1))
+
+def _asignar(nodo, nivel, h, clave, valor):
+    """Devuelve (nodo_nuevo, +1 si la clave es nueva / 0 si se reemplazó)."""
+    if isinstance(nodo, _Colision):
+        pares = [p for p in nodo.pares if p[0] != clave]
+        nuevo = len(pares) == len(nodo.pares)
+        return _Colision(tuple(pares) + ((clave, valor),)), int(nuevo)
+
+    bit = 1 << ((h >> nivel) & _MASCARA_NIVEL)
+    pos = (nodo.mapa & (bit - 1)).bit_count()
+    hijos = nodo.hijos
+    if not nodo.mapa & bit:
+        return _Nodo(nodo.mapa | bit, hijos[:pos] + ((clave, valor),) + hijos[pos:]), 1
+
+    hijo = hijos[pos]
+    if isinstance(hijo, tuple):
+        if hijo[0] == clave:
+            if hijo[1] is valor:
+                return nodo, 0
+            nuevo_hijo, anadido = (clave, valor), 0
+        else:
+            nuevo_hijo = _fusionar_hojas(nivel + _BITS_NIVEL, hijo, _hash64(hijo[0]), (clave, valor), h)
+            anadido = 1
+    else:
+        nuevo_hijo, anadido = _asignar(hijo, nivel + _BITS_NIVEL, h, clave, valor)
+        if nuevo_hijo is hijo:
+            return nodo, 0
+    return _Nodo(nodo.mapa, hijos[:pos] + (nuevo_hijo,) + hijos[pos + 1:]), anadido
+
+def _quitar(nodo, nivel, h, clave):
+    """Devuelve el nodo sin 'clave' (None si queda vacío); el mismo nodo si no estaba."""
+    if isinstance(nodo, _Colision):
+        pares = tuple(p for p in nodo.pares if p[0] != clave)
+        if len(pares) == len(nodo.pares):
+            return nodo
+        return _Colision(pares) if pares else _Nodo(0, ())
+
+    bit = 1 << ((h >> nivel) & _MASCARA_NIVEL)
+    if not nodo.mapa & bit:
+        return nodo
+    pos = (nodo.mapa & (bit - 1)).bit_count()
+    hijo = nodo.hijos[pos]
+    if isinstance(hijo, tuple):
+        if hijo[0] != clave:
+            return nodo
+        nuevo_hijo = None
+    else:
+        nuevo_hijo = _quitar(hijo, nivel + _BITS_NIVEL, h, clave)
+        if nuevo_hijo is hijo:
+            return nodo
+        # Un nodo con una sola hoja sube a ocupar su ranura
+        if isinstance(nuevo_hijo, _Nodo) and len(nuevo_hijo.hijos) == 1 and isinstance(nuevo_hijo.hijos[0], tuple):
+            nuevo_hijo = nuevo_hijo.hijos[0]
+        elif isinstance(nuevo_hijo, _Nodo) and not nuevo_hijo.hijos:
+            nuevo_hijo = None
+    if nuevo_hijo is None:
+        return _Nodo(nodo.mapa & ~bit, nodo.hijos[:pos] + nodo.hijos[pos + 1:])
+    return _Nodo(nodo.mapa, nodo.hijos[:pos] + (nuevo_hijo,) + nodo.hijos[pos + 1:])
+
+def _pares(nodo):
+    """Generador de (clave, valor) de un subárbol."""
+    if isinstance(nodo, tuple):
+        yield nodo
+        return
+    hijos = nodo.pares if isinstance(nodo, _Colision) else nodo.hijos
+    for hijo in hijos:
+        if isinstance(hijo, tuple):
+            yield hijo
+        else:
+            yield from _pares(hijo)
+
+def _diferencias_nodos(a, b, salida):
+    """Añade a 'salida' (clave, valor_a, valor_b) de las claves que difieren entre dos subárboles."""
+    if a is b:
+        return
+    if isinstance(a, _Nodo) and isinstance(b, _Nodo):
+        mapa = a.mapa | b.mapa
+        while mapa:
+            bit = mapa & -mapa
+            mapa ^= bit
+            hijo_a = a.hijos[(a.mapa & (bit - 1)).bit_count()] if a.mapa & bit else None
+            hijo_b = b.hijos[(b.mapa & (bit - 1)).bit_count()] if b.mapa & bit else None
+            if hijo_a is None:
+                salida.extend((k, _FALTA, v) for k, v in _pares(hijo_b))
+            elif hijo_b is None:
+                salida.extend((k, v, _FALTA) for k, v in _pares(hijo_a))
+            else:
+                _diferencias_nodos(hijo_a, hijo_b, salida)
+        return
+    # Hojas, colisiones o formas distintas: subárboles pequeños, se comparan directamente
+    pares_a = dict(_pares(a))
+    pares_b = dict(_pares(b))
+    for clave, valor in pares_a.items():
+        otro = pares_b.get(clave, _FALTA)
+        if otro is _FALTA or (otro is not valor and otro != valor):
+            salida.append((clave, valor, otro))
+    salida.extend((k, _FALTA, v) for k, v in pares_b.items() if k not in pares_a)
+
+def _construir(hojas, nivel):
+    """Subárbol para [(hash, (clave, valor))] cuyos hashes coinciden hasta 'nivel'."""
+    if nivel >= _BITS_HASH:
+        return _Colision(tuple(par for _, par in hojas))
+    ranuras = {}
+    for h, par in hojas:
+        ranuras.setdefault((h >> nivel) & _MASCARA_NIVEL, []).append((h, par))
+    mapa = 0
+    hijos = []
+    for indice in sorted(ranuras):
+        grupo = ranuras[indice]
+        mapa |= 1 << indice
+        hijos.append(grupo[0][1] if len(grupo) == 1 else _construir(grupo, nivel + _BITS_NIVEL))
+    return _Nodo(mapa, tuple(hijos))
+
+class MapaPersistente:
+    """
+    Dict inmutable con copia estructural: asignar() y quitar() devuelven un
+    mapa nuevo en O(log32 n) que comparte todo lo demás con el original.
+    """
+    __slots__ = ('_raiz', '_n')
+
+    def __init__(self, raiz=None, n=0):
+        self._raiz = raiz if raiz is not None else _Nodo(0, ())
+        self._n = n
+
+    @classmethod
+    def desde(cls, pares):
+        """Construye el mapa de una vez (sin copias intermedias). Las claves repetidas: gana la última."""
+        unicos = dict(pares)
+        hojas = [(_hash64(clave), (clave, valor)) for clave, valor in unicos.items()]
+        return cls(_construir(hojas, 0), len(unicos))
+
+    def asignar(self, clave, valor):
+        raiz, anadido = _asignar(self._raiz, 0, _hash64(clave), clave, valor)
+        return self if raiz is self._raiz else MapaPersistente(raiz, self._n + anadido)
+
+    def quitar(self, clave):
+        raiz = _quitar(self._raiz, 0, _hash64(clave), clave)
+        return self if raiz is self._raiz else MapaPersistente(raiz, self._n - 1)
+
+    def get(self, clave, defecto=None):
+        nodo, nivel, h = self._raiz, 0, _hash64(clave)
+        while True:
+            if isinstance(nodo, _Colision):
+                for k, v in nodo.pares:
+                    if k == clave:
+                        return v
+                return defecto
+            bit = 1 << ((h >> nivel) & _MASCARA_NIVEL)
+            if not nodo.mapa & bit:
+                return defecto
+            nodo = nodo.hijos[(nodo.mapa & (bit - 1)).bit_count()]
+            if isinstance(nodo, tuple):
+                return nodo[1] if nodo[0] == clave else defecto
+            nivel += _BITS_NIVEL
+
+    def __contains__(self, clave):
+        return self.get(clave, _FALTA) is not _FALTA
+
+    def __len__(self):
+        return self._n
+
+    def items(self):
+        return _pares(self._raiz)
+
+    def diferencias(self, otro):
+        """[(clave, valor_aquí, valor_en_otro)]; un valor ausente es None."""
+        salida = []
+        _diferencias_nodos(self._raiz, otro._raiz, salida)
+        return [(k, None if a is _FALTA else a, None if b is _FALTA else b) for k, a, b in salida]
+
+def instantanea_tabla(config_data, anterior=None, directorios=None):
+    """
+    MapaPersistente {directorio: (HostRule, ...)} de la tabla.
+    Con 'anterior' solo se actualizan los 'directorios' indicados (o, si es
+    None, los que no coinciden con 'anterior'); lo demás se comparte.
+    """
+    if anterior is None:
+        return MapaPersistente.desde((d, tuple(r)) for d, r in config_data.items())
+    mapa = anterior
+    if directorios is None:
+        for directorio, reglas in config_data.items():
+            previas = anterior.get(directorio)
+            if previas is None or len(previas) != len(reglas) or tuple(reglas) != previas:
+                mapa = mapa.asignar(directorio, tuple(reglas))
+        directorios = [d for d, _ in anterior.items() if d not in config_data]
+        for directorio in directorios:
+            mapa = mapa.quitar(directorio)
+        return mapa
+    for directorio in directorios:
+        if directorio in config_data:
+            reglas = tuple(config_data[directorio])
+            if anterior.get(directorio) != reglas:
+                mapa = mapa.asignar(directorio, reglas)
+        else:
+            mapa = mapa.quitar(directorio)
+    return mapa
+
+class HistorialCambios:
+    """
+    Pila de deshacer/rehacer sobre instantáneas persistentes de una ExportTable.
+    Tras cada edición se llama a registrar(tabla, directorios_tocados, descripción).
+    deshacer()/rehacer() modifican la tabla en su sitio tocando solo lo que cambió.
+    Junto a cada instantánea se guarda otro MapaPersistente {directorio: archivo}
+    con el origen de los directorios de /etc/exports.d, para que un directorio
+    que vuelve (deshacer un borrado o un renombrado) se guarde en su archivo.
+    """
+
+    def __init__(self, config_data, limite=500):
+        self.limite = limite
+        self.actual = instantanea_tabla(config_data)
+        self.origenes = MapaPersistente.desde(
+            (d, config_data.origen(d)) for d in config_data if config_data.origen(d) is not None)
+        self._deshacer = deque(maxlen=limite)   # (instantánea, descripción, orígenes)
+        self._rehacer = []
+
+    def registrar(self, config_data, directorios=None, descripcion=""):
+        """Guarda el estado tras una edición. 'directorios=None' compara la tabla entera."""
+        nueva = instantanea_tabla(config_data, self.actual, directorios)
+        if nueva is self.actual:
+            return False
+        if directorios is None:
+            directorios = [d for d, _, _ in self.actual.diferencias(nueva)]
+        origenes = self.origenes
+        for directorio in directorios:
+            ruta = config_data.origen(directorio) if directorio in config_data else None
+            origenes = origenes.quitar(directorio) if ruta is None else origenes.asignar(directorio, ruta)
+        self._deshacer.append((self.actual, descripcion, self.origenes))
+        self._rehacer.clear()
+        self.actual = nueva
+        self.origenes = origenes
+        return True
+
+    def puede_deshacer(self):
+        return bool(self._deshacer)
+
+    def puede_rehacer(self):
+        return bool(self._rehacer)
+
+    def descripcion_deshacer(self):
+        return self._deshacer[-1][1] if self._deshacer else ""
+
+    def descripcion_rehacer(self):
+        return self._rehacer[-1][1] if self._rehacer else ""
+
+    def deshacer(self, config_data):
+        """Vuelve al estado anterior. Devuelve (descripción, [directorios cambiados]) o None."""
+        if not self._deshacer:
+            return None
+        anterior, descripcion, origenes = self._deshacer.pop()
+        self._rehacer.append((self.actual, descripcion, self.origenes))
+        return descripcion, self._ir_a(config_data, anterior, origenes)
+
+    def rehacer(self, config_data):
+        if not self._rehacer:
+            return None
+        siguiente, descripcion, origenes = self._rehacer.pop()
+        self._deshacer.append((self.actual, descripcion, self.origenes))
+        return descripcion, self._ir_a(config_data, siguiente, origenes)
+
+    def _ir_a(self, config_data, destino, origenes):
+        cambiados = []
+        for directorio, _, reglas in self.actual.diferencias(destino):
+            if reglas is None:
+                config_data.pop(directorio, None)
+            else:
+                config_data[directorio] = reglas
+                ruta = origenes.get(directorio)
+                if ruta is not None:
+                    config_data.asignar_origen(directorio, ruta)
+            cambiados.append(directorio)
+        self.actual = destino
+        self.origenes = origenes
+        return cambiados
+
+
+# --- DESPLIEGUE EN VARIOS SERVIDORES (SSH) ---
+# La misma configuración se envía a N servidores en paralelo. Cada servidor
+# usa una conexión SSH persistente (ControlMaster): la primera orden abre la
+# conexión y las siguientes (y los despliegues posteriores) la reutilizan
+# sin repetir el handshake. El tiempo total es el del servidor más lento.
+
+HILOS_FLOTA = 16
+
+class PoolSSH:
+    """
+    Conexiones SSH reutilizables, una por servidor, mediante ControlMaster.
+    'comando_ssh' permite sustituir el binario (por ejemplo, por un
+    sustituto local en pruebas y benchmarks).
+    """
+
+    def __init__(self, usuario=None, identidad=None, puerto=None, persistencia=300,
+                 comando_ssh="ssh", timeout=30, opciones=()):
+        import shlex
+        import tempfile
+        self.usuario = usuario
+        self.identidad = identidad
+        self.puerto = puerto
+        self.persistencia = persistencia
+        self.comando_ssh = shlex.split(comando_ssh) if isinstance(comando_ssh, str) else list(comando_ssh)
+        self.timeout = timeout
+        self.opciones = list(opciones)
+        self._dir_control = tempfile.mkdtemp(prefix='nfs-ssh-')
+        self._abiertas = set()
+        self._cerrojo = threading.Lock()
+
+    def _argumentos(self, host):
+        args = self.comando_ssh + [
+            "-o", "BatchMode=yes",
+            "-o", "ControlMaster=auto",
+            # %C: hash de (usuario, host, puerto); rutas cortas para el socket
+            "-o", f"ControlPath={os.path.join(self._dir_control, '%C')}",
+            "-o", f"ControlPersist={self.persistencia}",
+            "-o", f"ConnectTimeout={self.timeout}",
+        ]
+        if self.identidad:
+            args += ["-i", self.identidad]
+        if self.puerto:
+            args += ["-p", str(self.puerto)]
+        for opcion in self.opciones:
+            args += ["-o", opcion]
+        destino = f"{self.usuario}@{host}" if self.usuario and '@' not in host else host
+        return args + [destino]
+
+    def ejecutar(self, host, comando, entrada=None, timeout=None):
+        """Ejecuta 'comando' (texto de shell) en 'host'. Devuelve CompletedProcess."""
+        import subprocess
+        with trazador.tramo("ssh", host=host):
+            resultado = subprocess.run(self._argumentos(host) + ["--", comando], input=entrada,
+                                       capture_output=True, timeout=timeout or self.timeout * 4)
+        with self._cerrojo:
+            self._abiertas.add(host)
+        return resultado
+
+    def cerrar(self):
+        """Cierra las conexiones maestras y borra los sockets."""
+        import subprocess
+        with self._cerrojo:
+            abiertas, self._abiertas = self._abiertas, set()
+        for host in abiertas:
+            try:
+                subprocess.run(self._argumentos(host)[:-1] + ["-O", "exit", self._argumentos(host)[-1]],
+                               capture_output=True, timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        try:
+            for nombre in os.listdir(self._dir_control):
+                os.unlink(os.path.join(self._dir_control, nombre))
+            os.rmdir(self._dir_control)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def comando_remoto_despliegue(ruta_remota=None, aplicar=True, comando_exportfs="exportfs"):
+    """
+    Orden de shell que recibe el archivo por stdin y lo instala de forma
+    atómica (temporal en el mismo directorio + mv) y, si se pide, lo aplica.
+    Si el contenido es idéntico no se toca el archivo ni se aplica nada:
+    solo se imprime SIN_CAMBIOS.
+    """
+    import shlex
+    ruta = shlex.quote(ruta_remota or EXPORTS_FILE)
+    instalar = f'mv "$tmp" {ruta}'
+    if aplicar:
+        instalar += f"; {shlex.quote(comando_exportfs)} -ra"
+    partes = [
+        "set -e",
+        f"mkdir -p {shlex.quote(os.path.dirname(ruta_remota or EXPORTS_FILE))}",
+        f"tmp=$(mktemp {ruta}.XXXXXX)",
+        'trap \'rm -f "$tmp"\' EXIT',
+        'cat > "$tmp"',
+        f'chmod 644 "$tmp"',
+        f'if cmp -s "$tmp" {ruta}; then echo SIN_CAMBIOS; else {instalar}; fi',
+    ]
+    return "; ".join(partes)
+
+def textos_por_archivo(config_data):
+    """
+    Texto de cada archivo exports que describe 'config_data': {ruta: texto}.
+    Una tabla de leer_configuracion_completa da /etc/exports y cada archivo de
+    /etc/exports.d por separado, con sus comentarios; otra tabla, solo /etc/exports.
+    """
+    if getattr(config_data, '_archivos', None) is None:
+        return {EXPORTS_FILE: serializar_exports(config_data)[0]}
+    return {ruta: serializar_exports(parcial)[0]
+            for ruta, parcial, _ in _repartir_por_archivo(config_data, todos=True)}
+
+def _ruta_remota_de(ruta, ruta_remota=None):
+    """
+    Dónde va en el servidor remoto el archivo local 'ruta': en la misma ruta,
+    salvo que se indique otra para /etc/exports; entonces los de /etc/exports.d
+    van al directorio "<ruta_remota>.d".
+    """
+    if ruta_remota is None:
+        return ruta
+    if ruta == EXPORTS_FILE:
+        return ruta_remota
+    return os.path.join(ruta_remota + ".d", os.path.relpath(ruta, EXPORTS_DIR))
+
+def desplegar_flota(hosts, config_data=None, pool=None, aplicar=True, ruta_remota=None,
+                    max_hilos=HILOS_FLOTA, progreso=None, cancelacion=None, **opciones_ssh):
+    """
+    Envía la configuración a todos los 'hosts' en paralelo y, si aplicar=True
+    y algo cambió, lanza 'exportfs -ra' allí. 'config_data' puede ser:
+    - None: lo que hay en este equipo (/etc/exports y /etc/exports.d);
+    - una ExportTable: cada archivo al suyo (ver textos_por_archivo);
+    - {ruta local: texto} ya renderizado, o un str con el de /etc/exports.
+    Cada archivo va a la misma ruta en el remoto (ver _ruta_remota_de).
+    Devuelve {"resultados": [{"host", "exito", "mensaje", "segundos", "sin_cambios"}],
+              "segundos": total, "bytes": tamaño enviado}.
+    """
+    import subprocess
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    hosts = list(dict.fromkeys(h.strip() for h in hosts if h.strip()))
+    if config_data is None:
+        config_data = leer_configuracion_completa()
+    if isinstance(config_data, str):
+        textos = {EXPORTS_FILE: config_data}
+    elif isinstance(config_data, dict):
+        textos = config_data
+    else:
+        textos = textos_por_archivo(config_data)
+    archivos = [(_ruta_remota_de(ruta, ruta_remota), texto.encode('utf-8', errors='surrogateescape'))
+                for ruta, texto in textos.items()]
+    # Con un solo archivo se copia y aplica en una orden; con varios, se
+    # copian todos y se aplica una vez al final si alguno cambió
+    un_paso = len(archivos) == 1
+    comandos = [comando_remoto_despliegue(destino, aplicar and un_paso) for destino, _ in archivos]
+    aplicar_aparte = aplicar and not un_paso
+
+    propio = pool is None
+    pool = pool or PoolSSH(**opciones_ssh)
+
+    def fallo(r):
+        error = r.stderr.decode(errors='replace').strip().splitlines()
+        return f"Error ({r.returncode}): {error[-1] if error else 'sin detalle'}"
+
+    def desplegar(host):
+        if cancelacion is not None and cancelacion.cancelado:
+            return {"host": host, "exito": False, "mensaje": "Cancelado.", "segundos": 0.0, "sin_cambios": False}
+        inicio = time.perf_counter()
+        try:
+            exito, sin_cambios, mensaje = True, True, None
+            for comando, (destino, datos) in zip(comandos, archivos):
+                r = pool.ejecutar(host, comando, entrada=datos)
+                if r.returncode != 0:
+                    exito, sin_cambios, mensaje = False, False, f"{destino}: {fallo(r)}"
+                    break
+                sin_cambios = sin_cambios and "SIN_CAMBIOS" in r.stdout.decode(errors='replace')
+            if exito and aplicar_aparte and not sin_cambios:
+                r = pool.ejecutar(host, "exportfs -ra")
+                if r.returncode != 0:
+                    exito, mensaje = False, fallo(r)
+            if mensaje is None:
+                mensaje = "Sin cambios." if sin_cambios else ("Aplicado." if aplicar else "Copiado.")
+        except subprocess.TimeoutExpired:
+            exito, sin_cambios, mensaje = False, False, "Tiempo de espera agotado."
+        except OSError as e:
+            exito, sin_cambios, mensaje = False, False, f"No se pudo lanzar ssh: {e}"
+        return {"host": host, "exito": exito, "mensaje": mensaje,
+                "segundos": time.perf_counter() - inicio, "sin_cambios": sin_cambios}
+
+    inicio = time.perf_counter()
+    resultados = {}
+    try:
+        with trazador.tramo("flota.desplegar", hosts=len(hosts)):
+            with ThreadPoolExecutor(max_workers=max(1, min(max_hilos, len(hosts) or 1))) as ejecutor:
+                futuros = {ejecutor.submit(desplegar, host): host for host in hosts}
+                for hechos, futuro in enumerate(as_completed(futuros), 1):
+                    resultado = futuro.result()
+                    resultados[resultado["host"]] = resultado
+                    if progreso:
+                        progreso(hechos, len(hosts), f"{resultado['host']}: {resultado['mensaje']}")
+    finally:
+        if propio:
+            pool.cerrar()
+    return {"resultados": [resultados[h] for h in hosts],
+            "segundos": time.perf_counter() - inicio, "bytes": sum(len(datos) for _, datos in archivos)}
+
+def resumir_despliegue(informe, limite=30):
+    """Texto breve del resultado de desplegar_flota."""
+    resultados = informe["resultados"]
+    fallos = [r for r in resultados if not r["exito"]]
+    lineas = [f"{len(resultados) - len(fallos)} de {len(resultados)} servidores correctos "
+              f"en {informe['segundos']:.2f} s ({formatear_bytes(informe['bytes'])} por servidor)."]
+    for r in sorted(resultados, key=lambda r: (r["exito"], -r["segundos"]))[:limite]:
+        lineas.append(f"  {'OK ' if r['exito'] else 'ERR'} {r['host']:<30} {r['segundos']:6.2f} s  {r['mensaje']}")
+    if len(resultados) > limite:
+        lineas.append(f"  ... y {len(resultados) - limite} más.")
+    return "\n".join(lineas)
+
+def leer_lista_hosts(ruta):
+    """Un servidor por línea; se ignoran líneas vacías y comentarios."""
+    with open(ruta) as f:
+        return [l.split('#', 1)[0].strip() for l in f if l.split('#', 1)[0].strip()]
@@ -0,0 +1,314 @@
+"""
+Piezas de Qt compartidas por la GUI (main.py).
+Este módulo es el único, junto con main.py, que importa PyQt6:
+nfs_logic debe poder usarse sin Qt.
+"""
+import importlib.util
+import inspect
+import os
+
+from PyQt6.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QRunnable, QSortFilterProxyModel,
+    QThreadPool, Qt, pyqtSignal
+)
+from PyQt6.QtGui import QPalette
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate
+
+
+# --- CLASES DE INTERFAZ PRECOMPILADAS ---
+# uic.loadUi vuelve a leer y analizar el XML del .ui cada vez. Aquí el .ui
+# se compila una sola vez a un módulo Python (Ui/__uicache__/ui_<nombre>.py)
+# que se regenera solo si el .ui es más nuevo.
+
+DIRECTORIO_CACHE_UI = os.path.join('Ui', '__uicache__')
+
+def cargar_clase_ui(ruta_ui, directorio_cache=DIRECTORIO_CACHE_UI):
+    """
+    Devuelve la clase Ui_<Nombre> generada a partir de 'ruta_ui'.
+    Se usa como mixin: class Ventana(QMainWindow, Clase): ... self.setupUi(self)
+    """
+    base = os.path.splitext(os.path.basename(ruta_ui))[0]
+    nombre_modulo = 'ui_' + "".join(c if c.isalnum() else '_' for c in base)
+    ruta_py = os.path.join(directorio_cache, nombre_modulo + '.py')
+
+    try:
+        if not os.path.exists(ruta_py) or os.path.getmtime(ruta_py) < os.path.getmtime(ruta_ui):
+            # uic solo se importa cuando hace falta compilar
+            from PyQt6 import uic
+            os.makedirs(directorio_cache, exist_ok=True)
+            ruta_tmp = ruta_py + '.tmp'
+            with open(ruta_ui, encoding='utf-8') as entrada, open(ruta_tmp, 'w', encoding='utf-8') as salida:
+                uic.compileUi(entrada, salida)
+            os.replace(ruta_tmp, ruta_py)
+    except OSError:
+        # Sin permisos para escribir la caché: se compila en memoria
+        from PyQt6 import uic
+        return uic.loadUiType(ruta_ui)[0]
+
+    spec = importlib.util.spec_from_file_location(nombre_modulo, ruta_py)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return next(getattr(modulo, n) for n in dir(modulo) if n.startswith('Ui_'))
+
+
+# --- TAREAS EN SEGUNDO PLANO ---
+# systemctl y exportfs pueden tardar segundos en un servidor cargado.
+# Todas las llamadas de nfs_logic que lanzan procesos se ejecutan aquí,
+# fuera del hilo de la interfaz.
+
+class Cancelacion:
+    """Bandera compartida entre la GUI y la tarea para pedir que se detenga."""
+    __slots__ = ('cancelado',)
+
+    def __init__(self):
+        self.cancelado = False
+
+    def cancelar(self):
+        self.cancelado = True
+
+
+class _SenalesTarea(QObject):
+    """Señales de una tarea. Se crean en el hilo de la GUI, así que llegan allí en cola."""
+    progreso = pyqtSignal(int, int, str)   # hecho, total, mensaje
+    terminado = pyqtSignal(object)         # valor devuelto por la función
+    fallo = pyqtSignal(str)                # excepción no controlada
+
+
+class _Tarea(QRunnable):
+    def __init__(self, funcion, args, kwargs, senales, cancelacion):
+        super().__init__()
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.senales = senales
+        self.cancelacion = cancelacion
+
+    def run(self):
+        if self.cancelacion.cancelado:
+            self.senales.terminado.emit(None)
+            return
+        try:
+            resultado = self.funcion(*self.args, **self.kwargs)
+        except Exception as e:
+            self.senales.fallo.emit(f"{type(e).__name__}: {e}")
+            return
+        self.senales.terminado.emit(resultado)
+
+
+class GestorTareas(QObject):
+    """
+    Lanza funciones de nfs_logic en un QThreadPool y avisa por señales.
+
+    - Cada tarea tiene una clave ("aplicar", "servicio"...). Si se pide otra
+      vez una clave que ya está en marcha, la petición se fusiona: solo se
+      guarda la última y se lanza cuando acabe la actual.
+    - Si la función acepta los parámetros 'progreso' o 'cancelacion', se le
+      pasan automáticamente.
+    """
+    progreso = pyqtSignal(str, int, int, str)   # clave, hecho, total, mensaje
+    terminado = pyqtSignal(str, object)         # clave, resultado
+    fallo = pyqtSignal(str, str)                # clave, mensaje
+    ocupado_cambiado = pyqtSignal(bool)
+
+    def __init__(self, parent=None, max_hilos=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_hilos)
+        self._en_marcha = {}    # clave -> (senales, Cancelacion, al_terminar)
+        self._pendientes = {}   # clave -> (funcion, args, kwargs, al_terminar)
+
+    def lanzar(self, clave, funcion, *args, al_terminar=None, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) en segundo plano."""
+        if clave in self._en_marcha:
+            self._pendientes[clave] = (funcion, args, kwargs, al_terminar)
+            return
+
+        cancelacion = Cancelacion()
+        senales = _SenalesTarea()
+        parametros = inspect.signature(funcion).parameters
+        if 'progreso' in parametros:
+            kwargs['progreso'] = lambda hecho, total, mensaje="": senales.progreso.emit(hecho, total, mensaje)
+        if 'cancelacion' in parametros:
+            kwargs['cancelacion'] = cancelacion
+
+        senales.progreso.connect(lambda h, t, m: self.progreso.emit(clave, h, t, m))
+        senales.terminado.connect(lambda r: self._al_finalizar(clave, r, None))
+        senales.fallo.connect(lambda m: self._al_finalizar(clave, None, m))
+
+        self._en_marcha[clave] = (senales, cancelacion, al_terminar)
+        if len(self._en_marcha) == 1:
+            self.ocupado_cambiado.emit(True)
+        self.pool.start(_Tarea(funcion, args, kwargs, senales, cancelacion))
+
+    def cancelar(self, clave):
+        """Pide a la tarea que se detenga y descarta las peticiones pendientes."""
+        self._pendientes.pop(clave, None)
+        if clave in self._en_marcha:
+            self._en_marcha[clave][1].cancelar()
+
+    def ocupado(self, clave=None):
+        if clave is None:
+            return bool(self._en_marcha)
+        return clave in self._en_marcha
+
+    def esperar(self, milisegundos=-1):
+        """Espera a que terminen las tareas (por ejemplo, al cerrar la ventana)."""
+        return self.pool.waitForDone(milisegundos)
+
+    def _al_finalizar(self, clave, resultado, error):
+        senales, cancelacion, al_terminar = self._en_marcha.pop(clave)
+        senales.deleteLater()
+
+        if not cancelacion.cancelado:
+            if error is not None:
+                self.fallo.emit(clave, error)
+                if al_terminar:
+                    al_terminar((False, error))
+            else:
+                self.terminado.emit(clave, resultado)
+                if al_terminar:
+                    al_terminar(resultado)
+
+        # Si mientras tanto llegó otra petición con la misma clave, se lanza ahora
+        if clave in self._pendientes:
+            funcion, args, kwargs, al_terminar = self._pendientes.pop(clave)
+            self.lanzar(clave, funcion, *args, al_terminar=al_terminar, **kwargs)
+        elif not self._en_marcha:
+            self.ocupado_cambiado.emit(False)
+
+
+# --- MODELO DE LA TABLA DE HOSTS ---
+# La tabla ya no copia los datos en QTableWidgetItems: el modelo lee
+# directamente la lista de HostRule del directorio seleccionado y solo
+# se pide a Qt lo que está visible en pantalla.
+
+class ModeloHosts(QAbstractTableModel):
+    """Modelo de solo lectura sobre config_data[directorio] (lista de HostRule)."""
+    COLUMNAS = ("Host", "Opciones")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._reglas = []
+        self.directorio = None
+
+    def set_directorio(self, config_data, directorio):
+        """Muestra los hosts de 'directorio' (o nada si es None o no existe)."""
+        self.beginResetModel()
+        if directorio is not None and directorio in config_data:
+            self._reglas = config_data[directorio]
+            self.directorio = directorio
+        else:
+            self._reglas = []
+            self.directorio = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._reglas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        regla = self._reglas[index.row()]
+        return regla.host if index.column() == 0 else regla.options
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientacion == Qt.Orientation.Horizontal:
+            return self.COLUMNAS[seccion]
+        return super().headerData(seccion, orientacion, role)
+
+    def regla(self, fila):
+        return self._reglas[fila]
+
+    # Cambios puntuales: solo se notifica la fila afectada
+
+    def anadir_regla(self, regla):
+        fila = len(self._reglas)
+        self.beginInsertRows(QModelIndex(), fila, fila)
+        self._reglas.append(regla)
+        self.endInsertRows()
+
+    def reemplazar_regla(self, fila, regla):
+        self._reglas[fila] = regla
+        self.dataChanged.emit(self.index(fila, 0), self.index(fila, len(self.COLUMNAS) - 1))
+
+    def eliminar_regla(self, fila):
+        self.beginRemoveRows(QModelIndex(), fila, fila)
+        del self._reglas[fila]
+        self.endRemoveRows()
+
+
+def crear_proxy_hosts(modelo, parent=None):
+    """Proxy de ordenación y filtrado (sin distinguir mayúsculas) sobre ambas columnas."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(modelo)
+    proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    proxy.setFilterKeyColumn(-1)
+    return proxy
+
+
+# --- AVISOS DEL VIGILANTE DE ARCHIVOS ---
+# nfs_logic.VigilanteArchivos llama a su callback desde su propio hilo;
+# este puente lo convierte en una señal que llega en cola al hilo de la GUI.
+
+class PuenteVigilante(QObject):
+    """Arranca un VigilanteArchivos y emite 'cambiados(set de rutas)' en el hilo de la GUI."""
+    cambiados = pyqtSignal(object)
+
+    def __init__(self, vigilante_cls, rutas, parent=None, **kwargs):
+        super().__init__(parent)
+        self.vigilante = vigilante_cls(rutas, self.cambiados.emit, **kwargs)
+
+    def iniciar(self):
+        self.vigilante.iniciar()
+
+    def detener(self):
+        self.vigilante.detener()
+
+
+class PuenteMuestreador(QObject):
+    """
+    Arranca un MuestreadorNFS en su propio hilo y emite en el hilo de la GUI
+    'muestra(muestra o None, {directorio: clientes})' tras cada lectura.
+    """
+    muestra = pyqtSignal(object, object)
+
+    def __init__(self, muestreador_cls, parent=None, **kwargs):
+        super().__init__(parent)
+        self.muestreador = muestreador_cls(callback=self._al_muestrear, **kwargs)
+
+    def _al_muestrear(self, muestra):
+        # Se emite lo leído en este hilo: la GUI no vuelve a mirar el muestreador
+        self.muestra.emit(muestra, self.muestreador.clientes_por_directorio)
+
+    def iniciar(self):
+        self.muestreador.iniciar()
+
+    def detener(self):
+        self.muestreador.detener()
+
+
+# --- DATOS JUNTO A CADA DIRECTORIO ---
+# listaDirectorios es un QListWidget cuyo texto es la ruta (se usa como clave
+# en toda la GUI), así que los datos extra (clientes, uso de disco...) van en
+# un rol aparte y este delegado los pinta alineados a la derecha.
+
+ROL_DETALLE = Qt.ItemDataRole.UserRole + 1
+
+class DelegadoDirectorios(QStyledItemDelegate):
+    """Pinta el texto de ROL_DETALLE a la derecha de cada elemento, en gris."""
+
+    def paint(self, painter, opcion, indice):
+        super().paint(painter, opcion, indice)
+        detalle = indice.data(ROL_DETALLE)
+        if not detalle:
+            return
+        painter.save()
+        grupo = QPalette.ColorRole.HighlightedText if opcion.state & QStyle.StateFlag.State_Selected \
+            else QPalette.ColorRole.PlaceholderText
+        painter.setPen(opcion.palette.color(grupo))
+        painter.drawText(opcion.rect.adjusted(0, 0, -6, 0),
+                         Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, detalle)
+        painter.restore()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+nfsctl: gestión de /etc/exports desde la línea de comandos.
+
+Usa la misma lógica que la GUI (nfs_logic) pero nunca importa PyQt6,
+así que arranca en milisegundos y sirve para scripts y automatización.
+
+Ejemplos:
+    nfsctl listar
+    nfsctl anadir /srv/datos 192.168.1.0/24 --opciones rw,sync,no_subtree_check
+    nfsctl quitar /srv/datos 192.168.1.0/24
+    nfsctl analizar
+    nfsctl deriva                   # compara el archivo con lo que sirve el kernel
+    nfsctl estadisticas -n 5        # ops/s, lectura/escritura y clientes cada 2 s
+    nfsctl --tiempos --traza t.json anadir ...   # tiempos por fase y traza para Perfetto
+    nfsctl lote cambios.json        # o: generador | nfsctl lote -
+    nfsctl importar inventario.csv  # filas directorio,host,"opciones"
+
+Formato de 'lote' (una sola lectura, una escritura y una aplicación):
+    [
+        {"op": "anadir", "directorio": "/srv/a", "host": "*", "opciones": "ro"},
+        {"op": "anadir", "directorio": "/srv/d", "host": "*", "archivo": "/etc/exports.d/d.exports"},
+        {"op": "quitar", "directorio": "/srv/b", "host": "10.0.0.1"},
+        {"op": "quitar", "directorio": "/srv/c"}
+    ]
+"""
+import argparse
+import json
+import sys
+import time
+
+import nfs_logic
+
+
+# --- OPERACIONES SOBRE LA TABLA (en memoria) ---
+
+def _op_anadir(config_data, directorio, host, opciones="", crear=False, archivo=None):
+    """
+    Añade (o reemplaza, si ya existe ese host) una regla. Devuelve (bool, mensaje).
+    'archivo' elige dónde se guarda un directorio nuevo (p. ej. /etc/exports.d/equipo.exports).
+    """
+    if not nfs_logic.validar_directorio(directorio):
+        return False, f"Ruta inválida: '{directorio}'."
+    valido, mensaje = nfs_logic.validar_host(host)
+    if not valido:
+        return False, mensaje
+
+    if crear and not nfs_logic.verificar_directorio(directorio):
+        exito, mensaje = nfs_logic.crear_directorio(directorio)
+        if not exito:
+            return False, mensaje
+
+    regla = nfs_logic.HostRule(host, opciones)
+    if archivo and directorio not in config_data:
+        config_data.asignar_origen(directorio, archivo)
+    reglas = config_data.setdefault(directorio, [])
+    for i, existente in enumerate(reglas):
+        if existente.host == host:
+            reglas[i] = regla
+            return True, f"Actualizado {host} en {directorio}."
+    reglas.append(regla)
+    return True, f"Añadido {host}({opciones}) a {directorio}."
+
+def _op_quitar(config_data, directorio, host=None):
+    """Quita un host de un directorio, o el directorio completo si no se indica host."""
+    if directorio not in config_data:
+        return False, f"El directorio '{directorio}' no está en la configuración."
+    if host is None:
+        del config_data[directorio]
+        return True, f"Eliminado {directorio}."
+
+    reglas = config_data[directorio]
+    restantes = [r for r in reglas if r.host != host]
+    if len(restantes) == len(reglas):
+        return False, f"El host '{host}' no está en {directorio}."
+    reglas[:] = restantes
+    return True, f"Eliminado {host} de {directorio}."
+
+def aplicar_operaciones(config_data, operaciones):
+    """
+    Aplica una lista de operaciones (dicts como los del formato 'lote').
+    Los errores de cada operación se recogen sin detener el resto.
+    Devuelve [(bool, mensaje), ...].
+    """
+    resultados = []
+    for numero, op in enumerate(operaciones, 1):
+        try:
+            tipo = op["op"]
+            if tipo == "anadir":
+                resultado = _op_anadir(config_data, op["directorio"], op["host"],
+                                       op.get("opciones", ""), op.get("crear", False), op.get("archivo"))
+            elif tipo == "quitar":
+                resultado = _op_quitar(config_data, op["directorio"], op.get("host"))
+            else:
+                resultado = (False, f"Operación desconocida: '{tipo}'.")
+        except (KeyError, TypeError) as e:
+            resultado = (False, f"Operación mal formada ({e}).")
+        resultados.append((resultado[0], f"#{numero}: {resultado[1]}"))
+    return resultados
+
+
+# --- SUBCOMANDOS ---
+
+def cmd_listar(args, config_data):
+    if args.json:
+        datos = {d: [{"host": r.host, "options": r.options} for r in reglas]
+                 for d, reglas in config_data.items()}
+        print(json.dumps(datos, indent=2, ensure_ascii=False))
+    else:
+        sys.stdout.write(nfs_logic.serializar_exports(config_data)[0])
+    return 0
+
+def cmd_analizar(args, config_data):
+    reporte = nfs_logic.analizar_configuracion(config_data)
+    if args.json:
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+    else:
+        print(nfs_logic.formatear_reporte(reporte))
+    return 1 if reporte["problemas"] else 0
+
+def cmd_deriva(args, config_data):
+    config_kernel, origen = nfs_logic.leer_exportaciones_kernel(args.kernel)
+    if config_kernel is None:
+        print(origen, file=sys.stderr)
+        return 2
+    deriva = nfs_logic.calcular_deriva(config_data, config_kernel)
+    if args.json:
+        print(json.dumps(dict(deriva, origen=origen), indent=2, ensure_ascii=False))
+    else:
+        print(nfs_logic.formatear_deriva(deriva))
+    return 1 if any(deriva.values()) else 0
+
+def cmd_estadisticas(args, config_data):
+    muestreador = nfs_logic.MuestreadorNFS(intervalo=args.intervalo)
+    muestreador.muestrear()
+    if nfs_logic.leer_estadisticas_nfsd() is None:
+        print(f"No se pudo leer {nfs_logic.PROC_NFSD_STATS} (¿está arrancado nfs-server?).", file=sys.stderr)
+        return 2
+    try:
+        for _ in range(args.muestras):
+            time.sleep(args.intervalo)
+            muestra = muestreador.muestrear()
+            if muestra is None:
+                continue
+            print(nfs_logic.formatear_muestra(muestra))
+            for directorio in config_data:
+                clientes = muestreador.clientes_por_directorio.get(directorio)
+                if clientes:
+                    print(f"  {directorio}: {', '.join(sorted(clientes))}")
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def cmd_desplegar(args, config_data):
+    hosts = list(args.servidores)
+    if args.hosts_archivo:
+        try:
+            hosts += nfs_logic.leer_lista_hosts(args.hosts_archivo)
+        except OSError as e:
+            print(f"Error leyendo la lista de servidores: {e}", file=sys.stderr)
+            return 2
+    if not hosts:
+        print("No se indicó ningún servidor.", file=sys.stderr)
+        return 2
+
+    def progreso(hechos, total, mensaje):
+        print(f"[{hechos}/{total}] {mensaje}", file=sys.stderr)
+
+    informe = nfs_logic.desplegar_flota(
+        hosts, config_data, aplicar=not args.no_aplicar, ruta_remota=args.ruta_remota,
+        max_hilos=args.paralelo, progreso=None if args.json else progreso,
+        usuario=args.usuario, identidad=args.identidad, puerto=args.puerto, comando_ssh=args.ssh)
+    if args.json:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        print(nfs_logic.resumir_despliegue(informe))
+    return 0 if all(r["exito"] for r in informe["resultados"]) else 1
+
+def cmd_uso(args, config_data):
+    rutas = args.directorios or list(config_data)
+    if not rutas:
+        print("No hay directorios exportados.", file=sys.stderr)
+        return 2
+    resultados = nfs_logic.medir_uso_exportaciones(rutas, completo=args.completo)
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    else:
+        print(nfs_logic.formatear_uso(resultados))
+    return 1 if any(uso["error"] for uso in resultados.values()) else 0
+
+def cmd_permisos(args, config_data):
+    if args.opciones is not None:
+        permisos, mensaje = nfs_logic.permisos_implicados(args.opciones)
+    elif args.directorio in config_data:
+        permisos, mensaje = nfs_logic.permisos_de_reglas(config_data[args.directorio])
+    else:
+        permisos, mensaje = None, f"'{args.directorio}' no está exportado; indique --opciones."
+    if permisos is None:
+        print(mensaje, file=sys.stderr)
+        return 2
+
+    def progreso(hechos, total, mensaje):
+        print(f"\r[{hechos}/{total} directorios] {mensaje}", end="", file=sys.stderr, flush=True)
+
+    informe = nfs_logic.aplicar_permisos_arbol(
+        args.directorio, permisos["uid"], permisos["gid"], permisos["modo_dirs"], permisos["modo_archivos"],
+        max_hilos=args.paralelo, progreso=None if args.json else progreso)
+    if args.json:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        print(file=sys.stderr)
+        print(nfs_logic.resumir_permisos(informe))
+    return 1 if informe["errores"] else 0
+
+def _operaciones_de_args(args):
+    if args.comando == "anadir":
+        return [{"op": "anadir", "directorio": args.directorio, "host": args.host,
+                 "opciones": args.opciones, "crear": args.crear, "archivo": args.destino}]
+    if args.comando == "quitar":
+        return [{"op": "quitar", "directorio": args.directorio, "host": args.host}]
+
+    if args.comando == "importar":
+        return []
+
+    # lote: JSON desde archivo o stdin
+    if args.archivo_lote == "-":
+        return json.load(sys.stdin)
+    with open(args.archivo_lote) as f:
+        return json.load(f)
+
+def cmd_modificar(args, config_data):
+    """anadir / quitar / lote / importar: un solo ciclo de lectura, escritura y aplicación."""
+    try:
+        operaciones = _operaciones_de_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error leyendo el lote: {e}", file=sys.stderr)
+        return 2
+
+    original = config_data.copia()
+    resultados = aplicar_operaciones(config_data, operaciones)
+    if args.comando == "importar":
+        exito, mensaje, informe = nfs_logic.importar_inventario_archivo(args.inventario, config_data)
+        if not exito:
+            print(mensaje, file=sys.stderr)
+            return 2
+        resultados.append((not informe["errores"], mensaje))
+    fallos = 0
+    for exito, mensaje in resultados:
+        print(mensaje, file=sys.stdout if exito else sys.stderr)
+        fallos += not exito
+
+    if args.dry_run:
+        print(nfs_logic.aplicar_cambios_nfs(original, config_data, dry_run=True)[1])
+        return 1 if fallos else 0
+
+    exito, mensaje = nfs_logic.escribir_configuracion_exports(config_data)
+    print(mensaje, file=sys.stdout if exito else sys.stderr)
+    if not exito:
+        return 1
+
+    if not args.no_aplicar:
+        exito, mensaje = nfs_logic.aplicar_cambios_nfs(original, config_data)
+        print(mensaje, file=sys.stdout if exito else sys.stderr)
+        if not exito:
+            return 1
+
+    return 1 if fallos else 0
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="nfsctl", description="Gestiona las exportaciones NFS sin interfaz gráfica.")
+    parser.add_argument("--archivo", default=nfs_logic.EXPORTS_FILE,
+                        help=f"archivo exports a usar (por defecto {nfs_logic.EXPORTS_FILE})")
+    parser.add_argument("--directorio-exports", default=nfs_logic.EXPORTS_DIR,
+                        help=f"directorio con archivos *.exports adicionales (por defecto {nfs_logic.EXPORTS_DIR})")
+    parser.add_argument("--tiempos", action="store_true",
+                        help="muestra en stderr cuánto tardó cada fase (leer, escribir, exportfs...)")
+    parser.add_argument("--traza", metavar="ARCHIVO",
+                        help="guarda los tramos medidos en un JSON para chrome://tracing o Perfetto")
+    parser.add_argument("--asignaciones", action="store_true",
+                        help="anota también la memoria asignada en cada tramo (más lento)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("listar", help="muestra las exportaciones")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_listar)
+
+    p = sub.add_parser("analizar", help="busca conflictos entre reglas")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_analizar)
+
+    p = sub.add_parser("deriva", help="compara el archivo con la tabla de exportaciones del kernel")
+    p.add_argument("--kernel", help=f"tabla a leer (por defecto {nfs_logic.ETAB_FILE} "
+                                    f"o {nfs_logic.PROC_EXPORTS_FILE})")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_deriva)
+
+    p = sub.add_parser("estadisticas", help="muestra la actividad del servidor NFS")
+    p.add_argument("-n", "--muestras", type=int, default=10)
+    p.add_argument("--intervalo", type=float, default=2.0)
+    p.set_defaults(funcion=cmd_estadisticas)
+
+    p = sub.add_parser("uso", help="muestra lo que ocupa cada exportación (con caché entre ejecuciones)")
+    p.add_argument("directorios", nargs="*", help="por defecto, todos los exportados")
+    p.add_argument("--completo", action="store_true",
+                   help="relee todos los directorios, aunque su fecha de modificación no haya cambiado")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_uso)
+
+    p = sub.add_parser("permisos", help="pone el dueño que exige all_squash/anonuid a todo el árbol")
+    p.add_argument("directorio")
+    p.add_argument("--opciones", help="opciones a usar en vez de las reglas del directorio")
+    p.add_argument("--paralelo", type=int, default=nfs_logic.HILOS_PERMISOS, help="hilos de trabajo")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_permisos)
+
+    p = sub.add_parser("desplegar", help="envía la configuración a varios servidores por SSH en paralelo")
+    p.add_argument("servidores", nargs="*", help="servidores destino ([usuario@]host)")
+    p.add_argument("--hosts-archivo", metavar="ARCHIVO", help="archivo con un servidor por línea")
+    p.add_argument("--usuario", help="usuario SSH remoto")
+    p.add_argument("--identidad", metavar="CLAVE", help="clave privada SSH (ssh -i)")
+    p.add_argument("--puerto", type=int)
+    p.add_argument("--ruta-remota", default=nfs_logic.EXPORTS_FILE,
+                   help=f"archivo destino en cada servidor (por defecto {nfs_logic.EXPORTS_FILE}); "
+                        "los de exports.d van a RUTA_REMOTA.d/")
+    p.add_argument("--paralelo", type=int, default=nfs_logic.HILOS_FLOTA,
+                   help="servidores a la vez")
+    p.add_argument("--ssh", default="ssh", help="comando ssh a usar")
+    p.add_argument("--no-aplicar", action="store_true", help="copia el archivo pero no llama a exportfs")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(funcion=cmd_desplegar)
+
+    modificadores = argparse.ArgumentParser(add_help=False)
+    modificadores.add_argument("--no-aplicar", action="store_true",
+                               help="guarda el archivo pero no llama a exportfs")
+    modificadores.add_argument("--dry-run", action="store_true",
+                               help="no guarda nada; muestra los comandos exportfs que se lanzarían")
+
+    p = sub.add_parser("anadir", parents=[modificadores], help="añade un host a un directorio")
+    p.add_argument("directorio")
+    p.add_argument("host")
+    p.add_argument("--opciones", default="rw,sync,no_subtree_check")
+    p.add_argument("--crear", action="store_true", help="crea el directorio si no existe")
+    p.add_argument("--destino", metavar="ARCHIVO",
+                   help=f"archivo donde guardar un directorio nuevo (p. ej. {nfs_logic.EXPORTS_DIR}/equipo.exports)")
+    p.set_defaults(funcion=cmd_modificar)
+
+    p = sub.add_parser("quitar", parents=[modificadores], help="quita un host o un directorio entero")
+    p.add_argument("directorio")
+    p.add_argument("host", nargs="?")
+    p.set_defaults(funcion=cmd_modificar)
+
+    p = sub.add_parser("lote", parents=[modificadores], help="aplica operaciones JSON desde archivo o '-'")
+    p.add_argument("archivo_lote")
+    p.set_defaults(funcion=cmd_modificar)
+
+    p = sub.add_parser("importar", parents=[modificadores],
+                       help="importa un inventario CSV/TSV de filas directorio,host,opciones")
+    p.add_argument("inventario")
+    p.set_defaults(funcion=cmd_modificar)
+
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    nfs_logic.EXPORTS_FILE = args.archivo
+    nfs_logic.EXPORTS_DIR = args.directorio_exports
+    if args.traza:
+        nfs_logic.trazador.grabar()
+    if args.asignaciones:
+        nfs_logic.trazador.medir_asignaciones()
+    try:
+        try:
+            config_data = nfs_logic.leer_configuracion_completa()
+        except PermissionError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return args.funcion(args, config_data)
+    finally:
+        if args.tiempos:
+            print(nfs_logic.formatear_resumen_tiempos(), file=sys.stderr)
+        if args.traza:
+            print(nfs_logic.trazador.exportar_traza(args.traza)[1], file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import nfs_logic
+from nfs_logic import ExportTable, HostRule
+
+
+def _tipos(config):
+    return [(p["tipo"], p["directorio"]) for p in nfs_logic.analizar_configuracion(config)["problemas"]]
+
+
+def test_anidado_simple():
+    config = ExportTable({"/srv": [HostRule("*", "ro")], "/srv/a": [HostRule("*", "ro")]})
+    assert _tipos(config) == [("anidado", "/srv/a")]
+
+
+def test_anidado_con_hermano_de_prefijo_comun():
+    # '/srv-a' ordena entre '/srv' y '/srv/a' si se compara como cadena
+    config = ExportTable({
+        "/srv": [HostRule("*", "ro")],
+        "/srv-a": [HostRule("*", "ro")],
+        "/srv/a": [HostRule("*", "ro")],
+    })
+    assert _tipos(config) == [("anidado", "/srv/a")]
+
+
+def test_sin_anidados_entre_hermanos():
+    config = ExportTable({"/srv": [HostRule("*", "ro")], "/srv-a": [HostRule("*", "ro")]})
+    assert _tipos(config) == []
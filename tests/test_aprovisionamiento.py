@@ -0,0 +1,16 @@
+import nfs_logic
+
+
+def test_crear_directorios_informa_de_cada_ruta(tmp_path):
+    bloqueo = tmp_path / "archivo"
+    bloqueo.write_text("no es un directorio")
+    rutas = [str(tmp_path / "a" / "b"), str(bloqueo / "c")]
+    avisos = []
+
+    informe = nfs_logic.crear_directorios(rutas, progreso=lambda h, t, m: avisos.append((h, t, m)))
+
+    assert [r["exito"] for r in informe] == [True, False]
+    assert sorted(h for h, _, _ in avisos) == [1, 2] and {t for _, t, _ in avisos} == {2}
+    mensajes = {m for _, _, m in avisos}
+    assert f"Directorio creado: {rutas[0]}" in mensajes
+    assert any(m.startswith(f"No se pudo crear {rutas[1]}: ") for m in mensajes)
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import nfs_logic
+from conftest import FIXTURES
+
+
+def _leer_fixture(nombre):
+    with open(os.path.join(FIXTURES, nombre)) as f:
+        return f.read().splitlines()
+
+
+@pytest.fixture
+def config_archivo(monkeypatch):
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", os.path.join(FIXTURES, "exports"))
+    nfs_logic.limpiar_cache_exports()
+    yield nfs_logic.leer_configuracion_exports()
+    nfs_logic.limpiar_cache_exports()
+
+
+# --- parsear_tabla_kernel ---
+
+def test_etab_desescapa_rutas_con_espacios():
+    tabla = nfs_logic.parsear_tabla_kernel(_leer_fixture("etab"))
+    assert "/srv/nfs compartido" in tabla
+    assert "/srv/nfs\\040compartido" not in tabla
+    assert [r.host for r in tabla["/srv/nfs compartido"]] == ["192.168.1.0/24"]
+
+
+def test_etab_conserva_varios_hosts_por_directorio_en_orden():
+    tabla = nfs_logic.parsear_tabla_kernel(_leer_fixture("etab"))
+    assert [r.host for r in tabla["/srv/datos"]] == ["*", "10.0.0.5"]
+    assert "no_root_squash" in tabla["/srv/datos"][1].options
+
+
+def test_proc_exports_ignora_comentarios():
+    tabla = nfs_logic.parsear_tabla_kernel(_leer_fixture("proc_nfsd_exports"))
+    assert sorted(tabla) == ["/srv/datos", "/srv/kerberos", "/srv/nfs compartido"]
+    assert tabla["/srv/kerberos"][0].host == "*.empresa.com"
+
+
+# --- normalizar_opciones ---
+
+def test_normalizar_expande_los_valores_por_defecto_del_kernel():
+    etab = nfs_logic.parsear_tabla_kernel(_leer_fixture("etab"))
+    completa = etab["/srv/datos"][0].options
+    assert nfs_logic.normalizar_opciones("ro,sync,no_subtree_check") == nfs_logic.normalizar_opciones(completa)
+    # Sin nada explícito, el kernel exporta ro y root_squash con anonuid 65534
+    defecto = nfs_logic.normalizar_opciones("")
+    assert {"ro", "root_squash", "no_all_squash", "anonuid=65534", "anongid=65534", "sec=sys"} <= set(defecto)
+
+
+def test_normalizar_no_depende_del_orden_ni_de_repeticiones():
+    assert (nfs_logic.normalizar_opciones("sync,rw,no_subtree_check")
+            == nfs_logic.normalizar_opciones("rw,sync,no_subtree_check,rw"))
+
+
+def test_normalizar_traduce_sec_numerico_e_ignora_uuid():
+    proc = nfs_logic.parsear_tabla_kernel(_leer_fixture("proc_nfsd_exports"))
+    sencilla = nfs_logic.normalizar_opciones(proc["/srv/datos"][0].options)
+    assert "sec=sys" in sencilla
+    assert not any(o.startswith("uuid") for o in sencilla)
+    kerberos = nfs_logic.normalizar_opciones(proc["/srv/kerberos"][0].options)
+    assert "sec=krb5:krb5i" in kerberos
+
+
+# --- calcular_deriva ---
+
+def test_deriva_con_etab(config_archivo):
+    kernel = nfs_logic.parsear_tabla_kernel(_leer_fixture("etab"))
+    deriva = nfs_logic.calcular_deriva(config_archivo, kernel)
+    assert deriva["solo_archivo"] == [("/srv/nuevo", "10.0.0.0/8", "ro")]
+    assert deriva["solo_kernel"] == []
+    # El archivo pide sync y el kernel sirve async
+    assert [(d, h) for d, h, _, _ in deriva["distintas"]] == [("/srv/publico", "*")]
+
+
+def test_deriva_con_proc_exports(config_archivo):
+    kernel = nfs_logic.parsear_tabla_kernel(_leer_fixture("proc_nfsd_exports"))
+    deriva = nfs_logic.calcular_deriva(config_archivo, kernel)
+    assert sorted(d for d, _, _ in deriva["solo_archivo"]) == ["/srv/nuevo", "/srv/publico"]
+    assert [(d, h) for d, h, _ in deriva["solo_kernel"]] == [("/srv/kerberos", "*.empresa.com")]
+    assert deriva["distintas"] == []
+
+
+def test_sin_deriva_si_el_kernel_sirve_lo_mismo():
+    archivo = nfs_logic.ExportTable({"/srv": [nfs_logic.HostRule("*", "rw,sync")]})
+    kernel = nfs_logic.parsear_tabla_kernel(
+        ["/srv\t*(rw,sync,wdelay,hide,nocrossmnt,secure,root_squash,no_all_squash,no_subtree_check,"
+         "secure_locks,acl,no_pnfs,anonuid=65534,anongid=65534,sec=sys)"])
+    assert not any(nfs_logic.calcular_deriva(archivo, kernel).values())
+
+
+def test_leer_exportaciones_kernel_desde_fixture():
+    tabla, origen = nfs_logic.leer_exportaciones_kernel(os.path.join(FIXTURES, "etab"))
+    assert origen.endswith("etab")
+    assert "/srv/publico" in tabla
+    tabla, mensaje = nfs_logic.leer_exportaciones_kernel(os.path.join(FIXTURES, "no_existe"))
+    assert tabla is None
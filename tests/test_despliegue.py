@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import nfs_logic
+from conftest import FIXTURES
+
+
+class PoolLocal:
+    """Ejecuta las órdenes remotas con sh en este equipo, como si fuera el servidor."""
+
+    def __init__(self, exportfs):
+        self.exportfs = exportfs
+        self.ordenes = []
+
+    def ejecutar(self, host, comando, entrada=None, timeout=None):
+        self.ordenes.append(comando)
+        comando = comando.replace("exportfs -ra", f"{self.exportfs} -ra")
+        return subprocess.run(["sh", "-c", comando], input=entrada, capture_output=True)
+
+    def cerrar(self):
+        pass
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    local = tmp_path / "local"
+    (local / "exports.d").mkdir(parents=True)
+    shutil.copy(os.path.join(FIXTURES, "exports"), local / "exports")
+    (local / "exports.d" / "extra.exports").write_text("# del equipo\n/srv/extra 10.0.0.1(rw)\n")
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", str(local / "exports"))
+    monkeypatch.setattr(nfs_logic, "EXPORTS_DIR", str(local / "exports.d"))
+    nfs_logic.limpiar_cache_exports()
+
+    registro = tmp_path / "exportfs.log"
+    exportfs = tmp_path / "exportfs"
+    exportfs.write_text(f"#!/bin/sh\necho \"$@\" >> {registro}\n")
+    exportfs.chmod(0o755)
+    yield tmp_path, PoolLocal(str(exportfs)), registro
+    nfs_logic.limpiar_cache_exports()
+
+
+def test_cada_archivo_va_a_su_ruta_remota(entorno):
+    tmp_path, pool, registro = entorno
+    remoto = tmp_path / "remoto" / "exports"
+
+    informe = nfs_logic.desplegar_flota(["srv1"], pool=pool, ruta_remota=str(remoto))
+
+    assert informe["resultados"][0]["exito"], informe
+    assert remoto.read_text() == open(nfs_logic.EXPORTS_FILE).read()
+    assert "/srv/extra" not in remoto.read_text()
+    assert (tmp_path / "remoto" / "exports.d" / "extra.exports").read_text() == \
+        "# del equipo\n/srv/extra 10.0.0.1(rw)\n"
+    assert registro.read_text().splitlines() == ["-ra"]
+
+
+def test_sin_cambios_no_se_aplica(entorno):
+    tmp_path, pool, registro = entorno
+    remoto = tmp_path / "remoto" / "exports"
+    nfs_logic.desplegar_flota(["srv1"], pool=pool, ruta_remota=str(remoto))
+
+    informe = nfs_logic.desplegar_flota(["srv1"], pool=pool, ruta_remota=str(remoto))
+
+    assert informe["resultados"][0]["sin_cambios"]
+    assert registro.read_text().splitlines() == ["-ra"]
+
+
+def test_un_solo_archivo_sin_cambios_no_lanza_exportfs(entorno):
+    tmp_path, pool, registro = entorno
+    remoto = tmp_path / "remoto" / "exports"
+    texto = open(nfs_logic.EXPORTS_FILE).read()
+
+    for _ in range(2):
+        informe = nfs_logic.desplegar_flota(["srv1"], texto, pool=pool, ruta_remota=str(remoto))
+        assert informe["resultados"][0]["exito"]
+
+    assert informe["resultados"][0]["sin_cambios"]
+    assert registro.read_text().splitlines() == ["-ra"]
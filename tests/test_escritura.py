@@ -0,0 +1,177 @@
+import os
+import shutil
+
+import pytest
+
+import nfs_logic
+from conftest import FIXTURES
+
+
+@pytest.fixture
+def exports(tmp_path, monkeypatch):
+    ruta = tmp_path / "exports"
+    shutil.copy(os.path.join(FIXTURES, "exports"), ruta)
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", str(ruta))
+    nfs_logic.limpiar_cache_exports()
+    yield ruta
+    nfs_logic.limpiar_cache_exports()
+
+
+def test_disposicion_no_guarda_el_texto(exports):
+    tabla = nfs_logic.leer_configuracion_exports()
+    disposicion = tabla._disposicion
+    assert not hasattr(disposicion, "__dict__")
+    assert len(disposicion) == 5
+    assert disposicion.directorios[0] is None
+    assert disposicion.directorios[2] == "/srv/datos"
+
+
+def test_lineas_sin_cambios_se_copian_del_archivo(exports):
+    original = exports.read_text()
+    tabla = nfs_logic.leer_configuracion_exports()
+    tabla["/srv/nuevo"] = [{"host": "10.0.0.0/8", "options": "rw"}]
+
+    ok, _ = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok
+    esperado = original.replace("/srv/nuevo 10.0.0.0/8(ro)", "/srv/nuevo 10.0.0.0/8(rw)")
+    assert exports.read_text() == esperado
+
+
+def test_linea_editada_en_disco_se_reescribe_desde_la_tabla(exports):
+    tabla = nfs_logic.leer_configuracion_exports()
+    exports.write_text(exports.read_text().replace("# /etc/exports de pruebas", "# /etc/exports de PRUEBAS"))
+    texto_datos = exports.read_text().splitlines()[2]
+
+    texto, _ = nfs_logic.serializar_exports(tabla)
+
+    # El comentario ya no coincide con lo leído y se descarta; el resto sigue igual
+    assert "PRUEBAS" not in texto
+    assert texto.splitlines()[1] == texto_datos
+
+
+def test_reescribir_sin_cambios_no_toca_el_archivo(exports):
+    tabla = nfs_logic.leer_configuracion_exports()
+    antes = exports.stat().st_mtime_ns
+
+    ok, mensaje = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok and "sin cambios" in mensaje
+    assert exports.stat().st_mtime_ns == antes
+
+
+
+@pytest.mark.parametrize("directorio", ['/srv/con"comillas"', '/srv/mi ruta', '/srv/a\\040b', '/srv/"x y"#z'])
+def test_rutas_raras_sobreviven_a_escribir_y_leer(exports, directorio):
+    tabla = nfs_logic.ExportTable()
+    tabla[directorio] = [nfs_logic.HostRule("*", "ro")]
+
+    texto, _ = nfs_logic.serializar_exports(tabla)
+
+    assert list(nfs_logic.tokenizar_exports(texto.splitlines(keepends=True))) == [(directorio, "*", "ro")]
+
+
+def test_comillas_en_la_ruta_se_escriben_en_octal():
+    tabla = nfs_logic.ExportTable({'/srv/con"comillas"': [nfs_logic.HostRule("*", "ro")]})
+    texto, _ = nfs_logic.serializar_exports(tabla)
+    assert texto.splitlines()[-1] == '/srv/con\\042comillas\\042 *(ro)'
+
+
+def test_ruta_con_comillas_no_es_valida():
+    assert not nfs_logic.validar_directorio('/srv/con"comillas"')
+
+
+# --- Varios archivos: /etc/exports + /etc/exports.d ---
+
+@pytest.fixture
+def varios(tmp_path, monkeypatch):
+    """/etc/exports y dos archivos de exports.d; /srv/compartido está repartido entre dos."""
+    exports = tmp_path / "exports"
+    exports.write_text("# principal\n/srv/principal 10.0.0.1(rw)\n/srv/compartido 10.0.0.1(ro)\n")
+    exports_d = tmp_path / "exports.d"
+    exports_d.mkdir()
+    (exports_d / "equipo.exports").write_text("# equipo\n/srv/equipo 10.0.0.2(ro)\n/srv/viejo *(ro)\n")
+    (exports_d / "extra.exports").write_text("/srv/compartido 10.0.0.3(rw)\n")
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", str(exports))
+    monkeypatch.setattr(nfs_logic, "EXPORTS_DIR", str(exports_d))
+    nfs_logic.limpiar_cache_exports()
+    yield exports, exports_d / "equipo.exports", exports_d / "extra.exports"
+    nfs_logic.limpiar_cache_exports()
+
+
+def _contenidos(*rutas):
+    return [ruta.read_text() for ruta in rutas]
+
+
+def test_editar_en_exports_d_solo_reescribe_su_archivo(varios, monkeypatch):
+    exports, equipo, extra = varios
+    antes = _contenidos(exports, extra)
+    tabla = nfs_logic.leer_configuracion_completa()
+    tabla["/srv/equipo"] = [nfs_logic.HostRule("10.0.0.2", "rw")]
+
+    # Los archivos sin cambios ni se releen: sus reglas salen de la caché de lectura
+    leidos = []
+    bloques = nfs_logic._Disposicion.bloques
+    monkeypatch.setattr(nfs_logic._Disposicion, "bloques",
+                        lambda self: (leidos.append(self.ruta), bloques(self))[1])
+    ok, mensaje = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok and f"1 archivo(s): {equipo})" in mensaje
+    assert leidos == [str(equipo)]
+    assert equipo.read_text() == "# equipo\n/srv/equipo 10.0.0.2(rw)\n/srv/viejo *(ro)\n"
+    assert _contenidos(exports, extra) == antes
+
+
+def test_directorio_nuevo_va_a_etc_exports(varios):
+    exports, equipo, extra = varios
+    antes = _contenidos(equipo, extra)
+    tabla = nfs_logic.leer_configuracion_completa()
+    tabla["/srv/nuevo"] = [nfs_logic.HostRule("*", "ro")]
+
+    ok, _ = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok
+    assert exports.read_text().endswith("/srv/nuevo *(ro)\n")
+    assert _contenidos(equipo, extra) == antes
+    assert tabla.origen("/srv/nuevo") == str(exports)
+
+
+def test_directorio_repartido_sigue_repartido(varios):
+    exports, equipo, extra = varios
+    tabla = nfs_logic.leer_configuracion_completa()
+    assert tabla["/srv/compartido"] == [nfs_logic.HostRule("10.0.0.1", "ro"), nfs_logic.HostRule("10.0.0.3", "rw")]
+    tabla["/srv/principal"] = [nfs_logic.HostRule("10.0.0.1", "ro")]
+
+    ok, _ = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok
+    assert exports.read_text() == "# principal\n/srv/principal 10.0.0.1(ro)\n/srv/compartido 10.0.0.1(ro)\n"
+    assert extra.read_text() == "/srv/compartido 10.0.0.3(rw)\n"
+
+
+def test_directorio_borrado_se_quita_de_su_archivo(varios):
+    exports, equipo, extra = varios
+    antes = _contenidos(exports, extra)
+    tabla = nfs_logic.leer_configuracion_completa()
+    del tabla["/srv/viejo"]
+
+    ok, _ = nfs_logic.escribir_configuracion_exports(tabla)
+
+    assert ok
+    assert equipo.read_text() == "# equipo\n/srv/equipo 10.0.0.2(ro)\n"
+    assert _contenidos(exports, extra) == antes
+
+
+def test_segundo_guardado_relee_lo_escrito(varios):
+    exports, equipo, _ = varios
+    tabla = nfs_logic.leer_configuracion_completa()
+    tabla["/srv/equipo"] = [nfs_logic.HostRule("10.0.0.2", "rw")]
+    assert nfs_logic.escribir_configuracion_exports(tabla)[0]
+
+    # La caché de equipo.exports ya no describe el archivo: se relee y se compara con él
+    ok, mensaje = nfs_logic.escribir_configuracion_exports(tabla)
+    assert ok and "sin cambios" in mensaje
+    del tabla["/srv/equipo"]
+    assert nfs_logic.escribir_configuracion_exports(tabla)[0]
+    assert equipo.read_text() == "# equipo\n/srv/viejo *(ro)\n"
+    assert "/srv/equipo" not in exports.read_text()
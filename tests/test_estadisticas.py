@@ -0,0 +1,172 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+import nfs_logic
+from conftest import FIXTURES
+
+PROC = os.path.join(FIXTURES, "proc")
+
+
+def _proc(nombre):
+    return os.path.join(PROC, nombre)
+
+
+# --- leer_estadisticas_nfsd ---
+
+def test_leer_estadisticas_nfsd():
+    assert nfs_logic.leer_estadisticas_nfsd(_proc("nfsd_1")) == {
+        "llamadas": 89417, "bytes_leidos": 52428800, "bytes_escritos": 10485760}
+
+
+def test_leer_estadisticas_nfsd_servidor_parado():
+    assert nfs_logic.leer_estadisticas_nfsd(_proc("no_existe")) is None
+
+
+# --- leer_clientes_activos ---
+
+def test_leer_clientes_activos_rmtab():
+    por_directorio, _ = nfs_logic.leer_clientes_activos(_proc("rmtab"), _proc("clients"))
+    # 192.168.1.22 tiene contador 0: ya desmontó
+    assert por_directorio["/srv/datos"] == {"192.168.1.20", "192.168.1.21", "2001:db8::15"}
+    assert por_directorio["/srv/home"] == {"equipo.empresa.com"}
+
+
+def test_leer_clientes_activos_ipv6_en_rmtab():
+    por_directorio, _ = nfs_logic.leer_clientes_activos(_proc("rmtab"), _proc("clients"))
+    assert por_directorio["/srv/publico"] == {"fe80::1c2b:3aff:fe4d:5e6f"}
+
+
+def test_leer_clientes_activos_nfsv4_sin_puerto():
+    _, clientes_v4 = nfs_logic.leer_clientes_activos(_proc("rmtab"), _proc("clients"))
+    assert clientes_v4 == {"10.0.0.5", "10.0.0.9", "2001:db8::42"}
+
+
+def test_leer_clientes_activos_sin_archivos():
+    assert nfs_logic.leer_clientes_activos(_proc("no_existe"), _proc("no_existe")) == ({}, set())
+
+
+def test_leer_clientes_activos_memoria(tmp_path):
+    rmtab = tmp_path / "rmtab"
+    shutil.copyfile(_proc("rmtab"), rmtab)
+    clientes = tmp_path / "clients"
+    shutil.copytree(_proc("clients"), clientes)
+    memoria = {}
+    primero = nfs_logic.leer_clientes_activos(str(rmtab), str(clientes), memoria)
+    # Sin cambios en disco se devuelve lo mismo sin volver a leer rmtab
+    segundo = nfs_logic.leer_clientes_activos(str(rmtab), str(clientes), memoria)
+    assert segundo[0] is primero[0] and segundo[1] == primero[1]
+    # Un montaje nuevo en rmtab y un cliente NFSv4 desconectado se notan
+    with open(rmtab, 'a') as f:
+        f.write("10.1.1.1:/srv/nuevo:0x00000001\n")
+    shutil.rmtree(clientes / "3")
+    por_directorio, clientes_v4 = nfs_logic.leer_clientes_activos(str(rmtab), str(clientes), memoria)
+    assert por_directorio["/srv/nuevo"] == {"10.1.1.1"}
+    assert clientes_v4 < primero[1] and len(clientes_v4) == len(primero[1]) - 1
+
+
+# --- MuestreadorNFS: tasas ---
+
+@pytest.fixture
+def muestreador(tmp_path):
+    stats = tmp_path / "nfsd"
+    m = nfs_logic.MuestreadorNFS(capacidad=4, ruta_stats=str(stats),
+                                 ruta_rmtab=_proc("rmtab"), dir_clientes=_proc("clients"))
+    m.cambiar = lambda nombre: shutil.copyfile(_proc(nombre), stats)
+    return m
+
+
+def test_primera_muestra_no_da_tasas(muestreador):
+    muestreador.cambiar("nfsd_1")
+    assert muestreador.muestrear(instante=100.0) is None
+
+
+def test_tasas_entre_dos_muestras(muestreador):
+    muestreador.cambiar("nfsd_1")
+    muestreador.muestrear(instante=100.0)
+    muestreador.cambiar("nfsd_2")
+    muestra = muestreador.muestrear(instante=102.0)
+    assert muestra["ops"] == pytest.approx(500.0)                # 1000 llamadas / 2 s
+    assert muestra["lectura"] == pytest.approx(5 * 1024 * 1024)  # 10 MiB / 2 s
+    assert muestra["escritura"] == pytest.approx(512 * 1024)
+    # 3 clientes NFSv4 + 5 montajes vivos en rmtab
+    assert muestra["clientes"] == 8
+    assert muestreador.clientes_de("/srv/datos") == 3
+
+
+def test_tasas_tras_reinicio_de_contadores(muestreador):
+    muestreador.cambiar("nfsd_2")
+    muestreador.muestrear(instante=100.0)
+    muestreador.cambiar("nfsd_reinicio")
+    muestra = muestreador.muestrear(instante=102.0)
+    # Los contadores bajaron: no hay tasas negativas
+    assert muestra["ops"] == 0 and muestra["lectura"] == 0 and muestra["escritura"] == 0
+    # La siguiente muestra ya mide desde los contadores nuevos
+    muestreador.cambiar("nfsd_1")
+    muestra = muestreador.muestrear(instante=104.0)
+    assert muestra["ops"] == pytest.approx((89417 - 50) / 2)
+
+
+def test_servidor_parado_reinicia_la_referencia(muestreador):
+    muestreador.cambiar("nfsd_1")
+    muestreador.muestrear(instante=100.0)
+    os.unlink(muestreador.ruta_stats)
+    assert muestreador.muestrear(instante=102.0) is None
+    muestreador.cambiar("nfsd_2")
+    assert muestreador.muestrear(instante=104.0) is None
+
+
+# --- HistorialMuestras ---
+
+def test_historial_antes_de_llenarse():
+    historial = nfs_logic.HistorialMuestras(capacidad=3)
+    assert historial.ultima() is None
+    historial.anadir(instante=1, ops=10)
+    historial.anadir(instante=2, ops=20)
+    assert len(historial) == 2
+    assert list(historial.serie("ops")) == [10, 20]
+
+
+def test_historial_da_la_vuelta():
+    historial = nfs_logic.HistorialMuestras(capacidad=3)
+    for i in range(1, 8):
+        historial.anadir(instante=i, ops=i * 10)
+    assert len(historial) == 3
+    assert historial.total == 7
+    assert list(historial.serie("instante")) == [5, 6, 7]
+    assert list(historial.serie("ops")) == [50, 60, 70]
+    assert historial.ultima()["ops"] == 70
+
+
+def test_historial_vuelta_exacta():
+    historial = nfs_logic.HistorialMuestras(capacidad=3)
+    for i in range(1, 7):
+        historial.anadir(ops=i)
+    assert list(historial.serie("ops")) == [4, 5, 6]
+    # Las series que no se indican valen 0
+    assert list(historial.serie("lectura")) == [0, 0, 0]
+
+
+# --- MuestreadorNFS: hilo ---
+
+def test_hilo_avisa_tambien_sin_datos(tmp_path):
+    recibidas = []
+    llegada = threading.Event()
+
+    def al_muestrear(muestra):
+        recibidas.append(muestra)
+        llegada.set()
+
+    m = nfs_logic.MuestreadorNFS(intervalo=0.01, callback=al_muestrear,
+                                 ruta_stats=str(tmp_path / "no_existe"),
+                                 ruta_rmtab=_proc("rmtab"), dir_clientes=_proc("clients"))
+    m.iniciar()
+    try:
+        assert llegada.wait(5)
+    finally:
+        m.detener()
+    # El servidor parado también se notifica, para que la GUI muestre "sin datos"
+    assert recibidas[0] is None
+    assert m.clientes_de("/srv/datos") == 3
@@ -0,0 +1,116 @@
+import pytest
+
+import nfs_logic
+
+
+def _tabla(datos):
+    tabla = nfs_logic.ExportTable()
+    for directorio, reglas in datos.items():
+        tabla[directorio] = [nfs_logic.HostRule(host, opciones) for host, opciones in reglas]
+    return tabla
+
+
+class ExportfsFalso:
+    """exportfs falso: anota cada llamada y falla (salvo con -ra) si existe el archivo FALLAR."""
+
+    def __init__(self, directorio):
+        self.registro = directorio / "exportfs.log"
+        self.marca_fallo = directorio / "FALLAR"
+        self.ruta = directorio / "exportfs"
+        self.ruta.write_text(f"""#!/bin/sh
+echo "$*" >> {self.registro}
+[ "$1" = "-ra" ] && exit 0
+[ -e {self.marca_fallo} ] && {{ echo "exportfs: fallo simulado" >&2; exit 1; }}
+exit 0
+""")
+        self.ruta.chmod(0o755)
+
+    def __str__(self):
+        return str(self.ruta)
+
+    def llamadas(self):
+        return self.registro.read_text().splitlines() if self.registro.exists() else []
+
+    def fallar(self):
+        self.marca_fallo.touch()
+
+
+@pytest.fixture
+def exportfs(tmp_path):
+    return ExportfsFalso(tmp_path)
+
+
+VIEJA = {
+    "/srv/datos": [("192.168.1.0/24", "rw,sync"), ("2001:db8::15", "ro")],
+    "/srv/home": [("equipo.empresa.com", "rw")],
+    "/srv/antiguo": [("*", "ro")],
+}
+
+
+# --- planificar_comandos_exportfs ---
+
+def test_alta_cambio_y_baja():
+    vieja = _tabla(VIEJA)
+    nueva = _tabla(dict(VIEJA, **{"/srv/home": [("equipo.empresa.com", "ro")],
+                                  "/srv/nuevo": [("10.0.0.0/8", "rw")]}))
+    del nueva["/srv/antiguo"]
+    comandos = nfs_logic.planificar_comandos_exportfs(vieja, nueva)
+    assert sorted(comandos[:-1]) == [["exportfs", "-i", "-o", "ro", "equipo.empresa.com:/srv/home"],
+                                     ["exportfs", "-i", "-o", "rw", "10.0.0.0/8:/srv/nuevo"]]
+    # Las retiradas van al final
+    assert comandos[-1] == ["exportfs", "-u", "*:/srv/antiguo"]
+
+
+def test_ipv6_entre_corchetes():
+    vieja = _tabla(VIEJA)
+    nueva = _tabla(dict(VIEJA, **{"/srv/datos": [("192.168.1.0/24", "rw,sync"), ("2001:db8::/32", "ro")],
+                                  "/srv/v6": [("[fe80::1]", "rw")]}))
+    comandos = nfs_logic.planificar_comandos_exportfs(vieja, nueva)
+    destinos = {destino for comando in comandos for destino in comando if ":/" in destino}
+    assert destinos == {"[2001:db8::/32]:/srv/datos", "[fe80::1]:/srv/v6", "[2001:db8::15]:/srv/datos"}
+    assert ["exportfs", "-u", "[2001:db8::15]:/srv/datos"] in comandos
+
+
+def test_nombres_y_comodines_sin_corchetes():
+    nueva = _tabla({"/srv/a": [("*.empresa.com", "ro"), ("@grupo", "ro"), ("10.0.0.1", "ro")]})
+    comandos = nfs_logic.planificar_comandos_exportfs(_tabla({}), nueva)
+    assert comandos == [["exportfs", "-i", "-o", "ro", "*.empresa.com:/srv/a", "@grupo:/srv/a", "10.0.0.1:/srv/a"]]
+
+
+# --- aplicar_cambios_nfs con un exportfs falso ---
+
+def test_aplicar_lanza_solo_los_cambios(exportfs):
+    vieja = _tabla(VIEJA)
+    nueva = _tabla(dict(VIEJA, **{"/srv/home": [("equipo.empresa.com", "ro")]}))
+    del nueva["/srv/antiguo"]
+    exito, mensaje = nfs_logic.aplicar_cambios_nfs(vieja, nueva, comando_exportfs=str(exportfs))
+    assert exito, mensaje
+    assert exportfs.llamadas() == ["-i -o ro equipo.empresa.com:/srv/home", "-u *:/srv/antiguo"]
+
+
+def test_aplicar_ipv6(exportfs):
+    vieja = _tabla(VIEJA)
+    nueva = _tabla(dict(VIEJA, **{"/srv/datos": [("192.168.1.0/24", "rw,sync"), ("2001:db8::15", "rw")]}))
+    exito, mensaje = nfs_logic.aplicar_cambios_nfs(vieja, nueva, comando_exportfs=str(exportfs))
+    assert exito, mensaje
+    assert exportfs.llamadas() == ["-i -o rw [2001:db8::15]:/srv/datos"]
+
+
+def test_aplicar_sin_cambios_no_lanza_nada(exportfs):
+    exito, mensaje = nfs_logic.aplicar_cambios_nfs(_tabla(VIEJA), _tabla(VIEJA), comando_exportfs=str(exportfs))
+    assert exito and "No hay cambios" in mensaje
+    assert exportfs.llamadas() == []
+
+
+def test_aplicar_recurre_a_ra_si_falla_un_cambio(exportfs):
+    exportfs.fallar()
+    nueva = _tabla(dict(VIEJA, **{"/srv/nuevo": [("10.0.0.0/8", "rw")]}))
+    exito, mensaje = nfs_logic.aplicar_cambios_nfs(_tabla(VIEJA), nueva, comando_exportfs=str(exportfs))
+    assert exito and "-ra" in mensaje
+    assert exportfs.llamadas() == ["-i -o rw 10.0.0.0/8:/srv/nuevo", "-ra"]
+
+
+def test_aplicar_sin_tablas_usa_ra(exportfs):
+    exito, _ = nfs_logic.aplicar_cambios_nfs(comando_exportfs=str(exportfs))
+    assert exito
+    assert exportfs.llamadas() == ["-ra"]
@@ -0,0 +1,181 @@
+import random
+
+import pytest
+
+import nfs_logic
+
+# Enteros con el mismo hash completo: hash(n) es n módulo 2**61 - 1
+MODULO_HASH = 2 ** 61 - 1
+
+
+# --- MapaPersistente ---
+
+def test_asignar_y_quitar_no_tocan_el_original():
+    vacio = nfs_logic.MapaPersistente()
+    uno = vacio.asignar("/srv/a", 1)
+    dos = uno.asignar("/srv/b", 2)
+    assert len(vacio) == 0 and len(uno) == 1 and len(dos) == 2
+    assert dos.get("/srv/a") == 1 and "/srv/b" not in uno
+    sin_a = dos.quitar("/srv/a")
+    assert "/srv/a" not in sin_a and dos.get("/srv/a") == 1
+    assert len(sin_a) == 1
+
+
+def test_sin_cambios_devuelve_el_mismo_mapa():
+    valor = (1, 2)
+    mapa = nfs_logic.MapaPersistente().asignar("/srv/a", valor)
+    assert mapa.asignar("/srv/a", valor) is mapa
+    assert mapa.quitar("/srv/no_esta") is mapa
+
+
+def test_coincide_con_un_dict():
+    rnd = random.Random(7)
+    mapa, referencia = nfs_logic.MapaPersistente(), {}
+    for _ in range(5000):
+        clave = f"/srv/{rnd.randrange(800)}"
+        if rnd.random() < 0.3:
+            mapa = mapa.quitar(clave)
+            referencia.pop(clave, None)
+        else:
+            valor = rnd.randrange(10)
+            mapa = mapa.asignar(clave, valor)
+            referencia[clave] = valor
+    assert len(mapa) == len(referencia)
+    assert dict(mapa.items()) == referencia
+    assert dict(nfs_logic.MapaPersistente.desde(referencia.items()).items()) == referencia
+
+
+def test_colisiones_de_hash_completo():
+    claves = [i * MODULO_HASH + 5 for i in range(4)]
+    assert len({hash(c) for c in claves}) == 1
+    mapa = nfs_logic.MapaPersistente().asignar("otra", 0)
+    for i, clave in enumerate(claves):
+        mapa = mapa.asignar(clave, i)
+    assert len(mapa) == 5
+    assert [mapa.get(c) for c in claves] == [0, 1, 2, 3]
+    mapa = mapa.asignar(claves[1], "nuevo")
+    assert len(mapa) == 5 and mapa.get(claves[1]) == "nuevo"
+    for clave in claves:
+        mapa = mapa.quitar(clave)
+        assert clave not in mapa
+    assert dict(mapa.items()) == {"otra": 0}
+
+
+def test_colisiones_construidas_de_una_vez():
+    claves = [i * MODULO_HASH + 9 for i in range(3)]
+    mapa = nfs_logic.MapaPersistente.desde([(c, c) for c in claves] + [("x", 1)])
+    assert len(mapa) == 4 and all(mapa.get(c) == c for c in claves)
+    assert mapa.quitar(claves[0]).get(claves[2]) == claves[2]
+
+
+def test_diferencias_entre_instantaneas():
+    base = nfs_logic.MapaPersistente.desde((f"/srv/{i}", i) for i in range(1000))
+    otra = base.asignar("/srv/3", 33).quitar("/srv/7").asignar("/srv/nuevo", 1)
+    assert sorted(base.diferencias(otra), key=str) == sorted(
+        [("/srv/3", 3, 33), ("/srv/7", 7, None), ("/srv/nuevo", None, 1)], key=str)
+    assert base.diferencias(base) == []
+
+
+def test_diferencias_con_colisiones():
+    a, b, c = (i * MODULO_HASH + 1 for i in range(3))
+    uno = nfs_logic.MapaPersistente.desde([(a, 1), (b, 2)])
+    dos = uno.asignar(b, 20).asignar(c, 3)
+    assert sorted(uno.diferencias(dos)) == [(b, 2, 20), (c, None, 3)]
+
+
+# --- HistorialCambios ---
+
+@pytest.fixture
+def tabla(tmp_path, monkeypatch):
+    """Tabla de /etc/exports y un archivo de exports.d: devuelve (tabla, ruta del archivo)."""
+    exports = tmp_path / "exports"
+    exports.write_text("/srv/principal 10.0.0.1(rw)\n")
+    exports_d = tmp_path / "exports.d"
+    exports_d.mkdir()
+    (exports_d / "equipo.exports").write_text("/srv/equipo 10.0.0.2(ro)\n")
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", str(exports))
+    monkeypatch.setattr(nfs_logic, "EXPORTS_DIR", str(exports_d))
+    nfs_logic.limpiar_cache_exports()
+    yield nfs_logic.leer_configuracion_completa(), str(exports_d / "equipo.exports")
+    nfs_logic.limpiar_cache_exports()
+
+
+def test_deshacer_y_rehacer_alta(tabla):
+    config, _ = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    config["/srv/nuevo"] = [nfs_logic.HostRule("*", "ro")]
+    historial.registrar(config, ["/srv/nuevo"], "Añadir")
+    assert historial.deshacer(config) == ("Añadir", ["/srv/nuevo"])
+    assert "/srv/nuevo" not in config
+    assert historial.rehacer(config) == ("Añadir", ["/srv/nuevo"])
+    assert config["/srv/nuevo"] == [nfs_logic.HostRule("*", "ro")]
+    assert config.origen("/srv/nuevo") is None
+
+
+def test_deshacer_borrado_devuelve_el_origen(tabla):
+    config, archivo = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    del config["/srv/equipo"]
+    assert config.origen("/srv/equipo") is None
+    historial.registrar(config, ["/srv/equipo"], "Borrar")
+    historial.deshacer(config)
+    assert config["/srv/equipo"] == [nfs_logic.HostRule("10.0.0.2", "ro")]
+    assert config.origen("/srv/equipo") == archivo
+
+
+def test_renombrar_deshacer_y_rehacer_conservan_el_origen(tabla):
+    config, archivo = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    # Igual que MainWindow._renombrar_en_configuracion
+    origen = config.origen("/srv/equipo")
+    config["/srv/equipo2"] = config.pop("/srv/equipo")
+    config.asignar_origen("/srv/equipo2", origen)
+    historial.registrar(config, ["/srv/equipo", "/srv/equipo2"], "Renombrar")
+
+    historial.deshacer(config)
+    assert "/srv/equipo2" not in config and config.origen("/srv/equipo") == archivo
+    historial.rehacer(config)
+    assert "/srv/equipo" not in config and config.origen("/srv/equipo2") == archivo
+
+
+def test_borrar_y_volver_a_anadir_va_a_etc_exports(tabla):
+    config, archivo = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    del config["/srv/equipo"]
+    historial.registrar(config, ["/srv/equipo"], "Borrar")
+    config["/srv/equipo"] = [nfs_logic.HostRule("*", "rw")]
+    historial.registrar(config, ["/srv/equipo"], "Añadir")
+    assert config.origen("/srv/equipo") is None
+    # Deshacer ambos pasos recupera el archivo original
+    historial.deshacer(config)
+    historial.deshacer(config)
+    assert config.origen("/srv/equipo") == archivo
+    # Y rehacerlos vuelve a dejarlo sin origen (se guardará en /etc/exports)
+    historial.rehacer(config)
+    historial.rehacer(config)
+    assert config["/srv/equipo"] == [nfs_logic.HostRule("*", "rw")]
+    assert config.origen("/srv/equipo") is None
+
+
+def test_registrar_sin_directorios_compara_todo(tabla):
+    config, archivo = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    del config["/srv/equipo"]
+    config["/srv/principal"].append(nfs_logic.HostRule("*", "ro"))
+    assert historial.registrar(config, None, "Varios")
+    assert not historial.registrar(config, None, "Nada")
+    assert sorted(historial.deshacer(config)[1]) == ["/srv/equipo", "/srv/principal"]
+    assert config.origen("/srv/equipo") == archivo
+    assert config["/srv/principal"] == [nfs_logic.HostRule("10.0.0.1", "rw")]
+
+
+def test_nueva_edicion_vacia_rehacer(tabla):
+    config, _ = tabla
+    historial = nfs_logic.HistorialCambios(config)
+    config["/srv/a"] = [nfs_logic.HostRule("*", "ro")]
+    historial.registrar(config, ["/srv/a"], "A")
+    historial.deshacer(config)
+    assert historial.puede_rehacer()
+    config["/srv/b"] = [nfs_logic.HostRule("*", "ro")]
+    historial.registrar(config, ["/srv/b"], "B")
+    assert not historial.puede_rehacer() and historial.descripcion_deshacer() == "B"
@@ -0,0 +1,42 @@
+import nfs_logic
+
+
+def _tabla(**reglas):
+    tabla = nfs_logic.ExportTable()
+    for directorio, hosts in reglas.items():
+        tabla["/" + directorio] = [nfs_logic.HostRule(host, opciones) for host, opciones in hosts]
+    return tabla
+
+
+def test_literales_de_un_comodin():
+    assert nfs_logic._literales_comodin("web*.empresa.com") == ("web", ".empresa.com")
+    assert nfs_logic._literales_comodin("srv[0-9]") == ("srv", "")
+    assert nfs_logic._literales_comodin("*web*") == ("", "")
+
+
+def test_comodines_por_prefijo_sufijo_y_sin_texto_fijo():
+    indice = nfs_logic.IndiceClientes(_tabla(
+        a=[("web*.empresa.com", "rw")],
+        b=[("srv?", "ro")],
+        c=[("*eb*", "ro")]))
+    assert [d for d, _, _ in indice.consultar("web1.empresa.com")] == ["/a", "/c"]
+    assert [d for d, _, _ in indice.consultar("srv1")] == ["/b"]
+    assert indice.consultar("srv10") == []
+
+
+def test_anonimo_solo_si_no_hay_regla_mas_especifica():
+    indice = nfs_logic.IndiceClientes(_tabla(
+        a=[("*", "ro"), ("web*.empresa.com", "rw")],
+        b=[("*", "ro"), ("*", "rw")]))
+    assert indice.consultar("web1.empresa.com") == [("/a", "web*.empresa.com", "rw"), ("/b", "*", "ro")]
+    assert indice.consultar("otro.org") == [("/a", "*", "ro"), ("/b", "*", "ro")]
+
+
+def test_actualizar_y_eliminar_quitan_comodines_y_anonimos():
+    tabla = _tabla(a=[("*", "ro"), ("web*", "rw")], b=[("db*.x", "rw")])
+    indice = nfs_logic.IndiceClientes(tabla)
+    indice.actualizar_directorio("/a", [nfs_logic.HostRule("10.0.0.0/8", "rw")])
+    indice.eliminar_directorio("/b")
+    assert indice.consultar("web1") == []
+    assert indice.consultar("db1.x") == []
+    assert indice.consultar("10.1.2.3") == [("/a", "10.0.0.0/8", "rw")]
@@ -0,0 +1,41 @@
+import nfs_logic
+
+
+INVENTARIO = [
+    "directorio;host;opciones\n",
+    "/srv/datos;10.0.0.5;rw,sync\n",
+    "/srv/nuevo;*;ro\n",
+    "/srv/datos;*;ro,sync\n",
+    "relativa;*;ro\n",
+]
+
+
+def test_leer_inventario_no_toca_ninguna_tabla():
+    filas, errores = nfs_logic.leer_inventario(INVENTARIO)
+    assert [(n, d, r.host) for n, d, r in filas] == [
+        (2, "/srv/datos", "10.0.0.5"), (3, "/srv/nuevo", "*"), (4, "/srv/datos", "*")]
+    assert [e["linea"] for e in errores] == [5]
+
+
+def test_fusionar_conserva_lo_editado_mientras_se_leia():
+    tabla = nfs_logic.ExportTable({"/srv/datos": [nfs_logic.HostRule("*", "rw")]})
+    filas, errores = nfs_logic.leer_inventario(INVENTARIO)
+
+    # Ediciones hechas en la GUI mientras el archivo se leía en otro hilo
+    tabla["/srv/manual"] = [nfs_logic.HostRule("10.0.0.9", "rw")]
+    tabla["/srv/datos"].append(nfs_logic.HostRule("10.0.0.7", "ro"))
+
+    informe = nfs_logic.fusionar_inventario(filas, tabla, errores)
+
+    assert informe["anadidas"] == 2 and informe["actualizadas"] == 1 and informe["directorios_nuevos"] == 1
+    assert len(informe["errores"]) == 1
+    assert "/srv/manual" in tabla
+    assert [(r.host, r.options) for r in tabla["/srv/datos"]] == [
+        ("*", "ro,sync"), ("10.0.0.7", "ro"), ("10.0.0.5", "rw,sync")]
+
+
+def test_importar_inventario_equivale_a_leer_y_fusionar():
+    tabla = nfs_logic.ExportTable()
+    informe = nfs_logic.importar_inventario(INVENTARIO, tabla)
+    assert informe["anadidas"] == 3
+    assert list(tabla) == ["/srv/datos", "/srv/nuevo"]
@@ -0,0 +1,40 @@
+import json
+import pathlib
+import types
+
+import nfs_logic
+
+
+def _arbol(raiz):
+    (raiz / "sub").mkdir(parents=True)
+    (raiz / "a.txt").write_text("hola")
+    (raiz / "sub" / "b.txt").write_text("adiós")
+
+
+def test_reanudar_desde_diario_sin_copias_no_repite_la_cabecera(tmp_path):
+    origen, destino = tmp_path / "origen", tmp_path / "destino"
+    _arbol(origen)
+    diario = pathlib.Path(nfs_logic._ruta_diario(str(destino)))
+    cabecera = json.dumps({"origen": str(origen), "destino": str(destino)}) + "\n"
+    diario.write_text(cabecera)
+
+    ok, _ = nfs_logic.mover_entre_sistemas(str(origen), str(destino),
+                                           cancelacion=types.SimpleNamespace(cancelado=True))
+
+    assert not ok
+    assert diario.read_text() == cabecera
+
+
+def test_mover_reanudado_termina_y_borra_el_diario(tmp_path):
+    origen, destino = tmp_path / "origen", tmp_path / "destino"
+    _arbol(origen)
+    cancelado = types.SimpleNamespace(cancelado=True)
+    nfs_logic.mover_entre_sistemas(str(origen), str(destino), cancelacion=cancelado)
+    diario = pathlib.Path(nfs_logic._ruta_diario(str(destino)))
+    assert diario.read_text().count('"origen"') == 1
+
+    ok, mensaje = nfs_logic.mover_entre_sistemas(str(origen), str(destino))
+
+    assert ok, mensaje
+    assert not origen.exists() and not diario.exists()
+    assert (destino / "sub" / "b.txt").read_text() == "adiós"
@@ -0,0 +1,42 @@
+import nfs_logic
+
+
+def test_all_squash_impone_anonuid_y_anongid():
+    permisos, mensaje = nfs_logic.permisos_implicados("rw,all_squash,anonuid=1000,anongid=100")
+    assert (permisos["uid"], permisos["gid"]) == (1000, 100)
+    assert permisos["modo_dirs"] == 0o700
+    assert mensaje == "Dueño 1000:100."
+
+
+def test_sin_all_squash_no_hay_dueno():
+    permisos, mensaje = nfs_logic.permisos_implicados("rw,no_all_squash,anonuid=1000")
+    assert permisos is None
+    assert "all_squash" in mensaje
+
+
+def test_anonuid_no_numerico_se_rechaza():
+    permisos, mensaje = nfs_logic.permisos_implicados("rw,all_squash,anonuid=nobody")
+    assert permisos is None
+    assert "anonuid=nobody" in mensaje
+
+
+def test_anongid_fuera_de_rango_se_rechaza():
+    permisos, mensaje = nfs_logic.permisos_implicados("rw,all_squash,anonuid=1,anongid=4294967295")
+    assert permisos is None
+    assert "anongid" in mensaje
+
+
+def test_reglas_con_anonuid_invalido_no_imponen_dueno():
+    reglas = [nfs_logic.HostRule("*", "ro,all_squash,anonuid=x,anongid=1"),
+              nfs_logic.HostRule("10.0.0.1", "rw,all_squash,anonuid=5,anongid=5")]
+    permisos, mensaje = nfs_logic.permisos_de_reglas(reglas)
+    assert permisos is None
+    assert "anonuid=x" in mensaje
+
+
+def test_aplicar_permisos_recorre_el_arbol(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "f").write_text("x")
+    informe = nfs_logic.aplicar_permisos_arbol(str(tmp_path), modo_dirs=0o700, modo_archivos=0o600)
+    assert informe["revisadas"] == 4
+    assert not informe["errores"]
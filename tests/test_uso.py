@@ -0,0 +1,66 @@
+import os
+
+import nfs_logic
+
+
+def _arbol(raiz):
+    """raiz/{a.txt, sub/b.txt, anidada/c.txt}: 'anidada' se exporta aparte."""
+    os.makedirs(raiz / "sub")
+    os.makedirs(raiz / "anidada")
+    for ruta in ("a.txt", "sub/b.txt", "anidada/c.txt"):
+        (raiz / ruta).write_bytes(b"x" * 10000)
+    return str(raiz), str(raiz / "anidada")
+
+
+# --- EscanerUso.en_cache ---
+
+def test_en_cache_coincide_con_lo_medido(tmp_path):
+    raiz, anidada = _arbol(tmp_path / "srv")
+    escaner = nfs_logic.EscanerUso(ruta_cache=None)
+    medido = escaner.medir([raiz, anidada])
+    assert escaner.en_cache([raiz, anidada]) == {r: dict(uso, releidos=0) for r, uso in medido.items()}
+
+
+def test_en_cache_omite_lo_nunca_medido(tmp_path):
+    raiz, anidada = _arbol(tmp_path / "srv")
+    escaner = nfs_logic.EscanerUso(ruta_cache=None)
+    assert escaner.en_cache([raiz]) == {}
+    escaner.medir([anidada])
+    assert list(escaner.en_cache([raiz, anidada])) == [anidada]
+
+
+def test_en_cache_no_suma_exportaciones_anidadas(tmp_path):
+    raiz, anidada = _arbol(tmp_path / "srv")
+    escaner = nfs_logic.EscanerUso(ruta_cache=None)
+    escaner.medir([raiz, anidada])
+    solo_raiz = escaner.en_cache([raiz], exportaciones=[raiz, anidada])[raiz]
+    assert solo_raiz["archivos"] == 2 and solo_raiz["directorios"] == 2
+
+
+def test_en_cache_desde_el_archivo(tmp_path):
+    raiz, anidada = _arbol(tmp_path / "srv")
+    ruta_cache = str(tmp_path / "cache" / "uso_disco.json")
+    anterior = nfs_logic.EscanerUso(ruta_cache=ruta_cache)
+    medido = anterior.medir([raiz, anidada])
+    assert anterior.guardar()[0]
+    # Otra sesión: se muestra lo guardado sin recorrer el disco
+    siguiente = nfs_logic.EscanerUso(ruta_cache=ruta_cache)
+    assert siguiente.en_cache([raiz], exportaciones=[raiz, anidada])[raiz]["bytes"] == medido[raiz]["bytes"]
+
+
+# --- EscanerUso.medir de solo algunas rutas ---
+
+def test_medir_una_ruta_respeta_las_demas_exportaciones(tmp_path):
+    raiz, anidada = _arbol(tmp_path / "srv")
+    escaner = nfs_logic.EscanerUso(ruta_cache=None)
+    escaner.medir([anidada])
+    medido = escaner.medir([raiz], exportaciones=[raiz, anidada])
+    # La anidada ni se suma a la raíz ni se olvida de la caché
+    assert medido[raiz]["archivos"] == 2
+    assert escaner.en_cache([anidada])[anidada]["archivos"] == 1
+
+
+def test_medir_sin_exportaciones_suma_todo_el_arbol(tmp_path):
+    raiz, _ = _arbol(tmp_path / "srv")
+    escaner = nfs_logic.EscanerUso(ruta_cache=None)
+    assert escaner.medir([raiz])[raiz]["archivos"] == 3
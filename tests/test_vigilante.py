@@ -0,0 +1,66 @@
+import os
+import threading
+
+import nfs_logic
+
+
+def _descriptores_abiertos():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_detener_justo_tras_iniciar_no_deja_descriptores(tmp_path):
+    antes = _descriptores_abiertos()
+    for _ in range(50):
+        vigilante = nfs_logic.VigilanteArchivos([str(tmp_path)], lambda rutas: None)
+        vigilante.iniciar()
+        vigilante.detener()
+        assert vigilante._hilo is None
+    assert _descriptores_abiertos() == antes
+
+
+def test_avisa_de_cambios_en_el_directorio(tmp_path):
+    avisado = threading.Event()
+    recibidas = []
+
+    def callback(rutas):
+        recibidas.extend(rutas)
+        avisado.set()
+
+    vigilante = nfs_logic.VigilanteArchivos([str(tmp_path)], callback, debounce=0.05, intervalo_sondeo=0.05)
+    vigilante.iniciar()
+    try:
+        # El vigilante registra sus rutas ya dentro del hilo: se reescribe hasta que avise
+        for intento in range(50):
+            (tmp_path / "nuevo.exports").write_text(f"/srv *(ro) # {intento}\n")
+            if avisado.wait(0.1):
+                break
+        assert avisado.is_set()
+    finally:
+        vigilante.detener()
+    assert str(tmp_path / "nuevo.exports") in recibidas
+
+
+def test_lecturas_concurrentes_comparten_la_cache(tmp_path, monkeypatch):
+    ruta = tmp_path / "exports"
+    ruta.write_text("".join(f"/srv/d{i} *(rw,sync)\n" for i in range(500)))
+    monkeypatch.setattr(nfs_logic, "EXPORTS_FILE", str(ruta))
+    monkeypatch.setattr(nfs_logic, "EXPORTS_DIR", str(tmp_path / "exports.d"))
+    nfs_logic.limpiar_cache_exports()
+    errores = []
+
+    def leer():
+        try:
+            for i in range(20):
+                if i % 5 == 0:
+                    os.utime(ruta, ns=(i, i))
+                assert len(nfs_logic.leer_configuracion_completa()) == 500
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=leer) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    nfs_logic.limpiar_cache_exports()
+    assert errores == []